@@ -1,26 +1,40 @@
 import pandas as pd
-import hashlib
 import re
 import os
 import glob
 from datetime import datetime
 
+import stage_timer
+from compare_multiple_reports import COLUMN_MAPPING as REPORT_COLUMNS
+from comment_store import connect, find_sources, report_count, sync_reports
+from nessus_xml import is_nessus_file, read_nessus
+from report_engine import get_engine
+from report_pool import load_reports
+from sources_sheet import build_sources_sheet, sources_frame
+from vuln_id import compute_vuln_keys
+from xlsx_stream import load_ids_streaming
+from xlsx_writer import replace_sheets
+
 # ========== НАСТРОЙКИ ==========
 MAIN_FILE = "comparison_result.xlsx"      # Основной файл (с листом "Новый с комментариями")
 REPORTS_FOLDER = "."                      # Папка с дополнительными отчётами (старыми)
+REPORT_PATTERNS = ("*.xlsx", "*.nessus")  # Excel-выгрузки и исходные файлы Nessus (v2)
 OUTPUT_FILE = MAIN_FILE                   # Будем добавлять лист в тот же файл (или можно указать новый)
+CACHE_DIR = None                          # Кэш разобранных отчётов, например ".report_cache" (None — не использовать)
+CACHE_MAX_BYTES = 2 * 1024 ** 3           # Предельный размер кэша
+STREAM_CHUNK_SIZE = None                  # Если задано — отчёты читаются потоково частями по N строк
+WORKERS = 1                               # Процессов для загрузки отчётов (0 — по числу ядер)
+COMMENT_DB = None                         # SQLite-база комментариев (comment_store.py); None — читать файлы папки
+ENGINE = "pandas"                         # Движок объединения таблиц (report_engine.py): "pandas", "duckdb" или "polars"
+TIMINGS_FILE = None                       # JSON с замерами этапов (время, CPU, память); None — не сохранять
+TIMINGS_SHEET = False                     # Добавить лист "Производительность источников" с замерами этапов
 
 # Регулярка для даты в имени файла (поддерживает дефис и точку)
 DATE_PATTERN = r"(\d{4}[.-]\d{2}[.-]\d{2})"
 
-# Названия колонок (должны совпадать с теми, что в основном файле)
-COLUMN_MAPPING = {
-    "vuln_name": "Наименование уязвимости",
-    "ip": "ip-адрес хоста",
-    "ports": "список портов",
-    "comment": "комментарий",
-    "pack": "пачка"
-}
+# Названия колонок — те же, что у compare_multiple_reports.py (он пишет основной файл),
+# поэтому _id и лист источников совпадают с листом, который он пишет сам
+COLUMN_MAPPING = {key: REPORT_COLUMNS[key] for key in ("vuln_name", "ip", "ports", "comment", "pack")}
 # ================================
 
 def extract_date_from_filename(filepath):
@@ -36,134 +50,122 @@ def extract_date_from_filename(filepath):
                 continue
     return datetime.fromtimestamp(os.path.getmtime(filepath))
 
-def get_vuln_id(row, col_map):
-    """Уникальный ID на основе IP + названия + портов."""
-    ip = str(row.get(col_map["ip"], ""))
-    vuln = str(row.get(col_map["vuln_name"], ""))
-    ports = str(row.get(col_map["ports"], ""))
-    
-    ports_normalized = re.sub(r'\s+', '', ports.lower())
-    if ',' in ports_normalized:
-        parts = [p for p in ports_normalized.split(',') if p.isdigit()]
-        ports_normalized = ','.join(sorted(parts, key=int))
-    
-    unique_str = f"{ip}|{vuln}|{ports_normalized}"
-    return hashlib.md5(unique_str.encode('utf-8')).hexdigest()
-
 def load_report_with_ids(filepath, col_map):
-    """Загружает Excel, добавляет колонку _id и _original_index (номер строки)."""
-    df = pd.read_excel(filepath, sheet_name=0, dtype=str)
+    """Загружает Excel (или .nessus), добавляет колонку _id и _original_index (номер строки)."""
+    if is_nessus_file(filepath):
+        df = read_nessus(filepath, col_map)
+    else:
+        df = pd.read_excel(filepath, sheet_name=0, dtype=str)
     df = df.fillna("")
     # Убедимся, что нужные колонки есть (если нет, создаём пустые)
     for key, col_name in col_map.items():
         if col_name not in df.columns:
             df[col_name] = ""
-    df['_id'] = df.apply(lambda row: get_vuln_id(row, col_map), axis=1)
+    with stage_timer.stage("hash", len(df)):
+        df['_id'] = compute_vuln_keys(df, col_map)
     df['_original_index'] = range(1, len(df) + 1)
     return df
 
+def load_report_ids_streaming(filepath, col_map):
+    """Потоковая загрузка отчёта частями: остаются только _id и _original_index."""
+    return load_ids_streaming(filepath, col_map, (), STREAM_CHUNK_SIZE)
+
 def main():
     print("=== Добавление источников комментариев из дополнительных отчётов ===\n")
+    timer = stage_timer.start("add_source_to_main_report")
     
     # 1. Загружаем основной файл (лист "Новый с комментариями")
     if not os.path.exists(MAIN_FILE):
         print(f"Ошибка: файл {MAIN_FILE} не найден")
         return
-    df_main = pd.read_excel(MAIN_FILE, sheet_name="Новый с комментариями", dtype=str)
-    df_main = df_main.fillna("")
+    with timer.stage("load") as st:
+        df_main = pd.read_excel(MAIN_FILE, sheet_name="Новый с комментариями", dtype=str)
+        df_main = df_main.fillna("")
+        st["rows"] += len(df_main)
     # Добавляем ID в основной DataFrame
-    df_main['_id'] = df_main.apply(lambda row: get_vuln_id(row, COLUMN_MAPPING), axis=1)
+    with timer.stage("hash", len(df_main)):
+        df_main['_id'] = compute_vuln_keys(df_main, COLUMN_MAPPING)
     # Запомним исходные индексы (порядок строк)
     df_main['_main_index'] = range(1, len(df_main) + 1)
     
     print(f"Основной файл: {MAIN_FILE}")
     print(f"Строк на листе 'Новый с комментариями': {len(df_main)}")
     
-    # 2. Находим все Excel-файлы в папке (кроме основного)
-    pattern = os.path.join(REPORTS_FOLDER, "*.xlsx")
-    all_files = glob.glob(pattern)
+    # 2. Находим все файлы отчётов в папке (кроме основного)
+    all_files = [f for pattern in REPORT_PATTERNS for f in glob.glob(os.path.join(REPORTS_FOLDER, pattern))]
     # Исключаем основной файл (по полному пути)
     main_full = os.path.abspath(MAIN_FILE)
     other_files = [f for f in all_files if os.path.abspath(f) != main_full]
+    # Фиксированный порядок: по дате, затем по пути
+    other_files.sort(key=lambda f: (extract_date_from_filename(f), f))
     
-    if not other_files:
-        print("Не найдено дополнительных файлов отчётов.")
-        return
-    
-    print(f"Найдено дополнительных файлов: {len(other_files)}")
-    
-    # 3. Загружаем все дополнительные файлы с их ID, датами, номерами строк
-    sources = []  # список словарей: id, filepath, row_number, date
-    for fpath in other_files:
-        try:
-            df = load_report_with_ids(fpath, COLUMN_MAPPING)
-            date = extract_date_from_filename(fpath)
-            for idx, row in df.iterrows():
-                vid = row['_id']
-                sources.append({
-                    'id': vid,
-                    'filepath': fpath,
-                    'filename': os.path.basename(fpath),
-                    'row_number': row['_original_index'],
-                    'date': date,
-                    'date_str': date.strftime("%Y-%m-%d")
-                })
-            print(f"  Загружен: {os.path.basename(fpath)} ({len(df)} записей)")
-        except Exception as e:
-            print(f"  Ошибка при загрузке {fpath}: {e}")
-    
-    if not sources:
-        print("Не удалось загрузить данные из дополнительных файлов.")
-        return
-    
-    # 4. Для каждой строки основного файла собираем все совпадения из sources
-    # Создаём список для нового листа
-    rows_for_new_sheet = []
-    for idx, main_row in df_main.iterrows():
-        main_id = main_row['_id']
-        main_index = main_row['_main_index']
-        # Ищем все источники с таким же id
-        matches = [s for s in sources if s['id'] == main_id]
-        if matches:
-            for m in matches:
-                rows_for_new_sheet.append({
-                    '№ строки в основном файле': main_index,
-                    'ID уязвимости': main_id,
-                    'IP': main_row.get(COLUMN_MAPPING['ip'], ''),
-                    'Наименование уязвимости': main_row.get(COLUMN_MAPPING['vuln_name'], ''),
-                    'Порты': main_row.get(COLUMN_MAPPING['ports'], ''),
-                    'Комментарий (из основного)': main_row.get(COLUMN_MAPPING['comment'], ''),
-                    'Пачка (из основного)': main_row.get(COLUMN_MAPPING['pack'], ''),
-                    'Имя файла-источника': m['filename'],
-                    'Ссылка на файл': m['filepath'],
-                    'Номер строки в файле': m['row_number'],
-                    'Дата отправки (из имени файла)': m['date_str']
-                })
+    with timer.stage("load") as st:
+        if COMMENT_DB:
+            # 3. Источники берутся из базы; в неё добавляются только новые/изменённые файлы папки
+            conn = connect(COMMENT_DB)
+            print(f"База комментариев: {COMMENT_DB}")
+            synced = sync_reports(conn, other_files, COLUMN_MAPPING, extract_date_from_filename,
+                                  WORKERS, CACHE_DIR, CACHE_MAX_BYTES)
+            for fpath, error in synced:
+                if error is None:
+                    print(f"  Добавлен в базу: {os.path.basename(fpath)}")
+                else:
+                    print(f"  Ошибка при загрузке {fpath}: {error}")
+            reports_in_db = report_count(conn, COLUMN_MAPPING, exclude=MAIN_FILE)
+            sources = find_sources(conn, df_main['_id'], COLUMN_MAPPING, exclude=MAIN_FILE)
+            conn.close()
+            print(f"Отчётов в базе: {reports_in_db}")
+            if not reports_in_db:
+                print("Не удалось загрузить данные из дополнительных файлов.")
+                return
         else:
-            # Если не найдено ни одного источника, тоже добавим строку с пустыми полями
-            rows_for_new_sheet.append({
-                '№ строки в основном файле': main_index,
-                'ID уязвимости': main_id,
-                'IP': main_row.get(COLUMN_MAPPING['ip'], ''),
-                'Наименование уязвимости': main_row.get(COLUMN_MAPPING['vuln_name'], ''),
-                'Порты': main_row.get(COLUMN_MAPPING['ports'], ''),
-                'Комментарий (из основного)': main_row.get(COLUMN_MAPPING['comment'], ''),
-                'Пачка (из основного)': main_row.get(COLUMN_MAPPING['pack'], ''),
-                'Имя файла-источника': '',
-                'Ссылка на файл': '',
-                'Номер строки в файле': '',
-                'Дата отправки (из имени файла)': ''
-            })
+            if not other_files:
+                print("Не найдено дополнительных файлов отчётов.")
+                return
+        
+            print(f"Найдено дополнительных файлов: {len(other_files)}")
+        
+            # 3. Загружаем все дополнительные файлы: по каждой строке — id, файл, номер строки, дата.
+            # Данные собираются в колонки (по одному DataFrame на файл), а не в список словарей.
+            source_frames = []
+            report_loader = load_report_ids_streaming if STREAM_CHUNK_SIZE else load_report_with_ids
+            loaded = load_reports(other_files, COLUMN_MAPPING, report_loader, WORKERS, CACHE_DIR, CACHE_MAX_BYTES)
+            for fpath, df, error in loaded:
+                try:
+                    if error is not None:
+                        raise error
+                    source_frames.append(sources_frame(fpath, df, extract_date_from_filename(fpath)))
+                    st["rows"] += len(df)
+                    print(f"  Загружен: {os.path.basename(fpath)} ({len(df)} записей)")
+                except Exception as e:
+                    print(f"  Ошибка при загрузке {fpath}: {e}")
+        
+            sources = pd.concat(source_frames, ignore_index=True) if source_frames else pd.DataFrame()
+            if sources.empty:
+                print("Не удалось загрузить данные из дополнительных файлов.")
+                return
     
-    df_sources = pd.DataFrame(rows_for_new_sheet)
+    # 4. Для каждой строки основного файла собираем все совпадения из sources
+    with timer.stage("match", len(df_main)):
+        df_sources = build_sources_sheet(df_main, sources, COLUMN_MAPPING, get_engine(ENGINE))
     
-    # 5. Добавляем новый лист в основной Excel-файл
-    with pd.ExcelWriter(MAIN_FILE, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-        df_sources.to_excel(writer, sheet_name='Источники комментариев', index=False)
+    # 5. Добавляем новый лист в основной Excel-файл: файл перечитывается, остальные листы переносятся
+    # построчно (xlsx_writer.replace_sheets). compare_multiple_reports.py с ADD_SOURCES_SHEET пишет
+    # этот лист сразу, без перечитывания; этот скрипт — для уже готовых файлов.
+    # Лист замеров — по этапам, завершённым до записи
+    sheets = [('Источники комментариев', df_sources)]
+    if TIMINGS_SHEET:
+        sheets.append(('Производительность источников', timer.to_frame()))
+    with timer.stage("write", len(df_sources)):
+        replace_sheets(MAIN_FILE, sheets)
     
     print(f"\n✅ В файл {MAIN_FILE} добавлен лист 'Источники комментариев'")
     print(f"   Всего записей на листе: {len(df_sources)}")
     print(f"   Из них с найденными источниками: {len(df_sources[df_sources['Имя файла-источника'] != ''])}")
+    timer.print_summary()
+    if TIMINGS_FILE:
+        timer.write_json(TIMINGS_FILE)
+        print(f"Замеры этапов сохранены: {TIMINGS_FILE}")
     
     # Дополнительно: если хотите сохранить копию с новым именем, раскомментируйте:
     # backup = MAIN_FILE.replace('.xlsx', '_with_sources.xlsx')
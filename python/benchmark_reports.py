@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Замеры времени и памяти скриптов сравнения на синтетических отчётах (generate_reports.py).
+
+Для каждого размера генерируются наборы данных, затем по очереди запускаются
+compare_excel_nessus_reports.py, compare_excel_nessus_reports_adv.py,
+compare_multiple_reports.py и add_source_to_main_report.py (каждый — отдельным процессом).
+Снимаются время (wall/CPU) и пиковый RSS процесса, а также замеры этапов
+(load/hash/match/write), которые скрипт пишет в TIMINGS_FILE. Результат сохраняется в JSON;
+с --baseline результаты сравниваются с прошлым замером и выводятся регрессии.
+С --engines скрипты с настройкой ENGINE запускаются с каждым движком (report_engine.py),
+а их листы сравниваются по ячейкам: при расхождении код выхода 1.
+
+Пример:
+    python3 benchmark_reports.py --sizes 1000,10000,100000 --history 5 --set WORKERS=4
+    python3 benchmark_reports.py --sizes 10000 --baseline bench_results/bench_20240101_120000.json
+    python3 benchmark_reports.py --sizes 10000 --engines pandas,duckdb,polars
+"""
+
+import argparse
+import ast
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import generate_reports
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Скрипт -> набор данных; порядок важен: add_source читает результат compare_multiple
+SCRIPTS = [
+    ("compare_excel_nessus_reports", "pair"),
+    ("compare_excel_nessus_reports_adv", "pair"),
+    ("compare_multiple_reports", "multi"),
+    ("add_source_to_main_report", "multi"),
+]
+
+# Скрипты с настройкой ENGINE -> файл результата в рабочем каталоге
+ENGINE_SCRIPTS = {
+    "compare_multiple_reports": "comparison_result.xlsx",
+    "add_source_to_main_report": "comparison_result.xlsx",
+}
+
+# Запуск main() модуля с подменой настроек (словарь настроек — через update)
+RUNNER = """
+import json, sys
+sys.path.insert(0, sys.argv[1])
+module = __import__(sys.argv[2])
+for name, value in json.loads(sys.argv[3]).items():
+    current = getattr(module, name, None)
+    if isinstance(current, dict) and isinstance(value, dict):
+        current.update(value)
+    else:
+        setattr(module, name, value)
+module.main()
+"""
+
+
+def run_script(script, workdir, overrides, timeout, log_path):
+    """
+    Запускает скрипт в workdir, возвращает (wall_s, cpu_s, max_rss_mb, returncode).
+    Без os.wait4 (Windows) CPU и пик памяти процесса не измеряются — None.
+    """
+    cmd = [sys.executable, "-c", RUNNER, SCRIPT_DIR, script, json.dumps(overrides, ensure_ascii=False)]
+    with open(log_path, "w", encoding="utf-8") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+        if not hasattr(os, "wait4"):
+            try:
+                proc.wait(timeout or None)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+                proc.returncode = None
+            return time.perf_counter() - start, None, None, proc.returncode
+        while True:
+            pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if timeout and time.perf_counter() - start > timeout:
+                proc.kill()
+                pid, status, usage = os.wait4(proc.pid, 0)
+                status = None
+                break
+            time.sleep(0.05)
+        wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status) if status is not None else None
+    # ru_maxrss: КБ в Linux, байты в macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return wall, usage.ru_utime + usage.ru_stime, rss_mb, proc.returncode
+
+
+def _measure(value, unit, digits):
+    """Значение замера для вывода (None — не измерялось)."""
+    return f"{value:8.{digits}f} {unit}" if value is not None else f"{'—':>8} {unit}"
+
+
+def prepare_data(base_dir, layout, rows, args):
+    """Генерирует набор данных (или использует уже сгенерированный с теми же параметрами)."""
+    out_dir = os.path.join(base_dir, f"{layout}_{rows}")
+    params = {"layout": layout, "rows": rows, "history": args.history, "overlap": args.overlap,
+              "comments": args.comments, "seed": args.seed}
+    marker = os.path.join(out_dir, "params.json")
+    if os.path.exists(marker):
+        with open(marker, encoding="utf-8") as f:
+            if json.load(f) == params:
+                return out_dir
+    gen_args = generate_reports.build_parser().parse_args([
+        out_dir, "--layout", layout, "--rows", str(rows), "--history", str(args.history),
+        "--overlap", str(args.overlap), "--comments", str(args.comments), "--seed", str(args.seed)])
+    generate_reports.generate(gen_args)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    return out_dir
+
+
+def compare_engine_outputs(paths):
+    """
+    Сравнивает результаты одного скрипта с разными движками (движок -> путь к xlsx) по ячейкам,
+    кроме листов замеров. Возвращает список расхождений (пустой — листы совпадают).
+    """
+    books = {engine: pd.read_excel(path, sheet_name=None, dtype=str) for engine, path in paths.items()}
+    (first, reference), *others = books.items()
+    problems = []
+    for engine, book in others:
+        if list(book) != list(reference):
+            problems.append(f"{engine}: листы {list(book)} вместо {list(reference)} ({first})")
+            continue
+        for sheet, df in book.items():
+            if sheet.startswith("Производительность"):
+                continue
+            if not df.fillna("").equals(reference[sheet].fillna("")):
+                problems.append(f"{engine}: лист '{sheet}' отличается от {first}")
+    return problems
+
+
+def compare_with_baseline(results, baseline_path, threshold):
+    """Печатает сравнение с прошлым замером, возвращает число регрессий."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["script"], r["rows"], r.get("engine")): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nСравнение с {baseline_path} (порог x{threshold}):")
+    for r in results:
+        old = baseline.get((r["script"], r["rows"], r.get("engine")))
+        if not old or not old["wall_s"] or r["returncode"] != 0:
+            continue
+        wall_ratio = r["wall_s"] / old["wall_s"]
+        rss_ratio = r["max_rss_mb"] / old["max_rss_mb"] if r["max_rss_mb"] and old["max_rss_mb"] else 1.0
+        mark = ""
+        if wall_ratio > threshold or rss_ratio > threshold:
+            mark = "  <-- РЕГРЕССИЯ"
+            regressions += 1
+        print(f"  {r['script']:<36} {r['engine'] or '':<7} {r['rows']:>9}  время x{wall_ratio:.2f}  память x{rss_ratio:.2f}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры скриптов сравнения отчётов Nessus")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="строк в отчёте, через запятую (до 1000000)")
+    parser.add_argument("--history", type=int, default=5, help="число отчётов для compare_multiple_reports")
+    parser.add_argument("--overlap", type=float, default=0.9)
+    parser.add_argument("--comments", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scripts", default=",".join(s for s, _ in SCRIPTS), help="какие скрипты запускать")
+    parser.add_argument("--set", action="append", default=[], metavar="ИМЯ=ЗНАЧЕНИЕ",
+                        help="подменить настройку скриптов, например WORKERS=4 (можно несколько раз)")
+    parser.add_argument("--data-dir", default="bench_data", help="каталог для синтетических отчётов")
+    parser.add_argument("--output", help="JSON с результатами (по умолчанию bench_results/bench_<время>.json)")
+    parser.add_argument("--baseline", help="JSON прошлого замера для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.2, help="во сколько раз хуже — регрессия")
+    parser.add_argument("--timeout", type=float, default=0, help="ограничение времени на запуск, сек (0 — нет)")
+    parser.add_argument("--engines", help="движки через запятую (pandas,duckdb,polars): запуск с каждым и сравнение листов")
+    args = parser.parse_args()
+
+    settings = {"CACHE_DIR": None}          # по умолчанию — холодный запуск без кэша
+    for item in args.set:
+        name, value = item.split("=", 1)
+        try:
+            settings[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            settings[name] = value
+    selected = args.scripts.split(",")
+    sizes = [int(s) for s in args.sizes.split(",")]
+    engines = args.engines.split(",") if args.engines else []
+
+    results = []
+    mismatches = []
+    for rows in sizes:
+        print(f"\n=== {rows} строк ===")
+        for script, layout in SCRIPTS:
+            if script not in selected:
+                continue
+            workdir = prepare_data(args.data_dir, layout, rows, args)
+            engine_outputs = {}
+            for engine in (engines if engines and script in ENGINE_SCRIPTS else [None]):
+                suffix = f".{engine}" if engine else ""
+                log_path = os.path.join(workdir, f"{script}{suffix}.log")
+                timings_path = os.path.join(workdir, f"{script}{suffix}.timings.json")
+                if os.path.exists(timings_path):
+                    os.remove(timings_path)
+                if script == "compare_multiple_reports":
+                    # Результат прошлого запуска лежит в той же папке и был бы прочитан как самый новый отчёт
+                    stale = os.path.join(workdir, ENGINE_SCRIPTS[script])
+                    if os.path.exists(stale):
+                        os.remove(stale)
+                overrides = dict(settings, TIMINGS_FILE=os.path.abspath(timings_path))
+                if engine:
+                    overrides["ENGINE"] = engine
+                wall, cpu, rss, rc = run_script(script, workdir, overrides, args.timeout, log_path)
+                stages = []
+                if os.path.exists(timings_path):
+                    with open(timings_path, encoding="utf-8") as f:
+                        stages = json.load(f)["stages"]
+                if engine and rc == 0:
+                    # Копии — в подкаталог: файлы в самой папке скрипты прочитали бы как отчёты
+                    os.makedirs(os.path.join(workdir, "engines"), exist_ok=True)
+                    engine_outputs[engine] = os.path.join(workdir, "engines", f"{script}{suffix}.xlsx")
+                    shutil.copyfile(os.path.join(workdir, ENGINE_SCRIPTS[script]), engine_outputs[engine])
+                total_rows = rows * (2 if layout == "pair" else args.history)
+                results.append({
+                    "script": script,
+                    "engine": engine,
+                    "rows": rows,
+                    "history": 2 if layout == "pair" else args.history,
+                    "wall_s": round(wall, 3),
+                    "cpu_s": round(cpu, 3) if cpu is not None else None,
+                    "max_rss_mb": round(rss, 1) if rss is not None else None,
+                    "rows_per_s": round(total_rows / wall, 1) if wall else None,
+                    "returncode": rc,
+                    "stages": stages,           # замеры этапов изнутри скрипта (stage_timer)
+                })
+                status = "ок" if rc == 0 else ("таймаут" if rc is None else f"код {rc}, см. {log_path}")
+                print(f"  {script:<36} {engine or '':<7} {wall:8.2f} с  CPU {_measure(cpu, 'с', 2)}  "
+                      f"RSS {_measure(rss, 'МБ', 1)}  [{status}]")
+            if len(engine_outputs) > 1:
+                problems = compare_engine_outputs(engine_outputs)
+                for problem in problems:
+                    print(f"  РАСХОЖДЕНИЕ {script}, {problem}")
+                if not problems:
+                    print(f"  Листы {script} совпадают: {', '.join(engine_outputs)}")
+                mismatches += problems
+
+    output = args.output or os.path.join("bench_results", f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "settings": settings,
+            "engines": engines,
+            "params": {"history": args.history, "overlap": args.overlap, "comments": args.comments, "seed": args.seed},
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены: {output}")
+
+    if args.baseline and compare_with_baseline(results, args.baseline, args.threshold):
+        sys.exit(1)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Локальная база комментариев (SQLite) по всем загруженным отчётам.
+
+Каждый отчёт загружается в базу один раз: по каждой строке хранятся _id, номер строки,
+комментарий и пачка, а также файл и дата отчёта. Скрипты сравнения берут из базы
+последний непустой комментарий и список источников, не перечитывая старые xlsx.
+
+Загрузка отчётов вручную:
+    python3 comment_store.py <база.sqlite> <отчёт.xlsx> [<отчёт.xlsx> ...]
+"""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from report_cache import DEFAULT_MAX_BYTES, col_map_key, file_hash
+from report_pool import load_reports
+from vuln_id import index_by_key
+from xlsx_stream import load_ids_streaming
+
+# Ключ набора колонок в базе не зависит от версии кэша (report_cache.CACHE_VERSION):
+# смена формата кэша не требует перезагрузки отчётов в базу
+STORE_KEY_VERSION = 1
+
+REPORTS_TABLE = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,             -- путь в том виде, как его передали (для вывода)
+    abspath TEXT NOT NULL,
+    col_map_key TEXT NOT NULL,      -- набор колонок, по которому посчитаны _id
+    date TEXT NOT NULL,             -- ISO-дата отчёта (из имени файла или mtime)
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL,
+    UNIQUE (abspath, col_map_key)
+);
+"""
+FINDINGS_TABLE = """
+CREATE TABLE IF NOT EXISTS findings (
+    report_id INTEGER NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+    row INTEGER NOT NULL,           -- номер строки в файле (1-based)
+    vuln_id INTEGER NOT NULL,       -- ключ _id (int64, vuln_id.compute_vuln_keys)
+    comment TEXT NOT NULL,
+    pack TEXT NOT NULL,
+    is_first INTEGER NOT NULL,      -- первая строка с таким _id в этом отчёте
+    has_value INTEGER NOT NULL,     -- комментарий или пачка не пустые
+    PRIMARY KEY (report_id, row)
+);
+"""
+FINDINGS_INDEX = "CREATE INDEX IF NOT EXISTS findings_vuln_id ON findings (vuln_id);"
+SCHEMA = REPORTS_TABLE + FINDINGS_TABLE + FINDINGS_INDEX
+
+
+def _store_key(col_map):
+    return col_map_key(col_map, STORE_KEY_VERSION)
+
+
+def connect(db_path):
+    """Открывает (и при необходимости создаёт) базу комментариев."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def load_for_store(filepath, col_map):
+    """Загрузчик для базы: потоково, только _id, номер строки, комментарий и пачка."""
+    return load_ids_streaming(filepath, col_map, ("comment", "pack"))
+
+
+def ingest_report(conn, filepath, df, date, col_map):
+    """
+    Записывает строки отчёта в базу (прежняя версия того же файла заменяется).
+    df: DataFrame с колонками _id, _original_index и колонками комментария/пачки из col_map.
+    """
+    st = os.stat(filepath)
+    comment = df[col_map['comment']] if col_map['comment'] in df.columns else pd.Series("", index=df.index)
+    pack = df[col_map['pack']] if col_map['pack'] in df.columns else pd.Series("", index=df.index)
+    is_first = ~df['_id'].duplicated(keep='first')
+    # Пустая строка (или только пробелы) — не комментарий
+    has_value = (comment.str.strip() != "") | (pack.str.strip() != "")
+    with conn:
+        conn.execute("DELETE FROM reports WHERE abspath = ? AND col_map_key = ?",
+                     (os.path.abspath(filepath), _store_key(col_map)))
+        cur = conn.execute(
+            "INSERT INTO reports (path, abspath, col_map_key, date, size, mtime_ns, sha256, rows, ingested_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (filepath, os.path.abspath(filepath), _store_key(col_map), date.isoformat(),
+             st.st_size, st.st_mtime_ns, file_hash(filepath), len(df), datetime.now().isoformat()))
+        report_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO findings (report_id, row, vuln_id, comment, pack, is_first, has_value) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            zip([report_id] * len(df), df['_original_index'].astype(int).tolist(), df['_id'].tolist(),
+                comment.tolist(), pack.tolist(), is_first.astype(int).tolist(), has_value.astype(int).tolist()))
+    return report_id
+
+
+def is_ingested(conn, filepath, col_map):
+    """Файл уже в базе и не менялся (размер+mtime, при их изменении — хэш содержимого)."""
+    row = conn.execute(
+        "SELECT id, size, mtime_ns, sha256 FROM reports WHERE abspath = ? AND col_map_key = ?",
+        (os.path.abspath(filepath), _store_key(col_map))).fetchone()
+    if row is None:
+        return False
+    report_id, size, mtime_ns, sha256 = row
+    st = os.stat(filepath)
+    if size == st.st_size and mtime_ns == st.st_mtime_ns:
+        return True
+    if size == st.st_size and sha256 == file_hash(filepath):
+        with conn:
+            conn.execute("UPDATE reports SET mtime_ns = ? WHERE id = ?", (st.st_mtime_ns, report_id))
+        return True
+    return False
+
+
+def sync_reports(conn, filepaths, col_map, date_func, workers=1, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Загружает в базу только новые и изменённые файлы из filepaths.
+    Возвращает список (filepath, error) по загруженным (error = None при успехе).
+    """
+    todo = [f for f in filepaths if not is_ingested(conn, f, col_map)]
+    results = []
+    for fpath, df, error in load_reports(todo, col_map, load_for_store, workers, cache_dir, max_bytes):
+        if error is None:
+            try:
+                ingest_report(conn, fpath, df, date_func(fpath), col_map)
+            except Exception as e:
+                error = e
+        results.append((fpath, error))
+    return results
+
+
+def _fill_target_ids(conn, ids):
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS target_ids (vuln_id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM target_ids")
+    conn.executemany("INSERT OR IGNORE INTO target_ids VALUES (?)", ((i,) for i in pd.unique(ids).tolist()))
+
+
+def _source_filter(col_map, exclude=None, target=None, with_target=False):
+    """
+    Условие на отчёты-источники (псевдоним таблицы r) и его параметры: набор колонок col_map,
+    без файла exclude. target — (дата, файл) целевого отчёта: только отчёты раньше него
+    (при равной дате — с меньшим путём, как в порядке файлов compare_multiple_reports.py),
+    с with_target — и сам целевой отчёт.
+    """
+    exclude = os.path.abspath(exclude) if exclude else ""
+    sql = "r.col_map_key = ? AND r.abspath != ?"
+    params = [_store_key(col_map), exclude]
+    if target is not None:
+        date, filepath = target
+        sql += f" AND (r.date < ? OR (r.date = ? AND r.abspath {'<=' if with_target else '<'} ?))"
+        params += [date.isoformat(), date.isoformat(), os.path.abspath(filepath)]
+    return sql, params
+
+
+def report_count(conn, col_map, exclude=None, target_date=None):
+    """Число отчётов-источников в базе для данного набора колонок (см. _source_filter)."""
+    where, params = _source_filter(col_map, exclude, (target_date, exclude) if target_date else None)
+    return conn.execute(f"SELECT COUNT(*) FROM reports r WHERE {where}", params).fetchone()[0]
+
+
+def latest_comments(conn, ids, col_map, exclude=None, target_date=None):
+    """
+    Для _id из ids — самый свежий непустой комментарий/пачка (как build_latest_comment_index):
+    в каждом отчёте смотрится первая строка с данным _id, пустые пропускаются.
+    exclude — файл, который не считается источником (целевой отчёт), target_date — его дата:
+    источниками считаются только более ранние отчёты (см. _source_filter).
+    Из отчётов с одной датой выигрывает отчёт с меньшим путём — как у build_latest_comment_index
+    при порядке файлов по дате, затем по пути.
+    Возвращает DataFrame с индексом _id и колонками comment, pack, filepath, row, date.
+    """
+    where, params = _source_filter(col_map, exclude, (target_date, exclude) if target_date else None)
+    _fill_target_ids(conn, ids)
+    rows = conn.execute(f"""
+        SELECT vuln_id, comment, pack, path, row, date FROM (
+            SELECT f.vuln_id, f.comment, f.pack, r.path, f.row, r.date,
+                   ROW_NUMBER() OVER (PARTITION BY f.vuln_id ORDER BY r.date DESC, r.abspath, r.id) AS rn
+            FROM target_ids t
+            JOIN findings f ON f.vuln_id = t.vuln_id
+            JOIN reports r ON r.id = f.report_id
+            WHERE f.is_first = 1 AND f.has_value = 1 AND {where}
+        ) WHERE rn = 1
+    """, params).fetchall()
+    latest = pd.DataFrame(rows, columns=['_id', 'comment', 'pack', 'filepath', 'row', 'date'], dtype=object)
+    latest['date'] = latest['date'].str[:10]
+    latest['_id'] = latest['_id'].astype('int64')
+    return index_by_key(latest)
+
+
+def find_sources(conn, ids, col_map, exclude=None, target=None):
+    """
+    Все вхождения _id из ids во всех отчётах базы (кроме exclude),
+    по порядку: дата отчёта, путь, номер строки. target — (дата, файл) целевого отчёта:
+    только отчёты не позже него, включая его самого (см. _source_filter).
+    Колонки как у sources_sheet.sources_frame: id, filepath, filename, row_number, date_str.
+    """
+    where, params = _source_filter(col_map, exclude, target, with_target=True)
+    _fill_target_ids(conn, ids)
+    rows = conn.execute(f"""
+        SELECT f.vuln_id, r.path, f.row, r.date
+        FROM target_ids t
+        JOIN findings f ON f.vuln_id = t.vuln_id
+        JOIN reports r ON r.id = f.report_id
+        WHERE {where}
+        ORDER BY r.date, r.path, f.row
+    """, params).fetchall()
+    sources = pd.DataFrame(rows, columns=['id', 'filepath', 'row_number', 'date_str'], dtype=object)
+    sources.insert(2, 'filename', [os.path.basename(p) for p in sources['filepath']])
+    sources['date_str'] = sources['date_str'].str[:10]
+    sources['id'] = sources['id'].astype('int64')
+    return sources
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Использование: python3 comment_store.py <база.sqlite> <отчёт.xlsx> [<отчёт.xlsx> ...]")
+        sys.exit(1)
+
+    from compare_multiple_reports import COLUMN_MAPPING, extract_date_from_filename
+
+    conn = connect(sys.argv[1])
+    files = sys.argv[2:]
+    results = sync_reports(conn, files, COLUMN_MAPPING, extract_date_from_filename)
+    for fpath, error in results:
+        if error is None:
+            print(f"  Загружен: {os.path.basename(fpath)}")
+        else:
+            print(f"  Ошибка при загрузке {fpath}: {error}")
+    print(f"Новых/изменённых файлов: {len(results)}, уже были в базе: {len(files) - len(results)}")
+    print(f"Всего отчётов в базе: {report_count(conn, COLUMN_MAPPING)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 import pandas as pd
-import hashlib
-import re
 from datetime import datetime
 
+import stage_timer
+from nessus_xml import is_nessus_file, read_nessus
+from vuln_id import compute_vuln_keys
+
 # ========== НАСТРОЙКИ ==========
 FILE_OLD = "old_report.xlsx"      # Первый (старый) файл
 FILE_NEW = "new_report.xlsx"      # Второй (новый) файл
 OUTPUT_FILE = "comparison_result.xlsx"
+TIMINGS_FILE = None               # JSON с замерами этапов (время, CPU, память); None — не сохранять
+TIMINGS_SHEET = False             # Добавить лист "Производительность" с замерами этапов
 
 # Точные названия колонок (при необходимости отредактируйте)
 COLUMN_MAPPING = {
@@ -28,35 +32,27 @@ COLUMN_MAPPING = {
 }
 # ================================
 
-def get_vuln_id(row):
-    """Формирует уникальный идентификатор уязвимости на основе IP + названия + портов"""
-    ip = str(row.get(COLUMN_MAPPING["ip"], ""))
-    vuln = str(row.get(COLUMN_MAPPING["vuln_name"], ""))
-    ports = str(row.get(COLUMN_MAPPING["ports"], ""))
-    
-    # Нормализация портов: удаляем пробелы, сортируем числа
-    ports_normalized = re.sub(r'\s+', '', ports.lower())
-    if ',' in ports_normalized:
-        parts = [p for p in ports_normalized.split(',') if p.isdigit()]
-        ports_normalized = ','.join(sorted(parts, key=int))
-    
-    unique_str = f"{ip}|{vuln}|{ports_normalized}"
-    return hashlib.md5(unique_str.encode('utf-8')).hexdigest()
-
 def load_excel_with_ids(file_path):
-    """Загружает Excel, добавляет колонку с ID и возвращает DataFrame и множество ID"""
-    df = pd.read_excel(file_path, sheet_name=0, dtype=str)
-    df = df.fillna("")
+    """Загружает Excel (или .nessus), добавляет колонку с ID и возвращает DataFrame и множество ID"""
+    with stage_timer.stage("load") as st:
+        if is_nessus_file(file_path):
+            df = read_nessus(file_path, COLUMN_MAPPING)
+        else:
+            df = pd.read_excel(file_path, sheet_name=0, dtype=str)
+        df = df.fillna("")
+        st["rows"] += len(df)
     # Проверяем наличие всех необходимых колонок
     for col in COLUMN_MAPPING.values():
         if col not in df.columns:
             print(f"Внимание: колонка '{col}' не найдена в файле {file_path}")
     # Добавляем ID
-    df['_id'] = df.apply(get_vuln_id, axis=1)
+    with stage_timer.stage("hash", len(df)):
+        df['_id'] = compute_vuln_keys(df, COLUMN_MAPPING)
     return df, set(df['_id'])
 
 def main():
     print("=== Сравнение двух отчётов Nessus ===\n")
+    timer = stage_timer.start("compare_excel_nessus_reports")
     
     # Загружаем файлы
     print(f"Чтение старого файла: {FILE_OLD}")
@@ -67,45 +63,53 @@ def main():
     df_new, ids_new = load_excel_with_ids(FILE_NEW)
     print(f"  Записей: {len(df_new)}")
     
-    # Находим пересечение и разность
-    common_ids = ids_old.intersection(ids_new)      # ID, которые есть в обоих файлах
-    unique_ids = ids_new.difference(ids_old)        # ID, которые есть только в новом файле
+    with timer.stage("match", len(df_old) + len(df_new)):
+        # Находим пересечение и разность
+        common_ids = ids_old.intersection(ids_new)      # ID, которые есть в обоих файлах
+        unique_ids = ids_new.difference(ids_old)        # ID, которые есть только в новом файле
     
-    # Формируем DataFrame для одинаковых записей (из старого файла)
-    df_common = df_old[df_old['_id'].isin(common_ids)].copy()
-    df_common = df_common.drop(columns=['_id'])
+        # Формируем DataFrame для одинаковых записей (из старого файла)
+        df_common = df_old[df_old['_id'].isin(common_ids)].copy()
+        df_common = df_common.drop(columns=['_id'])
     
-    # Формируем DataFrame для уникальных записей (из нового файла)
-    df_unique = df_new[df_new['_id'].isin(unique_ids)].copy()
-    df_unique = df_unique.drop(columns=['_id'])
+        # Формируем DataFrame для уникальных записей (из нового файла)
+        df_unique = df_new[df_new['_id'].isin(unique_ids)].copy()
+        df_unique = df_unique.drop(columns=['_id'])
     
-    # Статистика
-    stats_data = {
-        "Показатель": [
-            "Количество записей в старом файле",
-            "Количество записей в новом файле",
-            "Количество одинаковых записей (присутствуют в обоих файлах)",
-            "Количество уникальных записей в новом файле"
-        ],
-        "Значение": [
-            len(df_old),
-            len(df_new),
-            len(df_common),
-            len(df_unique)
-        ]
-    }
-    df_stats = pd.DataFrame(stats_data)
+        # Статистика
+        stats_data = {
+            "Показатель": [
+                "Количество записей в старом файле",
+                "Количество записей в новом файле",
+                "Количество одинаковых записей (присутствуют в обоих файлах)",
+                "Количество уникальных записей в новом файле"
+            ],
+            "Значение": [
+                len(df_old),
+                len(df_new),
+                len(df_common),
+                len(df_unique)
+            ]
+        }
+        df_stats = pd.DataFrame(stats_data)
     
-    # Сохраняем в Excel с тремя листами
-    with pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl') as writer:
-        df_stats.to_excel(writer, sheet_name="Статистика", index=False)
-        df_common.to_excel(writer, sheet_name="Одинаковые (из старого)", index=False)
-        df_unique.to_excel(writer, sheet_name="Уникальные (из нового)", index=False)
+    # Сохраняем в Excel с тремя листами (лист замеров — по этапам, завершённым до записи)
+    with timer.stage("write", len(df_stats) + len(df_common) + len(df_unique)):
+        with pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl') as writer:
+            df_stats.to_excel(writer, sheet_name="Статистика", index=False)
+            if TIMINGS_SHEET:
+                timer.to_frame().to_excel(writer, sheet_name="Производительность", index=False)
+            df_common.to_excel(writer, sheet_name="Одинаковые (из старого)", index=False)
+            df_unique.to_excel(writer, sheet_name="Уникальные (из нового)", index=False)
     
     print(f"\n✅ Результат сохранён в файл: {OUTPUT_FILE}")
     print(f"   - Лист 'Статистика' – общие цифры")
     print(f"   - Лист 'Одинаковые (из старого)' – {len(df_common)} записей")
     print(f"   - Лист 'Уникальные (из нового)' – {len(df_unique)} записей")
+    timer.print_summary()
+    if TIMINGS_FILE:
+        timer.write_json(TIMINGS_FILE)
+        print(f"Замеры этапов сохранены: {TIMINGS_FILE}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,12 +1,16 @@
 import pandas as pd
-import hashlib
-import re
 from datetime import datetime
 
+import stage_timer
+from nessus_xml import is_nessus_file, read_nessus
+from vuln_id import compute_vuln_keys, index_by_key
+
 # ========== НАСТРОЙКИ ==========
 FILE_OLD = "old_report.xlsx"
 FILE_NEW = "new_report.xlsx"
 OUTPUT_FILE = "comparison_result.xlsx"
+TIMINGS_FILE = None               # JSON с замерами этапов (время, CPU, память); None — не сохранять
+TIMINGS_SHEET = False             # Добавить лист "Производительность" с замерами этапов
 
 COLUMN_MAPPING = {
     "vuln_name": "Наименование уязвимости",
@@ -27,27 +31,39 @@ COLUMN_MAPPING = {
 }
 # ================================
 
-def get_vuln_id(row):
-    ip = str(row.get(COLUMN_MAPPING["ip"], ""))
-    vuln = str(row.get(COLUMN_MAPPING["vuln_name"], ""))
-    ports = str(row.get(COLUMN_MAPPING["ports"], ""))
-    
-    ports_normalized = re.sub(r'\s+', '', ports.lower())
-    if ',' in ports_normalized:
-        parts = [p for p in ports_normalized.split(',') if p.isdigit()]
-        ports_normalized = ','.join(sorted(parts, key=int))
-    
-    unique_str = f"{ip}|{vuln}|{ports_normalized}"
-    return hashlib.md5(unique_str.encode('utf-8')).hexdigest()
-
 def load_excel_with_ids(file_path):
-    df = pd.read_excel(file_path, sheet_name=0, dtype=str)
-    df = df.fillna("")
-    df['_id'] = df.apply(get_vuln_id, axis=1)
+    with stage_timer.stage("load") as st:
+        if is_nessus_file(file_path):
+            df = read_nessus(file_path, COLUMN_MAPPING)
+        else:
+            df = pd.read_excel(file_path, sheet_name=0, dtype=str)
+        df = df.fillna("")
+        st["rows"] += len(df)
+    with stage_timer.stage("hash", len(df)):
+        df['_id'] = compute_vuln_keys(df, COLUMN_MAPPING)
     return df
 
+def substitute_comments(df_old, df_new):
+    """
+    Копия нового отчёта (без _id), где для строк с _id из старого файла
+    комментарий и пачка взяты из старого — одним проходом по ключу, без цикла по ID.
+    Если в старом файле несколько строк с одним _id, берётся первая по порядку строк файла.
+    Значения переносятся как есть, в том числе пустые.
+    """
+    comment_col = COLUMN_MAPPING['comment']
+    pack_col = COLUMN_MAPPING['pack']
+    first_old = index_by_key(df_old.drop_duplicates(subset='_id', keep='first'))[[comment_col, pack_col]]
+    matched = df_new['_id'].isin(first_old.index).to_numpy()
+    result = df_new.copy()
+    if matched.any():
+        found = first_old.reindex(df_new['_id'][matched])
+        result.loc[matched, comment_col] = found[comment_col].to_numpy()
+        result.loc[matched, pack_col] = found[pack_col].to_numpy()
+    return result.drop(columns=['_id'])
+
 def main():
     print("=== Сравнение двух отчётов Nessus с подстановкой комментариев ===\n")
+    timer = stage_timer.start("compare_excel_nessus_reports_adv")
     
     df_old = load_excel_with_ids(FILE_OLD)
     df_new = load_excel_with_ids(FILE_NEW)
@@ -55,64 +71,57 @@ def main():
     print(f"Старый файл: {len(df_old)} записей")
     print(f"Новый файл: {len(df_new)} записей")
     
-    ids_old = set(df_old['_id'])
-    ids_new = set(df_new['_id'])
-    
-    common_ids = ids_old.intersection(ids_new)
-    unique_ids = ids_new.difference(ids_old)
+    with timer.stage("match", len(df_old) + len(df_new)):
+        ids_old = set(df_old['_id'])
+        ids_new = set(df_new['_id'])
     
-    # 1. Одинаковые записи (из старого)
-    df_common = df_old[df_old['_id'].isin(common_ids)].drop(columns=['_id'])
+        common_ids = ids_old.intersection(ids_new)
+        unique_ids = ids_new.difference(ids_old)
     
-    # 2. Уникальные записи (из нового)
-    df_unique = df_new[df_new['_id'].isin(unique_ids)].drop(columns=['_id'])
+        # 1. Одинаковые записи (из старого)
+        df_common = df_old[df_old['_id'].isin(common_ids)].drop(columns=['_id'])
     
-    # 3. Новый файл с подстановкой комментариев и пачки из старого
-    # Создаём словарь: id -> (comment, pack) из старого файла
-    comment_pack_dict = {}
-    for vid in common_ids:
-        old_row = df_old[df_old['_id'] == vid].iloc[0]
-        comment_pack_dict[vid] = (
-            old_row[COLUMN_MAPPING['comment']],
-            old_row[COLUMN_MAPPING['pack']]
-        )
+        # 2. Уникальные записи (из нового)
+        df_unique = df_new[df_new['_id'].isin(unique_ids)].drop(columns=['_id'])
     
-    # Копируем новый файл и подставляем значения
-    df_new_with_comments = df_new.copy()
-    # Для строк с совпадающим id заменяем comment и pack
-    for vid, (comm, pack_val) in comment_pack_dict.items():
-        mask = df_new_with_comments['_id'] == vid
-        df_new_with_comments.loc[mask, COLUMN_MAPPING['comment']] = comm
-        df_new_with_comments.loc[mask, COLUMN_MAPPING['pack']] = pack_val
+        # 3. Новый файл с подстановкой комментариев и пачки из старого
+        df_new_with_comments = substitute_comments(df_old, df_new)
     
-    df_new_with_comments = df_new_with_comments.drop(columns=['_id'])
+        # Статистика
+        stats_data = {
+            "Показатель": [
+                "Количество записей в старом файле",
+                "Количество записей в новом файле",
+                "Количество одинаковых записей",
+                "Количество уникальных записей в новом файле"
+            ],
+            "Значение": [
+                len(df_old),
+                len(df_new),
+                len(common_ids),
+                len(unique_ids)
+            ]
+        }
+        df_stats = pd.DataFrame(stats_data)
     
-    # Статистика
-    stats_data = {
-        "Показатель": [
-            "Количество записей в старом файле",
-            "Количество записей в новом файле",
-            "Количество одинаковых записей",
-            "Количество уникальных записей в новом файле"
-        ],
-        "Значение": [
-            len(df_old),
-            len(df_new),
-            len(common_ids),
-            len(unique_ids)
-        ]
-    }
-    df_stats = pd.DataFrame(stats_data)
     
-    # Сохраняем
-    with pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl') as writer:
-        df_stats.to_excel(writer, sheet_name="Статистика", index=False)
-        df_common.to_excel(writer, sheet_name="Одинаковые (из старого)", index=False)
-        df_unique.to_excel(writer, sheet_name="Уникальные (из нового)", index=False)
-        df_new_with_comments.to_excel(writer, sheet_name="Новый с комментариями", index=False)
+    # Сохраняем (лист замеров — по этапам, завершённым до записи)
+    written_rows = len(df_stats) + len(df_common) + len(df_unique) + len(df_new_with_comments)
+    with timer.stage("write", written_rows):
+        with pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl') as writer:
+            df_stats.to_excel(writer, sheet_name="Статистика", index=False)
+            if TIMINGS_SHEET:
+                timer.to_frame().to_excel(writer, sheet_name="Производительность", index=False)
+            df_common.to_excel(writer, sheet_name="Одинаковые (из старого)", index=False)
+            df_unique.to_excel(writer, sheet_name="Уникальные (из нового)", index=False)
+            df_new_with_comments.to_excel(writer, sheet_name="Новый с комментариями", index=False)
     
     print(f"\n✅ Результат сохранён в {OUTPUT_FILE}")
     print(f"   - Лист 'Новый с комментариями' содержит все строки нового файла, для совпавших уязвимостей проставлены 'Комментарий' и 'Пачка' из старого")
+    timer.print_summary()
+    if TIMINGS_FILE:
+        timer.write_json(TIMINGS_FILE)
+        print(f"Замеры этапов сохранены: {TIMINGS_FILE}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
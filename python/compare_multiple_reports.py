@@ -1,15 +1,48 @@
 import pandas as pd
-import hashlib
 import re
 import os
 import glob
 from datetime import datetime
 from pathlib import Path
 
+import stage_timer
+from comment_store import (connect, find_sources, ingest_report, is_ingested, latest_comments,
+                           report_count, sync_reports)
+from fuzzy_match import fuzzy_match
+from nessus_xml import is_nessus_file, read_nessus
+from report_cache import load_with_cache
+from report_engine import get_engine
+from report_pool import load_reports, resolve_workers
+from sources_sheet import build_sources_sheet, sources_frame
+from vuln_id import compute_vuln_keys, index_by_key
+from xlsx_stream import load_ids_streaming
+from xlsx_writer import write_sheets
+
 # ========== НАСТРОЙКИ ==========
 INPUT_FOLDER = "."                     # Каталог с файлами отчётов
+REPORT_PATTERNS = ("*.xlsx", "*.nessus")  # Excel-выгрузки и исходные файлы Nessus (v2)
 DATE_PATTERN = r"(\d{4}[.-]\d{2}[.-]\d{2})"  # извлечение даты
 OUTPUT_FILE = "comparison_result.xlsx"
+CACHE_DIR = None                        # Кэш разобранных отчётов, например ".report_cache" (None — не использовать)
+CACHE_MAX_BYTES = 2 * 1024 ** 3          # Предельный размер кэша
+STREAM_CHUNK_SIZE = None                 # Если задано — старые файлы читаются потоково частями по N строк
+WORKERS = 1                              # Процессов для загрузки старых файлов (0 — по числу ядер)
+COMMENT_DB = None                        # SQLite-база комментариев (comment_store.py); None — читать старые файлы
+ADD_SOURCES_SHEET = True                 # Лист "Источники комментариев" пишется в том же проходе, что и результат
+                                         # (add_source_to_main_report.py нужен только для уже готовых файлов)
+TIMINGS_FILE = None                      # JSON с замерами этапов (время, CPU, память); None — не сохранять
+TIMINGS_SHEET = False                    # Добавить лист "Производительность" с замерами этапов
+BATCH_OUTPUT_DIR = None                  # Если задано — пакетный режим: каждый отчёт по порядку дат
+                                         # аннотируется по более старым, результаты — в этот каталог
+BATCH_SOURCES_SHEET = False              # Лист "Источники комментариев" и в пакетном режиме: для каждого отчёта
+                                         # заново соединяются все пройденные отчёты — работа растёт
+                                         # как (число отчётов) x (всего строк), а не линейно
+ENGINE = "pandas"                        # Движок объединения таблиц (report_engine.py): "pandas", "duckdb" или "polars"
+FUZZY_MIN_SCORE = None                   # Нечёткое сопоставление строк без точного совпадения (сменились порты
+                                         # или название): порог оценки 0..1, например 0.8; None — выключено
+
+# Колонки, по которым сравниваются строки при нечётком сопоставлении
+FUZZY_KEYS = ("ip", "vuln_name", "ports")
 
 # Отображение названий колонок (обязательные и опциональные)
 COLUMN_MAPPING = {
@@ -43,107 +76,127 @@ def extract_date_from_filename(filepath):
     # Если не получилось, берём дату модификации файла
     return datetime.fromtimestamp(os.path.getmtime(filepath))
 
-def get_vuln_id(row, col_map):
-    """Уникальный ID на основе IP + названия + портов."""
-    ip = str(row.get(col_map["ip"], ""))
-    vuln = str(row.get(col_map["vuln_name"], ""))
-    ports = str(row.get(col_map["ports"], ""))
-    
-    ports_normalized = re.sub(r'\s+', '', ports.lower())
-    if ',' in ports_normalized:
-        parts = [p for p in ports_normalized.split(',') if p.isdigit()]
-        ports_normalized = ','.join(sorted(parts, key=int))
-    
-    unique_str = f"{ip}|{vuln}|{ports_normalized}"
-    return hashlib.md5(unique_str.encode('utf-8')).hexdigest()
-
 def load_excel_with_ids(filepath, col_map):
     """
-    Загружает Excel, добавляет колонку _id.
+    Загружает Excel (или .nessus), добавляет колонку _id.
     Отсутствующие колонки из col_map создаёт пустыми.
     """
-    df = pd.read_excel(filepath, sheet_name=0, dtype=str)
+    if is_nessus_file(filepath):
+        df = read_nessus(filepath, col_map)
+    else:
+        df = pd.read_excel(filepath, sheet_name=0, dtype=str)
     df = df.fillna("")
     # Проверяем наличие всех нужных колонок, добавляем пустые если нет
     for key, col_name in col_map.items():
         if col_name not in df.columns:
             df[col_name] = ""
-    df['_id'] = df.apply(lambda row: get_vuln_id(row, col_map), axis=1)
+    with stage_timer.stage("hash", len(df)):
+        df['_id'] = compute_vuln_keys(df, col_map)
     # Сохраним исходный индекс (номер строки в файле)
     df['_original_index'] = range(1, len(df) + 1)  # человеческий номер (1-based)
     return df
 
-def find_most_recent_comment(target_row, source_files_data):
+def load_excel_ids_streaming(filepath, col_map):
+    """
+    Потоковая загрузка старого файла частями по STREAM_CHUNK_SIZE строк.
+    Оставляет только _id, _original_index, комментарий и пачку —
+    этого достаточно для build_latest_comment_index.
+    """
+    return load_ids_streaming(filepath, col_map, ("comment", "pack"), STREAM_CHUNK_SIZE)
+
+def load_excel_fuzzy_streaming(filepath, col_map):
+    """Как load_excel_ids_streaming, но оставляет и колонки FUZZY_KEYS для нечёткого сопоставления."""
+    return load_ids_streaming(filepath, col_map, ("comment", "pack") + FUZZY_KEYS, STREAM_CHUNK_SIZE)
+
+def fuzzy_keys():
+    """Колонки для build_latest_comment_index: FUZZY_KEYS, если нечёткое сопоставление включено."""
+    return FUZZY_KEYS if FUZZY_MIN_SCORE is not None else ()
+
+def build_latest_comment_index(source_files_data, extra_keys=(), engine=None):
     """
     source_files_data: список кортежей (date, filepath, df)
-    Ищет в source_files_data совпадение по _id с target_row.
-    Возвращает кортеж (comment, pack, source_filepath, source_row_number, source_date)
-    или (None, None, None, None, None) если не найдено.
+    Строит одну таблицу _id -> самый свежий непустой комментарий/пачка.
+    Колонки: comment, pack, filepath, row, date и extra_keys (ключи COLUMN_MAPPING,
+    значения — из той же строки, что и комментарий). engine — движок report_engine (по умолчанию ENGINE).
+    Правила те же, что при поиске по файлам от новых к старым:
+    в каждом файле берётся первая строка с данным _id; если у неё комментарий
+    и пачка пустые — файл пропускается и поиск продолжается в более старых.
     """
-    target_id = target_row['_id']
+    engine = engine or get_engine(ENGINE)
+    comment_col = COLUMN_MAPPING['comment']
+    pack_col = COLUMN_MAPPING['pack']
+    candidates = []
     # Идём по убыванию даты (самые свежие сначала)
     for date, filepath, df in sorted(source_files_data, key=lambda x: x[0], reverse=True):
-        # Ищем строку с таким же _id
-        matches = df[df['_id'] == target_id]
-        if not matches.empty:
-            # Берём первую (должна быть одна)
-            match_row = matches.iloc[0]
-            comment = match_row[COLUMN_MAPPING['comment']]
-            pack = match_row[COLUMN_MAPPING['pack']]
-            # Если комментарий и пачка пустые, продолжаем поиск в более старых?
-            # По условию: если есть заполненный комментарий, берём его.
-            # Но если комментарий пуст, возможно, стоит искать дальше.
-            # Считаем, что пустая строка - не комментарий, ищем дальше.
-            if comment.strip() or pack.strip():
-                source_row = match_row['_original_index']
-                return comment, pack, filepath, source_row, date
-    return None, None, None, None, None
+        first_rows = engine.first_rows(df)
+        # Пустая строка (или только пробелы) — не комментарий
+        has_value = (first_rows[comment_col].str.strip() != "") | (first_rows[pack_col].str.strip() != "")
+        first_rows = first_rows[has_value]
+        candidates.append(pd.DataFrame({
+            '_id': first_rows['_id'].to_numpy(),
+            'comment': first_rows[comment_col].to_numpy(),
+            'pack': first_rows[pack_col].to_numpy(),
+            'filepath': filepath,
+            'row': first_rows['_original_index'].to_numpy(dtype=object),
+            'date': date.strftime("%Y-%m-%d"),
+            **{key: first_rows[COLUMN_MAPPING[key]].to_numpy() for key in extra_keys}
+        }))
+    if not candidates:
+        return pd.DataFrame(columns=['comment', 'pack', 'filepath', 'row', 'date', *extra_keys],
+                            index=pd.Index([], name='_id'))
+    latest = pd.concat(candidates, ignore_index=True)
+    # Первый кандидат по каждому _id — из самого свежего файла
+    latest = engine.first_rows(latest)
+    return index_by_key(latest)
+
+def fuzzy_fill(df_target, latest, found):
+    """
+    Нечёткое сопоставление (fuzzy_match.py) для строк df_target, не найденных в latest по _id:
+    кандидаты — строки latest (с колонками FUZZY_KEYS), чьих _id нет в целевом файле.
+    Заполняет found (на месте, позиции — как у df_target) данными лучшего кандидата.
+    Возвращает (список оценок совпадения: 1.0 — точное, число — нечёткое, "" — не найдено;
+    позиции строк, сопоставленных нечётко).
+    """
+    exact = df_target['_id'].isin(latest.index).to_numpy()
+    confidence = [1.0 if e else "" for e in exact]
+    pool = latest[~latest.index.isin(df_target['_id'])]
+    targets = pd.DataFrame({
+        'ip': df_target[COLUMN_MAPPING['ip']].to_numpy(),
+        'name': df_target[COLUMN_MAPPING['vuln_name']].to_numpy(),
+        'ports': df_target[COLUMN_MAPPING['ports']].to_numpy(),
+    })[~exact]
+    candidates = pd.DataFrame({'ip': pool['ip'], 'name': pool['vuln_name'], 'ports': pool['ports']})
+    matched = fuzzy_match(targets, candidates, FUZZY_MIN_SCORE)
+    positions = matched.index.to_numpy()
+    if len(matched):
+        found.iloc[positions] = pool.loc[matched['match'], found.columns].astype(object).to_numpy()
+        for pos, score in zip(positions, matched['score']):
+            confidence[pos] = score
+    return confidence, positions
+
+def annotate_target(df_target, latest, engine=None):
+    """
+    Проставляет в df_target (на месте) комментарий и пачку из latest (индекс _id,
+    колонки comment, pack, filepath, row, date — как у build_latest_comment_index)
+    и колонки источника после колонки пачки. При FUZZY_MIN_SCORE строки без точного
+    совпадения сопоставляются нечётко (если в latest есть колонки FUZZY_KEYS; в базе
+    комментариев их нет), а после колонок источника добавляется "Оценка совпадения".
+    engine — движок report_engine (по умолчанию ENGINE).
+    Возвращает (число строк, для которых найден комментарий; из них найдено нечётко —
+    None, если нечёткое сопоставление выключено).
+    """
+    engine = engine or get_engine(ENGINE)
+    found = engine.lookup(latest[['comment', 'pack', 'filepath', 'row', 'date']], df_target['_id'])
+    found = found.astype(object).fillna("").reset_index(drop=True)
+    confidence = None
+    if FUZZY_MIN_SCORE is not None and set(FUZZY_KEYS) <= set(latest.columns):
+        confidence, fuzzy_positions = fuzzy_fill(df_target, latest, found)
+    new_comments = found['comment'].tolist()
+    new_packs = found['pack'].tolist()
+    source_files = found['filepath'].tolist()
+    source_rows = found['row'].tolist()
+    source_dates = found['date'].tolist()
 
-def main():
-    print("=== Сравнение нескольких отчётов Nessus ===\n")
-    
-    # Находим все Excel-файлы в папке
-    pattern = os.path.join(INPUT_FOLDER, "*.xlsx")
-    files = glob.glob(pattern)
-    if not files:
-        print(f"Ошибка: не найдено файлов .xlsx в папке {INPUT_FOLDER}")
-        return
-    
-    # Сортируем файлы по дате (из имени или модификации)
-    file_dates = [(extract_date_from_filename(f), f) for f in files]
-    file_dates.sort(key=lambda x: x[0])  # по возрастанию даты
-    
-    # Самый новый файл - последний
-    newest_date, newest_file = file_dates[-1]
-    old_files_data = []
-    
-    print(f"Целевой (новый) файл: {os.path.basename(newest_file)} (дата: {newest_date.date()})")
-    print("Старые файлы (источники комментариев):")
-    for date, fpath in file_dates[:-1]:
-        print(f"  {os.path.basename(fpath)} (дата: {date.date()})")
-        # Загружаем каждый старый файл с ID
-        df_old = load_excel_with_ids(fpath, COLUMN_MAPPING)
-        old_files_data.append((date, fpath, df_old))
-    
-    # Загружаем целевой файл
-    df_target = load_excel_with_ids(newest_file, COLUMN_MAPPING)
-    print(f"\nЗаписей в целевом файле: {len(df_target)}")
-    
-    # Для каждой строки целевого файла ищем комментарий в старых
-    new_comments = []
-    new_packs = []
-    source_files = []
-    source_rows = []
-    source_dates = []
-    
-    for idx, row in df_target.iterrows():
-        comment, pack, src_file, src_row, src_date = find_most_recent_comment(row, old_files_data)
-        new_comments.append(comment if comment is not None else "")
-        new_packs.append(pack if pack is not None else "")
-        source_files.append(src_file if src_file is not None else "")
-        source_rows.append(src_row if src_row is not None else "")
-        source_dates.append(src_date.strftime("%Y-%m-%d") if src_date is not None else "")
-    
     # Обновляем колонки в целевой DataFrame
     df_target[COLUMN_MAPPING['comment']] = new_comments
     df_target[COLUMN_MAPPING['pack']] = new_packs
@@ -167,14 +220,20 @@ def main():
         "Имя файла",
         [os.path.basename(f) if f else "" for f in source_files]
     )
-    
-    # Удаляем служебные колонки
-    df_target = df_target.drop(columns=['_id', '_original_index'])
-    
-    # Статистика
-    total_target = len(df_target)
+
     found_comments = sum(1 for c in new_comments if c.strip())
-    
+    if confidence is None:
+        return found_comments, None
+    df_target.insert(
+        df_target.columns.get_loc(COLUMN_MAPPING['pack']) + 5,
+        "Оценка совпадения",
+        confidence
+    )
+    fuzzy_found = sum(1 for pos in fuzzy_positions if new_comments[pos].strip())
+    return found_comments, fuzzy_found
+
+def build_stats(target_file, target_date, old_files_count, total_target, found_comments, fuzzy_found=None):
+    """Лист "Статистика" для целевого файла (fuzzy_found — при нечётком сопоставлении)."""
     stats_data = {
         "Показатель": [
             "Целевой файл",
@@ -185,24 +244,220 @@ def main():
             "Не найдено"
         ],
         "Значение": [
-            os.path.basename(newest_file),
-            newest_date.strftime("%Y-%m-%d"),
-            len(old_files_data),
+            os.path.basename(target_file),
+            target_date.strftime("%Y-%m-%d"),
+            old_files_count,
             total_target,
             found_comments,
             total_target - found_comments
         ]
     }
-    df_stats = pd.DataFrame(stats_data)
+    if fuzzy_found is not None:
+        stats_data["Показатель"].insert(5, "Из них нечётким сопоставлением")
+        stats_data["Значение"].insert(5, fuzzy_found)
+    return pd.DataFrame(stats_data)
+
+def update_latest_comments(latest, date, filepath, df):
+    """
+    Пакетный режим: добавляет отчёт (date, filepath, df) в накопленный индекс latest
+    (как у build_latest_comment_index, плюс колонка _date). Отчёты подаются по возрастанию даты,
+    поэтому более новый отчёт заменяет комментарий; при равной дате остаётся более ранний по списку —
+    так же, как build_latest_comment_index выбирает между файлами с одной датой.
+    """
+    candidates = build_latest_comment_index([(date, filepath, df)], fuzzy_keys()).assign(_date=date)
+    if latest.empty:
+        return candidates
+    same_date = latest.index[latest['_date'] == date]
+    candidates = candidates[~candidates.index.isin(same_date)]
+    return pd.concat([latest[~latest.index.isin(candidates.index)], candidates])
+
+def batch_output_path(filepath):
+    """Файл результата пакетного режима для отчёта."""
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.join(BATCH_OUTPUT_DIR, f"{stem}_{OUTPUT_FILE}")
+
+def run_batch(file_dates, timer):
+    """
+    Пакетный режим: проходит отчёты по возрастанию даты, каждый читается один раз.
+    Для каждого отчёта пишется результат, как если бы он был самым новым в папке
+    (источники — только более старые отчёты); индекс последних комментариев
+    обновляется по ходу, поэтому старые файлы не перечитываются.
+    Общая работа линейна по числу строк всех отчётов. Исключение — BATCH_SOURCES_SHEET:
+    лист "Источники комментариев" для каждого отчёта строится по всем уже пройденным
+    (включая текущий), и сам лист растёт с числом отчётов.
+    """
+    os.makedirs(BATCH_OUTPUT_DIR, exist_ok=True)
+    # Загружаем группами по WORKERS файлов: параллельно, но в памяти — не больше группы
+    group_size = resolve_workers(WORKERS)
+    latest = build_latest_comment_index([], fuzzy_keys())
+    source_frames = []
+    old_files_count = 0
+    for start in range(0, len(file_dates), group_size):
+        group = file_dates[start:start + group_size]
+        with timer.stage("load") as st:
+            loaded = load_reports([fpath for _, fpath in group], COLUMN_MAPPING, load_excel_with_ids,
+                                  WORKERS, CACHE_DIR, CACHE_MAX_BYTES)
+            st["rows"] += sum(len(df) for _, df, error in loaded if error is None)
+        for (date, fpath), (_, df_target, error) in zip(group, loaded):
+            if error is not None:
+                print(f"  Ошибка при загрузке {fpath}: {error}")
+                continue
+            with timer.stage("match", len(df_target)):
+                df_out = df_target.copy()
+                found_comments, fuzzy_found = annotate_target(df_out, latest)
+                df_sources = None
+                if BATCH_SOURCES_SHEET:
+                    # Отчёты идут по дате, затем по пути — тот же порядок источников, что и без пакетного режима
+                    source_frames.append(sources_frame(fpath, df_target, date))
+                    df_main = df_out.assign(_main_index=range(1, len(df_out) + 1))
+                    df_sources = build_sources_sheet(df_main, pd.concat(source_frames, ignore_index=True),
+                                                     COLUMN_MAPPING, get_engine(ENGINE))
+                df_out = df_out.drop(columns=['_id', '_original_index'])
+                df_stats = build_stats(fpath, date, old_files_count, len(df_out), found_comments, fuzzy_found)
+                latest = update_latest_comments(latest, date, fpath, df_target)
+                sheets = [("Статистика", df_stats), ("Новый с комментариями", df_out)]
+                if df_sources is not None:
+                    sheets.append(("Источники комментариев", df_sources))
+            output = batch_output_path(fpath)
+            with timer.stage("write", sum(len(df) for _, df in sheets)):
+                write_sheets(output, sheets)
+            old_files_count += 1
+            print(f"  {os.path.basename(fpath)} (дата: {date.date()}): найдено комментариев "
+                  f"{found_comments} из {len(df_out)} -> {output}")
+    print(f"\n✅ Обработано отчётов: {old_files_count}, результаты в каталоге {BATCH_OUTPUT_DIR}")
+
+def main():
+    print("=== Сравнение нескольких отчётов Nessus ===\n")
+    timer = stage_timer.start("compare_multiple_reports")
+    
+    # Находим все файлы отчётов в папке
+    files = [f for pattern in REPORT_PATTERNS for f in glob.glob(os.path.join(INPUT_FOLDER, pattern))]
+    if not files:
+        print(f"Ошибка: не найдено файлов {', '.join(REPORT_PATTERNS)} в папке {INPUT_FOLDER}")
+        return
+    
+    # Сортируем файлы по дате (из имени или модификации)
+    file_dates = [(extract_date_from_filename(f), f) for f in files]
+    file_dates.sort(key=lambda x: (x[0], x[1]))  # по возрастанию даты, при равной дате — по пути
+    
+    if BATCH_OUTPUT_DIR:
+        # Результаты пакетного режима и OUTPUT_FILE — не отчёты
+        output_full = os.path.abspath(OUTPUT_FILE)
+        file_dates = [(date, f) for date, f in file_dates
+                      if os.path.abspath(f) != output_full and not f.endswith(f"_{OUTPUT_FILE}")]
+        if COMMENT_DB:
+            print("Пакетный режим: COMMENT_DB не используется")
+        print(f"Пакетный режим: {len(file_dates)} отчётов")
+        run_batch(file_dates, timer)
+        timer.print_summary()
+        if TIMINGS_FILE:
+            timer.write_json(TIMINGS_FILE)
+        return
+    
+    # Самый новый файл - последний
+    newest_date, newest_file = file_dates[-1]
+    if not STREAM_CHUNK_SIZE:
+        old_loader = load_excel_with_ids
+    elif FUZZY_MIN_SCORE is not None:
+        old_loader = load_excel_fuzzy_streaming
+    else:
+        old_loader = load_excel_ids_streaming
+    old_files = file_dates[:-1]
+    
+    print(f"Целевой (новый) файл: {os.path.basename(newest_file)} (дата: {newest_date.date()})")
+    with timer.stage("load") as st:
+        if COMMENT_DB:
+            # Старые файлы берутся из базы; перечитываются только ещё не загруженные в неё
+            conn = connect(COMMENT_DB)
+            print(f"База комментариев: {COMMENT_DB}")
+            if FUZZY_MIN_SCORE is not None:
+                print("С COMMENT_DB нечёткое сопоставление не используется (в базе нет IP, названий и портов)")
+            synced = sync_reports(conn, [fpath for _, fpath in old_files], COLUMN_MAPPING,
+                                  extract_date_from_filename, WORKERS, CACHE_DIR, CACHE_MAX_BYTES)
+            for fpath, error in synced:
+                if error is None:
+                    print(f"  Добавлен в базу: {os.path.basename(fpath)}")
+                else:
+                    print(f"  Ошибка при загрузке {fpath}: {error}")
+        else:
+            print("Старые файлы (источники комментариев):")
+            # Загружаем старые файлы с ID (параллельно при WORKERS != 1), порядок — по дате
+            old_files_data = []
+            loaded = load_reports([fpath for _, fpath in old_files], COLUMN_MAPPING, old_loader,
+                                  WORKERS, CACHE_DIR, CACHE_MAX_BYTES)
+            for (date, fpath), (_, df_old, error) in zip(old_files, loaded):
+                print(f"  {os.path.basename(fpath)} (дата: {date.date()})")
+                if error is not None:
+                    print(f"  Ошибка при загрузке {fpath}: {error}")
+                    continue
+                old_files_data.append((date, fpath, df_old))
+                st["rows"] += len(df_old)
+    
+    # Загружаем целевой файл
+    with timer.stage("load") as st:
+        df_target = load_with_cache(newest_file, COLUMN_MAPPING, load_excel_with_ids, CACHE_DIR, CACHE_MAX_BYTES)
+        st["rows"] += len(df_target)
+    print(f"\nЗаписей в целевом файле: {len(df_target)}")
+    
+    with timer.stage("match", len(df_target)):
+        # Для всех строк целевого файла сразу берём комментарий из индекса старых файлов
+        if COMMENT_DB:
+            # Источники — только отчёты раньше целевого: в базе могут быть и он сам, и более новые
+            latest = latest_comments(conn, df_target['_id'], COLUMN_MAPPING, exclude=newest_file,
+                                     target_date=newest_date)
+            old_files_count = report_count(conn, COLUMN_MAPPING, exclude=newest_file, target_date=newest_date)
+            # Целевой файл тоже сохраняем в базу — для следующих запусков
+            if not is_ingested(conn, newest_file, COLUMN_MAPPING):
+                ingest_report(conn, newest_file, df_target, newest_date, COLUMN_MAPPING)
+        else:
+            latest = build_latest_comment_index(old_files_data, fuzzy_keys())
+            old_files_count = len(old_files_data)
+        found_comments, fuzzy_found = annotate_target(df_target, latest)
+    
+        # Лист "Источники комментариев" (как add_source_to_main_report.py) — по уже загруженным данным,
+        # без повторного чтения отчётов и результата
+        df_sources = None
+        if ADD_SOURCES_SHEET:
+            df_main = df_target.assign(_main_index=range(1, len(df_target) + 1))
+            if COMMENT_DB:
+                sources = find_sources(conn, df_target['_id'], COLUMN_MAPPING, exclude=OUTPUT_FILE,
+                                       target=(newest_date, newest_file))
+            else:
+                output_full = os.path.abspath(OUTPUT_FILE)
+                reports = [(date, fpath, df) for date, fpath, df in old_files_data + [(newest_date, newest_file, df_target)]
+                           if os.path.abspath(fpath) != output_full]
+                reports.sort(key=lambda x: (x[0], x[1]))
+                sources = pd.concat([sources_frame(fpath, df, date) for date, fpath, df in reports], ignore_index=True)
+            df_sources = build_sources_sheet(df_main, sources, COLUMN_MAPPING, get_engine(ENGINE))
+        if COMMENT_DB:
+            conn.close()
+    
+        # Удаляем служебные колонки
+        df_target = df_target.drop(columns=['_id', '_original_index'])
+    
+        # Статистика
+        df_stats = build_stats(newest_file, newest_date, old_files_count, len(df_target), found_comments, fuzzy_found)
     
-    # Сохраняем результат
-    with pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl') as writer:
-        df_stats.to_excel(writer, sheet_name="Статистика", index=False)
-        df_target.to_excel(writer, sheet_name="Новый с комментариями", index=False)
+    # Сохраняем результат (потоково, все листы за один проход);
+    # лист замеров — по этапам, завершённым до записи
+    sheets = [("Статистика", df_stats)]
+    if TIMINGS_SHEET:
+        sheets.append(("Производительность", timer.to_frame()))
+    sheets.append(("Новый с комментариями", df_target))
+    if df_sources is not None:
+        sheets.append(("Источники комментариев", df_sources))
+    with timer.stage("write", sum(len(df) for _, df in sheets)):
+        write_sheets(OUTPUT_FILE, sheets)
     
     print(f"\n✅ Результат сохранён в файл: {OUTPUT_FILE}")
     print(f"   - Лист 'Статистика' – общая информация")
     print(f"   - Лист 'Новый с комментариями' – все строки целевого файла с добавленными колонками")
+    if df_sources is not None:
+        print(f"   - Лист 'Источники комментариев' – {len(df_sources)} записей")
+    timer.print_summary()
+    if TIMINGS_FILE:
+        timer.write_json(TIMINGS_FILE)
+        print(f"Замеры этапов сохранены: {TIMINGS_FILE}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Динамический inventory Ansible из Excel: те же хосты, группы и переменные, что в inventory.yml
+от parse_excel_with_groups (parsexls-invyml.py), но без промежуточного файла.
+
+    ansible-playbook -i python/excel_inventory.py ansible/playbooks/get_pkg_ver_min.yml -e hosts=web
+    python excel_inventory.py --list
+    python excel_inventory.py --host <имя хоста>
+
+Ansible не передаёт скрипту своих аргументов, поэтому путь к таблице и колонку группировки
+можно задать переменными окружения EXCEL_INVENTORY_FILE и EXCEL_INVENTORY_GROUP_COLUMN.
+
+Результат кэшируется в CACHE_FILE (ключ — путь к таблице и колонка группировки). Запись действительна,
+пока у таблицы те же размер и mtime; если они изменились, файл перехэшируется и при том же
+содержимом запись остаётся в силе. Изменение parsexls-invyml.py (например, ANSIBLE_USER) сбрасывает
+запись. При попадании в кэш pandas не импортируется и Excel не читается — ответ почти мгновенный.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+
+# ========== НАСТРОЙКИ ==========
+EXCEL_FILE = os.environ.get("EXCEL_INVENTORY_FILE", "hosts.xlsx")            # Таблица с хостами
+GROUP_COLUMN = os.environ.get("EXCEL_INVENTORY_GROUP_COLUMN", "Group") or None  # Колонка групп ("" — без групп)
+CACHE_FILE = os.environ.get("EXCEL_INVENTORY_CACHE",                         # Кэш inventory ("" — не использовать)
+                            os.path.join(os.path.expanduser("~"), ".cache", "excel_inventory.json"))
+# ================================
+
+CACHE_VERSION = 1                         # менять при изменении формата кэша
+PARSER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parsexls-invyml.py")
+
+
+def file_signature(filepath):
+    """(размер, mtime в нс) — быстрая проверка, что файл не менялся."""
+    st = os.stat(filepath)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def file_hash(filepath, chunk_size=1024 * 1024):
+    """sha256 содержимого файла (как report_cache.file_hash, но без импорта pandas)."""
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_cache(cache_file):
+    """Записи кэша (пустой словарь, если кэша ещё нет или он повреждён)."""
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def write_cache(cache_file, cache):
+    """Атомарно записывает кэш; ошибка записи не мешает вернуть inventory."""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        print(f"Не удалось записать кэш {cache_file}: {e}", file=sys.stderr)
+
+
+def parse_inventory(excel_file, group_column):
+    """Разбор таблицы через build_dynamic_inventory из parsexls-invyml.py (имя файла с дефисом — через importlib)."""
+    spec = importlib.util.spec_from_file_location("parsexls_invyml", PARSER_FILE)
+    parser = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(parser)
+    # Сообщения о некорректных IP — в stderr: stdout Ansible читает как JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        return parser.build_dynamic_inventory(excel_file, group_column)
+
+
+def load_inventory(excel_file=EXCEL_FILE, group_column=GROUP_COLUMN, cache_file=CACHE_FILE, refresh=False):
+    """Inventory для --list: из кэша, если таблица и parsexls-invyml.py не менялись, иначе — разбор таблицы."""
+    signature = file_signature(excel_file)
+    if not cache_file:
+        return parse_inventory(excel_file, group_column)
+
+    key = f"{os.path.abspath(excel_file)}|{group_column}|{CACHE_VERSION}"
+    parser_signature = file_signature(PARSER_FILE)
+    cache = read_cache(cache_file)
+    entry = cache.get(key)
+    valid = not refresh and isinstance(entry, dict) and entry.get('parser') == parser_signature
+    if valid and entry.get('signature') == signature:
+        return entry['inventory']
+
+    digest = file_hash(excel_file)
+    if valid and entry.get('sha256') == digest:
+        # Файл перезаписан с тем же содержимым — запоминаем новые размер и mtime
+        entry['signature'] = signature
+        write_cache(cache_file, cache)
+        return entry['inventory']
+
+    inventory = parse_inventory(excel_file, group_column)
+    # Если таблицу меняли во время разбора, хэш может не соответствовать прочитанному — не кэшируем
+    if file_signature(excel_file) == signature:
+        cache[key] = {'signature': signature, 'sha256': digest, 'parser': parser_signature, 'inventory': inventory}
+        write_cache(cache_file, cache)
+    return inventory
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Динамический inventory Ansible из Excel")
+    mode = arg_parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--list", action="store_true", help="все хосты и группы (JSON)")
+    mode.add_argument("--host", metavar="ИМЯ", help="переменные одного хоста (JSON)")
+    arg_parser.add_argument("--file", default=EXCEL_FILE, help=f"таблица с хостами (по умолчанию {EXCEL_FILE})")
+    arg_parser.add_argument("--group-column", default=GROUP_COLUMN,
+                            help=f"колонка групп (по умолчанию {GROUP_COLUMN})")
+    arg_parser.add_argument("--refresh", action="store_true", help="не использовать кэш, разобрать таблицу заново")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        inventory = load_inventory(args.file, args.group_column or None, CACHE_FILE, args.refresh)
+    except FileNotFoundError:
+        print(f"Ошибка: Файл '{args.file}' не найден", file=sys.stderr)
+        return 1
+    except Exception as e:
+        print(f"Ошибка при обработке файла: {e}", file=sys.stderr)
+        return 1
+
+    if args.list:
+        result = inventory
+    else:
+        result = inventory['_meta']['hostvars'].get(args.host, {})
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Нечёткое сопоставление находок, для которых нет точного совпадения _id
+(изменился список портов или формулировка названия уязвимости).
+
+Сравниваются только пары внутри блока — одного IP-адреса; если блок слишком большой
+(больше MAX_PAIRS_PER_BLOCK пар), внутри него сравниваются только строки с одинаковым
+нормализованным названием. Поэтому объём работы близок к линейному, а не N x M.
+
+Оценка (0..1): NAME_WEIGHT * похожесть названий (difflib) + PORTS_WEIGHT * похожесть
+наборов портов (доля общих портов, Жаккар). Берётся лучший кандидат с оценкой не ниже
+min_score; при равной оценке — более ранний в списке кандидатов.
+"""
+
+from difflib import SequenceMatcher
+
+import pandas as pd
+
+from vuln_id import normalize_ports
+
+DEFAULT_MIN_SCORE = 0.8
+NAME_WEIGHT = 0.6
+PORTS_WEIGHT = 0.4
+MAX_PAIRS_PER_BLOCK = 50000
+
+
+def normalize_name(name):
+    """Название без учёта регистра и лишних пробелов."""
+    return " ".join(str(name).lower().split())
+
+
+def port_set(ports):
+    return frozenset(p for p in normalize_ports(str(ports)).split(',') if p)
+
+
+def ports_similarity(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _prepare(df):
+    """(ip, нормализованное название, набор портов) для каждой строки."""
+    return list(zip(df['ip'].astype(str), (normalize_name(n) for n in df['name']), (port_set(p) for p in df['ports'])))
+
+
+def fuzzy_match(targets, candidates, min_score=DEFAULT_MIN_SCORE, max_pairs=MAX_PAIRS_PER_BLOCK):
+    """
+    targets, candidates: DataFrame с колонками ip, name, ports.
+    Возвращает DataFrame с индексом targets (только сопоставленные строки) и колонками
+    match (индекс строки candidates) и score (оценка, округлена до 0.01).
+    """
+    if targets.empty or candidates.empty:
+        return pd.DataFrame({'match': [], 'score': []}, index=targets.index[:0])
+
+    # Блоки кандидатов: IP -> список (позиция, название, порты); внутри — по названию
+    blocks = {}
+    by_name = {}
+    for pos, (ip, name, ports) in enumerate(_prepare(candidates)):
+        blocks.setdefault(ip, []).append((pos, name, ports))
+        by_name.setdefault((ip, name), []).append((pos, name, ports))
+
+    targets_prepared = _prepare(targets)
+    block_sizes = {}
+    for ip, _, _ in targets_prepared:
+        block_sizes[ip] = block_sizes.get(ip, 0) + 1
+
+    matches, scores, matched_index = [], [], []
+    matcher = SequenceMatcher(autojunk=False)
+    for label, (ip, name, ports) in zip(targets.index, targets_prepared):
+        block = blocks.get(ip)
+        if not block:
+            continue
+        if block_sizes[ip] * len(block) > max_pairs:
+            block = by_name.get((ip, name), [])
+        matcher.set_seq2(name)
+        best_pos, best_score = None, min_score
+        for pos, cand_name, cand_ports in block:
+            port_score = PORTS_WEIGHT * ports_similarity(ports, cand_ports)
+            if cand_name == name:
+                score = NAME_WEIGHT + port_score
+            else:
+                matcher.set_seq1(cand_name)
+                # Быстрые верхние оценки отсекают заведомо слабых кандидатов
+                if NAME_WEIGHT * matcher.real_quick_ratio() + port_score < best_score:
+                    continue
+                if NAME_WEIGHT * matcher.quick_ratio() + port_score < best_score:
+                    continue
+                score = NAME_WEIGHT * matcher.ratio() + port_score
+            if score > best_score or (best_pos is None and score >= best_score):
+                best_pos, best_score = pos, score
+        if best_pos is not None:
+            matched_index.append(label)
+            matches.append(candidates.index[best_pos])
+            scores.append(round(best_score, 2))
+    return pd.DataFrame({'match': matches, 'score': scores}, index=pd.Index(matched_index, dtype=targets.index.dtype))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Генератор синтетических отчётов Nessus (xlsx) для воспроизведения проблем производительности.
+
+Заголовки колонок берутся из COLUMN_MAPPING скриптов сравнения:
+    --layout multi — серия еженедельных файлов report_ГГГГ-ММ-ДД.xlsx (compare_multiple_reports.py);
+    --layout pair  — old_report.xlsx и new_report.xlsx (compare_excel_nessus_reports*.py).
+
+Пример:
+    python3 generate_reports.py ./bench_data --rows 100000 --history 10 --overlap 0.9 --comments 0.3
+"""
+
+import argparse
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from xlsx_writer import write_sheets
+
+PORT_LISTS = [
+    "80", "443", "22", "3389", "445", "8080", "0",
+    "80, 443", "443,80", "22, 80, 443", "135,139, 445", "8443, 8080", "1433",
+    "5432", "3306", " 25 ", "53", "161", "tcp/443", "21,22,23",
+]
+SEVERITIES = ["Низкий", "Средний", "Высокий", "Критический"]
+HOST_CRITICALITY = ["Низкий", "Средний", "Высокий"]
+OS_NAMES = ["Windows Server 2019", "Windows Server 2016", "RHEL 8", "Ubuntu 22.04", "Astra Linux SE 1.7"]
+SYSTEMS = ["АБС", "CRM", "ДБО", "Почта", "AD", "Мониторинг", ""]
+COMMENTS = ["Принято, устранение в плановом окне", "Ложное срабатывание", "Компенсирующие меры",
+            "Передано владельцу ИС", "Исключение согласовано"]
+TEXT = ("Удалённый сервис подвержен уязвимости, позволяющей злоумышленнику выполнить "
+        "произвольный код или получить доступ к конфиденциальной информации. ")
+
+
+def _column_mapping(layout):
+    if layout == "pair":
+        from compare_excel_nessus_reports_adv import COLUMN_MAPPING
+    else:
+        from compare_multiple_reports import COLUMN_MAPPING
+    return COLUMN_MAPPING
+
+
+def _pick(rng, values, size):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), size)]
+
+
+def build_report(rng, finding_ids, col_map, args):
+    """Строки отчёта для набора находок; атрибуты находки однозначно выводятся из её номера."""
+    n = len(finding_ids)
+    ids = finding_ids.astype(np.int64)
+    host = (ids * 2654435761) % args.hosts
+    vuln = (ids * 40503) % args.vulns
+    ports = ids % len(PORT_LISTS)
+    ip = ("10." + pd.Series(host // 65536 % 256).astype(str) + "." + pd.Series(host // 256 % 256).astype(str)
+          + "." + pd.Series(host % 256).astype(str))
+    values = {
+        "vuln_name": "Уязвимость плагина " + pd.Series(vuln).astype(str),
+        "vuln_criticality": np.asarray(SEVERITIES, dtype=object)[vuln % len(SEVERITIES)],
+        "host_criticality": np.asarray(HOST_CRITICALITY, dtype=object)[host % len(HOST_CRITICALITY)],
+        "ip": ip,
+        "hostname": "host-" + pd.Series(host).astype(str),
+        "os": np.asarray(OS_NAMES, dtype=object)[host % len(OS_NAMES)],
+        "hostname2": "host-" + pd.Series(host).astype(str) + ".corp.local",
+        "ports": np.asarray(PORT_LISTS, dtype=object)[ports],
+        "description": TEXT * args.text_repeat + pd.Series(vuln).astype(str),
+        "recommendation": "Установите обновление " + pd.Series(vuln).astype(str) + ". " + TEXT * args.text_repeat,
+        "links": "https://www.tenable.com/plugins/nessus/" + pd.Series(vuln).astype(str),
+        "additional": "",
+        "system": np.asarray(SYSTEMS, dtype=object)[host % len(SYSTEMS)],
+    }
+    has_comment = rng.random(n) < args.comments
+    values["comment"] = np.where(has_comment, _pick(rng, COMMENTS, n), "")
+    values["pack"] = np.where(has_comment & (rng.random(n) < 0.5), "Пачка " + pd.Series(rng.integers(1, 50, n)).astype(str), "")
+    df = pd.DataFrame({col_map[key]: np.asarray(v, dtype=object) for key, v in values.items() if key in col_map})
+    return df.sample(frac=1, random_state=int(rng.integers(0, 2 ** 31))).reset_index(drop=True)
+
+
+def generate(args):
+    """Создаёт набор отчётов в args.output_dir, возвращает список путей."""
+    rng = np.random.default_rng(args.seed)
+    col_map = _column_mapping(args.layout)
+    os.makedirs(args.output_dir, exist_ok=True)
+    count = 2 if args.layout == "pair" else args.history
+    if args.layout == "pair":
+        names = ["old_report.xlsx", "new_report.xlsx"]
+    else:
+        start = date.fromisoformat(args.start_date)
+        names = [f"report_{(start + timedelta(weeks=i)).isoformat()}.xlsx" for i in range(count)]
+
+    paths = []
+    current = np.arange(args.rows)
+    next_id = args.rows
+    for i, name in enumerate(names):
+        if i:
+            # Часть находок переходит из предыдущего отчёта, остальные — новые
+            kept = rng.choice(current, int(args.rows * args.overlap), replace=False)
+            new = np.arange(next_id, next_id + args.rows - len(kept))
+            next_id += len(new)
+            current = np.concatenate([kept, new])
+        path = os.path.join(args.output_dir, name)
+        write_sheets(path, [("Sheet1", build_report(rng, current, col_map, args))])
+        paths.append(path)
+        print(f"  {name}: {len(current)} строк")
+    return paths
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Генератор синтетических отчётов Nessus (xlsx)")
+    parser.add_argument("output_dir", help="каталог для отчётов")
+    parser.add_argument("--layout", choices=["multi", "pair"], default="multi",
+                        help="multi — серия отчётов по датам, pair — old_report/new_report")
+    parser.add_argument("--rows", type=int, default=10000, help="строк в каждом отчёте")
+    parser.add_argument("--history", type=int, default=5, help="число отчётов (для multi)")
+    parser.add_argument("--overlap", type=float, default=0.9, help="доля находок, переходящих в следующий отчёт")
+    parser.add_argument("--comments", type=float, default=0.3, help="доля строк с комментарием")
+    parser.add_argument("--hosts", type=int, default=5000, help="число различных хостов")
+    parser.add_argument("--vulns", type=int, default=3000, help="число различных уязвимостей")
+    parser.add_argument("--text-repeat", type=int, default=3, help="длина описания (повторов абзаца)")
+    parser.add_argument("--start-date", default="2024-01-01", help="дата первого отчёта (для multi)")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    print(f"Генерация отчётов в {args.output_dir}")
+    generate(args)
+
+
+if __name__ == "__main__":
+    main()
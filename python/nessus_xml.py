@@ -0,0 +1,127 @@
+"""
+Потоковое чтение файлов .nessus (формат NessusClientData_v2) в те же поля, что и в Excel-отчётах.
+
+XML разбирается инкрементально (iterparse): в памяти одновременно держится только один
+ReportHost. Все ReportItem одного хоста с одинаковым плагином сводятся в одну строку,
+порты перечисляются через запятую ("Список портов").
+Поля заполняются по ключам COLUMN_MAPPING:
+    ip, hostname, hostname2, os — из HostProperties;
+    vuln_name, vuln_criticality, ports, description, recommendation, links, additional — из ReportItem;
+    остальные (host_criticality, system, comment, pack) — пустые.
+"""
+
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+# severity ReportItem -> "Уровень критичности уязвимости"
+SEVERITY_NAMES = {
+    "0": "Информационный",
+    "1": "Низкий",
+    "2": "Средний",
+    "3": "Высокий",
+    "4": "Критический",
+}
+MIN_SEVERITY = 0                 # ReportItem с меньшей severity пропускаются
+
+# HostProperties -> ключ COLUMN_MAPPING
+HOST_PROPERTIES = {
+    "host-ip": "ip",
+    "host-fqdn": "hostname",
+    "netbios-name": "hostname2",
+    "operating-system": "os",
+}
+# Дочерние элементы ReportItem -> ключ COLUMN_MAPPING
+ITEM_FIELDS = {
+    "description": "description",
+    "solution": "recommendation",
+    "see_also": "links",
+    "plugin_output": "additional",
+}
+
+
+def is_nessus_file(filepath):
+    return str(filepath).lower().endswith(".nessus")
+
+
+def _port_sort_key(port):
+    return (0, int(port)) if port.isdigit() else (1, port)
+
+
+def _host_rows(host_name, host_props, items, col_map):
+    """Строки одного хоста: по одной на плагин, порты сведены в список."""
+    host_values = {key: host_props.get(prop, "") for prop, key in HOST_PROPERTIES.items()}
+    if not host_values["ip"]:
+        host_values["ip"] = host_name
+    for item in items.values():
+        values = dict(host_values)
+        values.update(item["fields"])
+        values["ports"] = ", ".join(sorted(item["ports"], key=_port_sort_key))
+        yield {col_name: values.get(key, "") for key, col_name in col_map.items()}
+
+
+def iter_nessus_rows(filepath, col_map, min_severity=MIN_SEVERITY):
+    """Отдаёт строки отчёта (dict: название колонки -> str) по мере чтения файла."""
+    report = None
+    host_name = ""
+    host_props = {}
+    items = {}
+    for event, elem in ET.iterparse(filepath, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == "Report":
+                report = elem
+            elif tag == "ReportHost":
+                host_name = elem.get("name", "")
+                host_props = {}
+                items = {}
+            continue
+
+        if tag == "tag":
+            # <HostProperties><tag name="host-ip">...</tag></HostProperties>
+            host_props[elem.get("name", "")] = (elem.text or "").strip()
+        elif tag == "ReportItem":
+            severity = elem.get("severity", "0")
+            if int(severity or 0) >= min_severity:
+                plugin_key = (elem.get("pluginID", ""), elem.get("pluginName", ""))
+                item = items.get(plugin_key)
+                if item is None:
+                    fields = {key: (elem.findtext(child) or "").strip() for child, key in ITEM_FIELDS.items()}
+                    fields["vuln_name"] = elem.get("pluginName", "")
+                    fields["vuln_criticality"] = SEVERITY_NAMES.get(severity, severity)
+                    item = items[plugin_key] = {"fields": fields, "ports": set()}
+                port = elem.get("port", "")
+                if port:
+                    item["ports"].add(port)
+            elem.clear()
+        elif tag == "ReportHost":
+            yield from _host_rows(host_name, host_props, items, col_map)
+            items = {}
+            # Освобождаем разобранный хост, чтобы память не росла с размером файла
+            elem.clear()
+            if report is not None:
+                report.remove(elem)
+
+
+def iter_nessus_chunks(filepath, col_map, chunk_size):
+    """Отдаёт отчёт частями (DataFrame по chunk_size строк) с колонкой _original_index."""
+    columns = list(col_map.values())
+    chunk = []
+    row_number = 0
+    for row in iter_nessus_rows(filepath, col_map):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            df = pd.DataFrame(chunk, columns=columns, dtype=object)
+            df['_original_index'] = range(row_number + 1, row_number + len(chunk) + 1)
+            row_number += len(chunk)
+            chunk = []
+            yield df
+    if chunk:
+        df = pd.DataFrame(chunk, columns=columns, dtype=object)
+        df['_original_index'] = range(row_number + 1, row_number + len(chunk) + 1)
+        yield df
+
+
+def read_nessus(filepath, col_map):
+    """Весь отчёт .nessus одним DataFrame (все значения — str), как read_excel(dtype=str).fillna("")."""
+    return pd.DataFrame(list(iter_nessus_rows(filepath, col_map)), columns=list(col_map.values()), dtype=object)
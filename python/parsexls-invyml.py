@@ -1,7 +1,183 @@
+import numpy as np
 import pandas as pd
 import yaml
 import ipaddress
-from typing import Dict, List, Any
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+REQUIRED_COLUMNS = ['Name', 'HostName', 'Ip-address']
+ANSIBLE_USER = 'your_username'  # Замените на нужное имя пользователя
+# Порядок переменных хоста в inventory с группами (parse_excel_with_groups, динамический inventory)
+GROUPS_VAR_ORDER = ['ansible_host', 'ansible_user', 'network_mask', 'hostname']
+
+# IPv4 в каноническом виде (без ведущих нулей) с необязательной длиной префикса проверяется
+# векторно; остальные значения (IPv6, маска вида /255.255.255.0, ошибки) — через ipaddress
+_OCTET = r'(0|[1-9][0-9]{0,2})'
+_IPV4_PATTERN = rf'{_OCTET}\.{_OCTET}\.{_OCTET}\.{_OCTET}(?:/(0|[1-9][0-9]?))?'
+
+_STR_TAG = 'tag:yaml.org,2002:str'
+_INT_TAG = 'tag:yaml.org,2002:int'
+_MAP_TAG = 'tag:yaml.org,2002:map'
+_resolver = yaml.resolver.Resolver()
+# libyaml, если PyYAML собран с ним (вывод тот же, что у yaml.Dumper, но в разы быстрее)
+_DUMPER = getattr(yaml, 'CDumper', yaml.Dumper)
+
+def _text_column(column: pd.Series) -> pd.Series:
+    """Значения как str(value).strip() (пустая ячейка -> 'nan', как при построчной обработке)"""
+    return column.astype(object).map(str).astype(str).str.strip()
+
+def _parse_networks(ip_addresses: pd.Series) -> pd.DataFrame:
+    """
+    Векторная проверка колонки IP-адресов (с маской или без), каждое уникальное значение — один раз.
+    
+    Returns:
+        DataFrame (индекс как у ip_addresses): ansible_host — адрес сети без маски,
+        network_mask — длина префикса, error — текст ошибки ipaddress (None, если адрес корректен)
+    """
+    codes, uniques = pd.factorize(ip_addresses)
+    uniques = pd.Series(uniques, dtype=str)
+    hosts = pd.Series(None, index=uniques.index, dtype=object)
+    masks = pd.Series(0, index=uniques.index, dtype='int64')
+    errors = pd.Series(None, index=uniques.index, dtype=object)
+    
+    matched = uniques.str.fullmatch(_IPV4_PATTERN)
+    if matched.any():
+        parts = uniques[matched].str.split('/', n=1, expand=True)
+        octets = parts[0].str.split('.', expand=True).astype('int64').to_numpy()
+        if 1 in parts.columns:
+            prefix = parts[1].fillna('32').astype('int64').to_numpy()
+        else:
+            prefix = np.full(len(parts), 32, dtype='int64')
+        fast = (octets <= 255).all(axis=1) & (prefix <= 32)
+        address = (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+        network = address & ((0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF)
+        octet_text = [pd.Series((network[fast] >> shift) & 0xFF).astype(str) for shift in (24, 16, 8, 0)]
+        fast_index = matched.index[matched][fast]
+        hosts[fast_index] = (octet_text[0] + '.' + octet_text[1] + '.' + octet_text[2] + '.' + octet_text[3]).to_numpy()
+        masks[fast_index] = prefix[fast]
+        slow = uniques.index.difference(fast_index)
+    else:
+        slow = uniques.index
+    
+    for i in slow:
+        try:
+            network = ipaddress.ip_network(uniques[i], strict=False)
+            hosts[i] = str(network.network_address)
+            masks[i] = network.prefixlen
+        except ValueError as e:
+            errors[i] = str(e)
+    
+    return pd.DataFrame({
+        'ansible_host': hosts.to_numpy()[codes],
+        'network_mask': masks.to_numpy()[codes],
+        'error': errors.to_numpy()[codes],
+    }, index=ip_addresses.index)
+
+def _valid_hosts(df: pd.DataFrame, group_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    Строки с непустым Name и корректным IP-адресом (ошибки IP печатаются по каждой строке).
+    
+    Returns:
+        DataFrame с колонками name, hostname, ansible_host, network_mask и group (если указан group_column)
+    """
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Отсутствуют необходимые столбцы: {', '.join(missing_columns)}")
+    
+    names = _text_column(df['Name'])
+    # Пропускаем пустые строки
+    rows = df[names != '']
+    hosts = pd.DataFrame({'name': names[names != ''], 'hostname': _text_column(rows['HostName'])})
+    if group_column and group_column in df.columns:
+        hosts['group'] = _text_column(rows[group_column])
+    
+    ip_addresses = _text_column(rows['Ip-address'])
+    networks = _parse_networks(ip_addresses)
+    invalid = networks['error'].notna()
+    for index, ip_address, error in zip(ip_addresses.index[invalid], ip_addresses[invalid], networks['error'][invalid]):
+        print(f"Ошибка в строке {index + 1}: некорректный IP-адрес '{ip_address}' - {error}")
+    
+    hosts['ansible_host'] = networks['ansible_host']
+    hosts['network_mask'] = networks['network_mask']
+    return hosts[~invalid]
+
+def _unique_hosts(hosts: pd.DataFrame) -> pd.DataFrame:
+    """Повторяющиеся имена — как при записи в dict: место первого появления, значения последней строки"""
+    order = hosts.groupby('name', sort=False).ngroup().to_numpy()
+    last = hosts.assign(_order=order).drop_duplicates(subset='name', keep='last')
+    return last.sort_values('_order', kind='stable')
+
+def _scalar(value: Any) -> yaml.ScalarEvent:
+    """Скаляр в том же виде, в каком его записывает yaml.dump (в кавычках, только если нужно)"""
+    tag = _INT_TAG if isinstance(value, int) else _STR_TAG
+    text = str(value)
+    # Второй флаг — как у yaml.dump: совпадает ли тег с тегом строки по умолчанию
+    implicit = (tag == _resolver.resolve(yaml.ScalarNode, text, (True, False)), tag == _STR_TAG)
+    return yaml.ScalarEvent(None, tag, implicit, text)
+
+# Имена переменных, ansible_user и длины префикса повторяются у каждого хоста — события общие
+_common_scalar = lru_cache(maxsize=None)(_scalar)
+
+def _mapping_start() -> yaml.MappingStartEvent:
+    return yaml.MappingStartEvent(None, _MAP_TAG, True, flow_style=False)
+
+def _split_groups(hosts: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """Хосты без группы и группы (в порядке первого появления), если указана колонка для группировки"""
+    if 'group' not in hosts.columns:
+        return hosts, {}
+    grouped = hosts['group'] != ''
+    groups = {name: part for name, part in hosts[grouped].groupby('group', sort=False)}
+    return hosts[~grouped], groups
+
+def _host_vars(row: Any, var_order: List[str]) -> Dict[str, Any]:
+    """Переменные хоста в порядке var_order; hostname — только если он указан"""
+    host_vars = {
+        'ansible_host': row.ansible_host,
+        'ansible_user': ANSIBLE_USER,
+        'hostname': row.hostname,
+        'network_mask': int(row.network_mask),
+    }
+    return {key: host_vars[key] for key in var_order if key != 'hostname' or row.hostname}
+
+def _hosts_events(hosts: pd.DataFrame, var_order: List[str]) -> Iterator[yaml.Event]:
+    """Отображение имя хоста -> переменные"""
+    yield _mapping_start()
+    for row in _unique_hosts(hosts).itertuples(index=False):
+        yield _scalar(row.name)
+        yield _mapping_start()
+        for key, value in _host_vars(row, var_order).items():
+            yield _common_scalar(key)
+            yield _scalar(value) if key in ('ansible_host', 'hostname') else _common_scalar(value)
+        yield yaml.MappingEndEvent()
+    yield yaml.MappingEndEvent()
+
+def _inventory_events(hosts: pd.DataFrame, groups: Dict[str, pd.DataFrame], var_order: List[str]) -> Iterator[yaml.Event]:
+    """События YAML для all: {hosts: ..., children: {группа: {hosts: ...}}}"""
+    yield yaml.StreamStartEvent()
+    yield yaml.DocumentStartEvent(explicit=False)
+    yield _mapping_start()
+    yield _scalar('all')
+    yield _mapping_start()
+    yield _scalar('hosts')
+    yield from _hosts_events(hosts, var_order)
+    yield _scalar('children')
+    yield _mapping_start()
+    for group_name, group_hosts in groups.items():
+        yield _scalar(group_name)
+        yield _mapping_start()
+        yield _scalar('hosts')
+        yield from _hosts_events(group_hosts, var_order)
+        yield yaml.MappingEndEvent()
+    yield yaml.MappingEndEvent()
+    yield yaml.MappingEndEvent()
+    yield yaml.MappingEndEvent()
+    yield yaml.DocumentEndEvent(explicit=False)
+    yield yaml.StreamEndEvent()
+
+def _write_inventory(output_file: str, events: Iterator[yaml.Event]) -> None:
+    """Потоковая запись: события YAML пишутся по мере генерации, без словаря всего inventory"""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        yaml.emit(events, f, Dumper=_DUMPER, allow_unicode=True)
 
 def parse_excel_to_inventory(excel_file: str, output_file: str = 'inventory.yml') -> None:
     """
@@ -16,62 +192,15 @@ def parse_excel_to_inventory(excel_file: str, output_file: str = 'inventory.yml'
         # Чтение Excel файла
         df = pd.read_excel(excel_file)
         
-        # Проверка наличия необходимых столбцов
-        required_columns = ['Name', 'HostName', 'Ip-address']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            raise ValueError(f"Отсутствуют необходимые столбцы: {', '.join(missing_columns)}")
-        
-        # Создание структуры inventory
-        inventory = {
-            'all': {
-                'hosts': {},
-                'children': {}
-            }
-        }
-        
-        # Обработка каждой строки
-        for index, row in df.iterrows():
-            host_name = str(row['Name']).strip()
-            hostname = str(row['HostName']).strip()
-            ip_address = str(row['Ip-address']).strip()
-            
-            # Пропускаем пустые строки
-            if not host_name or pd.isna(host_name):
-                continue
-            
-            # Валидация IP-адреса с маской
-            try:
-                # Проверяем корректность IP-адреса с маской
-                network = ipaddress.ip_network(ip_address, strict=False)
-                # Извлекаем IP без маски для ansible_host
-                ip_without_mask = str(network.network_address)
-            except ValueError as e:
-                print(f"Ошибка в строке {index + 1}: некорректный IP-адрес '{ip_address}' - {e}")
-                continue
-            
-            # Создание записи для хоста
-            host_vars = {
-                'ansible_host': ip_without_mask,
-                'ansible_user': 'your_username'  # Замените на нужное имя пользователя
-            }
-            
-            # Добавляем hostname если он указан
-            if hostname and not pd.isna(hostname):
-                host_vars['hostname'] = hostname
-            
-            # Добавляем маску сети если нужно
-            host_vars['network_mask'] = network.prefixlen
-            
-            inventory['all']['hosts'][host_name] = host_vars
+        # Проверка столбцов, валидация IP-адресов (по колонке целиком) и нормализация значений
+        hosts = _valid_hosts(df)
         
         # Запись в YAML файл
-        with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(inventory, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        _write_inventory(output_file, _inventory_events(
+            hosts, {}, ['ansible_host', 'ansible_user', 'hostname', 'network_mask']))
         
         print(f"Inventory файл успешно создан: {output_file}")
-        print(f"Обработано хостов: {len(inventory['all']['hosts'])}")
+        print(f"Обработано хостов: {hosts['name'].nunique()}")
         
     except FileNotFoundError:
         print(f"Ошибка: Файл '{excel_file}' не найден")
@@ -91,63 +220,44 @@ def parse_excel_with_groups(excel_file: str, output_file: str = 'inventory.yml',
     try:
         df = pd.read_excel(excel_file)
         
-        required_columns = ['Name', 'HostName', 'Ip-address']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            raise ValueError(f"Отсутствуют необходимые столбцы: {', '.join(missing_columns)}")
-        
-        inventory = {
-            'all': {
-                'hosts': {},
-                'children': {}
-            }
-        }
+        # Обработка групп если указана колонка для группировки
+        hosts, groups = _split_groups(_valid_hosts(df, group_column))
         
-        for index, row in df.iterrows():
-            host_name = str(row['Name']).strip()
-            hostname = str(row['HostName']).strip()
-            ip_address = str(row['Ip-address']).strip()
-            
-            if not host_name or pd.isna(host_name):
-                continue
-            
-            try:
-                network = ipaddress.ip_network(ip_address, strict=False)
-                ip_without_mask = str(network.network_address)
-            except ValueError as e:
-                print(f"Ошибка в строке {index + 1}: некорректный IP-адрес '{ip_address}' - {e}")
-                continue
-            
-            host_vars = {
-                'ansible_host': ip_without_mask,
-                'ansible_user': 'your_username',
-                'network_mask': network.prefixlen
-            }
-            
-            if hostname and not pd.isna(hostname):
-                host_vars['hostname'] = hostname
-            
-            # Обработка групп если указана колонка для группировки
-            if group_column and group_column in df.columns:
-                group_name = str(row[group_column]).strip()
-                if group_name and not pd.isna(group_name):
-                    if group_name not in inventory['all']['children']:
-                        inventory['all']['children'][group_name] = {'hosts': {}}
-                    inventory['all']['children'][group_name]['hosts'][host_name] = host_vars
-                else:
-                    inventory['all']['hosts'][host_name] = host_vars
-            else:
-                inventory['all']['hosts'][host_name] = host_vars
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(inventory, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        _write_inventory(output_file, _inventory_events(hosts, groups, GROUPS_VAR_ORDER))
         
         print(f"Inventory файл успешно создан: {output_file}")
         
     except Exception as e:
         print(f"Ошибка при обработке файла: {e}")
 
+def build_dynamic_inventory(excel_file: str, group_column: str = None) -> Dict[str, Any]:
+    """
+    Inventory в формате JSON динамического inventory Ansible (ответ на --list): те же хосты,
+    группы и переменные, что в YAML от parse_excel_with_groups.
+    
+    Args:
+        excel_file (str): Путь к Excel файлу
+        group_column (str): Название столбца для группировки (опционально)
+    
+    Returns:
+        dict: {'all': {'hosts': [...], 'children': [...]}, группа: {'hosts': [...]}, '_meta': {'hostvars': {...}}}
+    """
+    df = pd.read_excel(excel_file)
+    hosts, groups = _split_groups(_valid_hosts(df, group_column))
+    
+    # Хост из нескольких групп получает переменные последнего вхождения — как при чтении YAML Ansible
+    hostvars = {}
+    inventory = {}
+    for group_name, group_hosts in [('all', hosts), *groups.items()]:
+        names = []
+        for row in _unique_hosts(group_hosts).itertuples(index=False):
+            hostvars[row.name] = _host_vars(row, GROUPS_VAR_ORDER)
+            names.append(row.name)
+        inventory[group_name] = {'hosts': names}
+    inventory['all']['children'] = list(groups)
+    inventory['_meta'] = {'hostvars': hostvars}
+    return inventory
+
 # Пример использования
 if __name__ == "__main__":
     # Базовый вариант
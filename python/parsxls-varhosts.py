@@ -1,47 +1,131 @@
 #!/usr/bin/env python3
 """
 Упрощенный парсер Excel для hosts.yml
+
+Таблица читается потоково (openpyxl read_only), по одной строке, без загрузки всей книги.
+
+    python3 parsxls-varhosts.py hosts.xlsx                      # спросит столбец, hosts.yml: {hosts: "a,b,c"}
+    python3 parsxls-varhosts.py hosts.xlsx -c Name -n 4         # hosts_1.yml ... hosts_4.yml
+    python3 parsxls-varhosts.py hosts.xlsx -c Name -n 4 --inventory   # hosts.yml с группами batch_1 ... batch_4
+
+Пакеты (-n) — части списка подряд, размеры отличаются не больше чем на один хост; повторяющиеся
+хосты при разбиении убираются, чтобы один хост не попал в два параллельных запуска:
+
+    ansible-playbook playbooks/get_pkg_ver_min.yml -e @hosts_1.yml &
+    ansible-playbook playbooks/get_pkg_ver_min.yml -e @hosts_2.yml &
+
+С --inventory пишется обычный inventory (без огромной extra-переменной), пакет выбирается группой:
+
+    ansible-playbook -i hosts.yml playbooks/get_pkg_ver_min.yml -e hosts=batch_1
 """
 
+import argparse
+import os
 import sys
 from openpyxl import load_workbook
 import yaml
 
-def main():
-    if len(sys.argv) < 2:
-        print("Использование: python3 script.py <excel-file>")
-        sys.exit(1)
+def read_hosts(excel_file, column=None):
+    """
+    Значения столбца с хостами (столбец по заголовку в первой строке активного листа).
+    Если column не задан — выводит список столбцов и спрашивает имя.
+    """
+    wb = load_workbook(excel_file, read_only=True)
+    try:
+        ws = wb.active
+        rows = ws.iter_rows(values_only=True)
     
-    excel_file = sys.argv[1]
+        # Получаем заголовки (номер столбца — по фактической позиции, пустые заголовки пропускаются)
+        header_row = next(rows, ())
+        headers = {str(value): idx for idx, value in enumerate(header_row) if value}
     
-    # Загружаем Excel
-    wb = load_workbook(excel_file)
-    ws = wb.active
+        if column is None:
+            print("Столбцы:", ", ".join(headers))
+            column = input("Введите имя столбца с хостами: ").strip()
     
-    # Получаем заголовки
-    headers = [ws.cell(1, col).value for col in range(1, ws.max_column + 1) if ws.cell(1, col).value]
+        if column not in headers:
+            print(f"Ошибка: Столбец '{column}' не найден")
+            sys.exit(1)
     
-    print("Столбцы:", ", ".join(headers))
-    column = input("Введите имя столбца с хостами: ").strip()
+        # Собираем хосты
+        col_idx = headers[column]
+        hosts = []
+        for row in rows:
+            host = row[col_idx] if col_idx < len(row) else None
+            if host:
+                hosts.append(str(host).strip())
+        return hosts
+    finally:
+        wb.close()
+
+def split_batches(hosts, batches):
+    """N частей подряд, размеры отличаются не больше чем на один хост (пустые части не создаются)."""
+    batches = max(1, min(batches, len(hosts)))
+    size, extra = divmod(len(hosts), batches)
+    result = []
+    start = 0
+    for i in range(batches):
+        end = start + size + (1 if i < extra else 0)
+        result.append(hosts[start:end])
+        start = end
+    return result
+
+def batch_path(output, number):
+    """hosts.yml -> hosts_<номер>.yml"""
+    root, ext = os.path.splitext(output)
+    return f"{root}_{number}{ext}"
+
+def write_vars(output, hosts):
+    with open(output, 'w') as f:
+        yaml.dump({'hosts': ','.join(hosts)}, f)
+
+def write_inventory(output, batches):
+    """Inventory: один пакет — all.hosts, несколько — группы batch_1 ... batch_N."""
+    if len(batches) == 1:
+        inventory = {'all': {'hosts': dict.fromkeys(batches[0])}}
+    else:
+        children = {f"batch_{i}": {'hosts': dict.fromkeys(batch)} for i, batch in enumerate(batches, 1)}
+        inventory = {'all': {'children': children}}
+    with open(output, 'w') as f:
+        yaml.dump(inventory, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Список хостов из Excel для Ansible (hosts.yml)")
+    parser.add_argument("excel_file", help="Excel-файл с хостами")
+    parser.add_argument("-c", "--column", help="столбец с хостами (без него — интерактивный выбор)")
+    parser.add_argument("-o", "--output", default="hosts.yml", help="файл результата (по умолчанию hosts.yml)")
+    parser.add_argument("-n", "--batches", type=int, default=1,
+                        help="разбить хосты на N пакетов примерно равного размера")
+    parser.add_argument("--inventory", action="store_true",
+                        help="писать inventory (пакеты — группы batch_N) вместо переменной hosts")
+    args = parser.parse_args()
+    if args.batches < 1:
+        parser.error("--batches должно быть не меньше 1")
     
-    if column not in headers:
-        print("Ошибка: Столбец не найден")
-        sys.exit(1)
+    # Загружаем Excel
+    hosts = read_hosts(args.excel_file, args.column)
     
-    # Собираем хосты
-    col_idx = headers.index(column) + 1
-    hosts = []
+    if args.batches == 1 and not args.inventory:
+        # Сохраняем
+        write_vars(args.output, hosts)
+        print(f"Создан {args.output} с {len(hosts)} хостами")
+        return
     
-    for row in range(2, ws.max_row + 1):
-        host = ws.cell(row, col_idx).value
-        if host:
-            hosts.append(str(host).strip())
+    # Пустые (из одних пробелов) значения в пакеты не попадают
+    unique_hosts = list(dict.fromkeys(host for host in hosts if host))
+    if len(unique_hosts) < len(hosts):
+        print(f"Повторяющихся и пустых значений пропущено: {len(hosts) - len(unique_hosts)}")
+    batches = split_batches(unique_hosts, args.batches)
     
-    # Сохраняем
-    with open('hosts.yml', 'w') as f:
-        yaml.dump({'hosts': ','.join(hosts)}, f)
+    if args.inventory:
+        write_inventory(args.output, batches)
+        print(f"Создан {args.output} с {len(unique_hosts)} хостами в {len(batches)} пакетах")
+        return
     
-    print(f"Создан hosts.yml с {len(hosts)} хостами")
+    for number, batch in enumerate(batches, 1):
+        output = batch_path(args.output, number)
+        write_vars(output, batch)
+        print(f"Создан {output} с {len(batch)} хостами")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Кэш и сводная таблица версий PostgreSQL (клиент psql и сервер) для ansible/playbooks/get_pg_versions.yml.
+
+Кэш — JSON на управляющем узле: хост -> {collected_at, client, server}. Запись действительна
+CACHE_TTL_HOURS часов; плейбук подключается только к хостам без действительной записи.
+
+    python pg_versions_table.py stale --hosts web1,web2,db1          # JSON-список хостов для опроса
+    python pg_versions_table.py update pg_versions.jsonl --hosts web1,web2,db1 -o pg_versions.xlsx
+
+update добавляет в кэш ответы опрошенных хостов (JSON Lines, как у pkg_versions_table.py:
+{"host": ..., "reachable": ..., "stdout": "CLIENT\\t...\\nSERVER\\t..."}) и пишет таблицу по всем
+хостам --hosts: свежие данные и данные из кэша. Недоступные хосты в кэш не попадают
+и опрашиваются при следующем запуске.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+
+# ========== НАСТРОЙКИ ==========
+CACHE_FILE = "pg_versions_cache.json"   # Кэш версий по хостам
+CACHE_TTL_HOURS = 24                    # Запись кэша действительна столько часов
+CACHE_KEEP_DAYS = 30                    # Записи хостов, не опрашивавшихся дольше, удаляются
+OUTPUT_FILE = "pg_versions.csv"         # Таблица: .csv (разделитель ;) или .xlsx
+# ================================
+
+CLIENT_MISSING = "NOT_INSTALLED"         # Как в get_pg_ver_min.yml
+SERVER_MISSING = "NOT_RUNNING"
+UNREACHABLE = "НЕДОСТУПЕН"
+
+COLUMNS = ["Хост", "Версия клиента", "Версия сервера", "Клиент (psql --version)", "Сервер (SELECT version())",
+           "Собрано", "Из кэша", "Статус"]
+
+_VERSION = re.compile(r"PostgreSQL\)?\s+(\d+(?:\.\d+)*\w*)")
+
+
+def read_cache(cache_file):
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def write_cache(cache_file, cache):
+    """Атомарно записывает кэш."""
+    os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+    tmp = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, cache_file)
+
+
+def is_fresh(entry, now, ttl_hours):
+    return isinstance(entry, dict) and now - entry.get("collected_at", 0) <= ttl_hours * 3600
+
+
+def stale_hosts(hosts, cache, ttl_hours, now=None):
+    """Хосты без действительной записи кэша (в порядке hosts)."""
+    now = time.time() if now is None else now
+    return [host for host in hosts if not is_fresh(cache.get(host), now, ttl_hours)]
+
+
+def parse_output(stdout):
+    """Ответ хоста -> {'client': строка psql --version или None, 'server': SELECT version() или None}."""
+    entry = {"client": None, "server": None}
+    for line in stdout.splitlines():
+        kind, _, value = line.partition("\t")
+        if kind == "CLIENT" and value.strip():
+            entry["client"] = value.strip()
+        elif kind == "SERVER" and value.strip():
+            entry["server"] = value.strip()
+    return entry
+
+
+def short_version(text):
+    """'psql (PostgreSQL) 15.4' / 'PostgreSQL 15.4 on x86_64-...' -> '15.4'."""
+    if not text:
+        return None
+    match = _VERSION.search(text)
+    return match.group(1) if match else text
+
+
+def read_responses(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def update_cache(cache, responses, now=None):
+    """Добавляет в кэш ответы доступных хостов. Возвращает множество недоступных."""
+    now = time.time() if now is None else now
+    unreachable = set()
+    for response in responses:
+        if response.get("reachable", True):
+            cache[response["host"]] = dict(parse_output(response.get("stdout") or ""), collected_at=now)
+        else:
+            unreachable.add(response["host"])
+    return unreachable
+
+
+def build_rows(hosts, cache, collected, unreachable):
+    """Строки таблицы по hosts: collected — хосты, опрошенные в этом запуске."""
+    rows = []
+    for host in hosts:
+        entry = cache.get(host)
+        if host in unreachable:
+            status = UNREACHABLE if entry is None else f"{UNREACHABLE} (данные из кэша)"
+        else:
+            status = "OK" if entry is not None else "НЕТ ДАННЫХ"
+        if entry is None:
+            rows.append([host, None, None, None, None, None, False, status])
+            continue
+        client = entry.get("client") or CLIENT_MISSING
+        server = entry.get("server") or SERVER_MISSING
+        rows.append([
+            host,
+            short_version(entry.get("client")) or CLIENT_MISSING,
+            short_version(entry.get("server")) or SERVER_MISSING,
+            client,
+            server,
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["collected_at"])),
+            host not in collected,
+            status,
+        ])
+    return rows
+
+
+def write_table(path, rows):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".xlsx":
+        import pandas as pd
+        from xlsx_writer import write_sheets
+        write_sheets(path, [("PostgreSQL", pd.DataFrame(rows, columns=COLUMNS))])
+    else:
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(COLUMNS)
+            writer.writerows(rows)
+
+
+def split_hosts(text):
+    return list(dict.fromkeys(host.strip() for host in (text or "").split(",") if host.strip()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Кэш и таблица версий PostgreSQL по хостам")
+    parser.add_argument("--cache", default=CACHE_FILE, help=f"файл кэша (по умолчанию {CACHE_FILE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stale = commands.add_parser("stale", help="хосты, которые нужно опросить (JSON-список)")
+    stale.add_argument("--hosts", required=True, help="хосты через запятую")
+    stale.add_argument("--ttl", type=float, default=CACHE_TTL_HOURS, help="срок годности записи, часов (0 — все)")
+
+    update = commands.add_parser("update", help="добавить ответы в кэш и построить таблицу")
+    update.add_argument("responses", help="ответы опрошенных хостов (JSON Lines)")
+    update.add_argument("--hosts", required=True, help="хосты таблицы через запятую")
+    update.add_argument("-o", "--output", default=OUTPUT_FILE, help=f"таблица .csv или .xlsx (по умолчанию {OUTPUT_FILE})")
+    args = parser.parse_args(argv)
+
+    cache = read_cache(args.cache)
+    hosts = split_hosts(args.hosts)
+    if args.command == "stale":
+        print(json.dumps(stale_hosts(hosts, cache, args.ttl)))
+        return 0
+
+    responses = read_responses(args.responses)
+    now = time.time()
+    unreachable = update_cache(cache, responses, now)
+    collected = {response["host"] for response in responses} - unreachable
+    keep = now - CACHE_KEEP_DAYS * 86400
+    cache = {host: entry for host, entry in cache.items() if entry.get("collected_at", 0) >= keep or host in hosts}
+    write_cache(args.cache, cache)
+
+    rows = build_rows(hosts, cache, collected, unreachable)
+    write_table(args.output, rows)
+    print(f"Хостов: {len(rows)}, опрошено: {len(collected)}, из кэша: {sum(1 for row in rows if row[6])}, "
+          f"недоступно: {len(unreachable)}")
+    servers = {}
+    for row in rows:
+        if row[2] is not None:
+            servers[row[2]] = servers.get(row[2], 0) + 1
+    for version, count in sorted(servers.items(), key=lambda item: -item[1]):
+        print(f"  Сервер {version}: {count}")
+    print(f"✅ Таблица: {args.output}, кэш: {args.cache}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Таблица версий пакетов хост × пакет по ответам плейбука ansible/playbooks/get_pkg_versions.yml.
+
+Плейбук на каждом хосте одной командой rpm -q / dpkg-query -W запрашивает только нужные пакеты
+и сохраняет ответы всех хостов на управляющем узле в JSON Lines:
+    {"host": "web1", "reachable": true, "stdout": "OS\\t...\\nMANAGER\\trpm\\nRPM\\topenssl\\t..."}
+Этот скрипт сводит их в одну таблицу (CSV или xlsx) и печатает сводку по версиям.
+
+    python pkg_versions_table.py pkg_versions.jsonl -p openssl,bash -o pkg_versions.xlsx
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter
+
+# ========== НАСТРОЙКИ ==========
+INPUT_FILE = "pkg_versions.jsonl"       # Ответы хостов (пишет get_pkg_versions.yml)
+OUTPUT_FILE = "pkg_versions.csv"        # Таблица: .csv (разделитель ;) или .xlsx
+NOT_INSTALLED = "НЕ УСТАНОВЛЕН"         # Значение ячейки, если пакета нет
+UNREACHABLE = "НЕДОСТУПЕН"              # Значение ячеек пакетов для недоступного хоста
+SHOW_ARCH = True                        # Добавлять архитектуру к версии: "1.1.1k-12.el8 (x86_64)"
+# ================================
+
+
+def parse_output(stdout):
+    """
+    Ответ одного хоста -> (ОС, менеджер пакетов, {пакет: [(версия, архитектура), ...]}).
+    Несколько строк одного пакета (например, i686 и x86_64) сохраняются все.
+    """
+    os_name = manager = None
+    packages = {}
+    for line in stdout.splitlines():
+        fields = line.split("\t")
+        if fields[0] == "OS" and len(fields) > 1:
+            os_name = fields[1]
+        elif fields[0] == "MANAGER" and len(fields) > 1:
+            manager = fields[1]
+        elif fields[0] == "RPM" and len(fields) >= 5:
+            _, name, epoch, version, arch = fields[:5]
+            if epoch not in ("", "(none)"):
+                version = f"{epoch}:{version}"
+            packages.setdefault(name, []).append((version, arch))
+        elif fields[0] == "DPKG" and len(fields) >= 5:
+            _, name, version, arch, status = fields[:5]
+            # Второй символ статуса — состояние пакета: i — установлен (rc, un — нет)
+            if len(status) > 1 and status[1] == "i":
+                packages.setdefault(name, []).append((version, arch))
+    return os_name, manager, packages
+
+
+def format_versions(versions, show_arch=SHOW_ARCH):
+    if not versions:
+        return NOT_INSTALLED
+    if show_arch:
+        return ", ".join(f"{version} ({arch})" for version, arch in versions)
+    return ", ".join(dict.fromkeys(version for version, _ in versions))
+
+
+def read_responses(path):
+    """Ответы хостов из JSON Lines (пустые строки пропускаются)."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_table(responses, package_names=None, show_arch=SHOW_ARCH):
+    """
+    Строки таблицы: [хост, ОС, менеджер, версия пакета 1, ...] и список пакетов (колонок).
+    Если package_names не задан — все пакеты, найденные хотя бы на одном хосте.
+    """
+    parsed = []
+    for response in responses:
+        if response.get("reachable", True):
+            parsed.append((response["host"], True, *parse_output(response.get("stdout") or "")))
+        else:
+            parsed.append((response["host"], False, None, None, {}))
+    if not package_names:
+        package_names = list(dict.fromkeys(name for *_, packages in parsed for name in packages))
+
+    rows = []
+    for host, reachable, os_name, manager, packages in parsed:
+        if reachable:
+            cells = [format_versions(packages.get(name), show_arch) for name in package_names]
+        else:
+            cells = [UNREACHABLE] * len(package_names)
+        rows.append([host, os_name, manager, *cells])
+    return rows, package_names
+
+
+def write_table(path, header, rows):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".xlsx":
+        import pandas as pd
+        from xlsx_writer import write_sheets
+        write_sheets(path, [("Версии пакетов", pd.DataFrame(rows, columns=header))])
+    else:
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(header)
+            writer.writerows(rows)
+
+
+def print_summary(rows, package_names, top=5):
+    """По каждому пакету: сколько хостов с каждой версией (самые частые)."""
+    for i, name in enumerate(package_names, start=3):
+        counts = Counter(row[i] for row in rows)
+        print(f"{name}:")
+        for value, count in counts.most_common(top):
+            print(f"  {value}: {count}")
+        if len(counts) > top:
+            print(f"  ... ещё вариантов: {len(counts) - top}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Таблица версий пакетов хост × пакет")
+    parser.add_argument("input", nargs="?", default=INPUT_FILE, help=f"ответы хостов (по умолчанию {INPUT_FILE})")
+    parser.add_argument("-p", "--packages", help="пакеты через запятую (порядок колонок)")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE, help=f"таблица .csv или .xlsx (по умолчанию {OUTPUT_FILE})")
+    parser.add_argument("--no-arch", action="store_true", help="не добавлять архитектуру к версии")
+    args = parser.parse_args(argv)
+
+    package_names = [name.strip() for name in (args.packages or "").split(",") if name.strip()]
+    try:
+        responses = read_responses(args.input)
+    except FileNotFoundError:
+        print(f"Ошибка: Файл '{args.input}' не найден")
+        return 1
+    rows, package_names = build_table(responses, package_names, not args.no_arch)
+    write_table(args.output, ["Хост", "ОС", "Менеджер пакетов", *package_names], rows)
+
+    print_summary(rows, package_names)
+    unreachable = sum(1 for response in responses if not response.get("reachable", True))
+    print(f"✅ Хостов: {len(rows)} (недоступно {unreachable}), пакетов: {len(package_names)} -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
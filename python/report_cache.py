@@ -0,0 +1,220 @@
+"""
+Кэш разобранных отчётов (DataFrame вместе с _id) на диске.
+
+Запись кэша привязана к файлу по пути, размеру, времени модификации и хэшу содержимого,
+а также к набору колонок (COLUMN_MAPPING), по которым считается _id.
+Если размер или mtime изменились, файл перехэшируется: при том же содержимом запись
+остаётся действительной, иначе отчёт разбирается заново.
+Общий размер кэша ограничен, при превышении удаляются давно не использованные записи.
+
+Данные хранятся в parquet (нужен pyarrow или fastparquet), если он недоступен — в pickle.
+
+Кэшем могут одновременно пользоваться несколько процессов (например, watch_reports.py и ручной
+запуск): индекс записывается под блокировкой файла index.lock и объединяется с тем, что уже
+лежит на диске, поэтому записи, добавленные другим процессом, не теряются.
+"""
+
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:                       # Windows
+    fcntl = None
+    import msvcrt
+
+CACHE_VERSION = 3                         # менять при изменении формата/расчёта _id (3: _id — int64)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3         # 2 ГБ
+INDEX_NAME = "index.json"
+LOCK_NAME = "index.lock"
+
+
+def _parquet_available():
+    for module in ("pyarrow", "fastparquet"):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+def file_hash(filepath, chunk_size=1024 * 1024):
+    """sha256 содержимого файла."""
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def col_map_key(col_map, version=CACHE_VERSION):
+    """Ключ набора колонок: при другом COLUMN_MAPPING (или версии) кэш не используется."""
+    data = json.dumps([version, col_map], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+
+def read_index(cache_dir):
+    """Читает индекс кэша (пустой словарь, если кэша ещё нет)."""
+    path = os.path.join(cache_dir, INDEX_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+@contextmanager
+def _index_lock(cache_dir):
+    """Исключительная блокировка индекса кэша (между процессами)."""
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, LOCK_NAME), 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _has_data(cache_dir, entry):
+    return 'data_file' in entry and os.path.isfile(os.path.join(cache_dir, entry['data_file']))
+
+
+def write_index(cache_dir, index):
+    """
+    Атомарно записывает индекс кэша, объединяя его с индексом на диске под блокировкой:
+    записи index заменяют одноимённые, записи других процессов сохраняются. Записи, чьи
+    файлы данных удалены (вытеснены этим или другим процессом), отбрасываются.
+    index обновляется до записанного состояния.
+    """
+    with _index_lock(cache_dir):
+        merged = read_index(cache_dir)
+        merged.update(index)
+        merged = {key: entry for key, entry in merged.items() if _has_data(cache_dir, entry)}
+        path = os.path.join(cache_dir, INDEX_NAME)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    index.clear()
+    index.update(merged)
+
+
+def _remove_data(cache_dir, entry):
+    try:
+        os.remove(os.path.join(cache_dir, entry['data_file']))
+    except (FileNotFoundError, KeyError):
+        pass
+
+
+def _entry_key(filepath, col_map, kind):
+    return f"{os.path.abspath(filepath)}|{col_map_key(col_map)}|{kind}"
+
+
+def _read_data(cache_dir, entry):
+    data_path = os.path.join(cache_dir, entry['data_file'])
+    if entry['data_file'].endswith('.parquet'):
+        return pd.read_parquet(data_path)
+    return pd.read_pickle(data_path)
+
+
+def _write_data(cache_dir, name, df):
+    if _parquet_available():
+        data_file = f"{name}.parquet"
+        tmp = os.path.join(cache_dir, f"{data_file}.{os.getpid()}.tmp")
+        df.to_parquet(tmp, index=False)
+    else:
+        data_file = f"{name}.pkl"
+        tmp = os.path.join(cache_dir, f"{data_file}.{os.getpid()}.tmp")
+        df.reset_index(drop=True).to_pickle(tmp)
+    os.replace(tmp, os.path.join(cache_dir, data_file))
+    return data_file
+
+
+def lookup(filepath, col_map, cache_dir, index=None, kind=""):
+    """
+    Ищет действительную запись кэша для файла.
+    Возвращает DataFrame или None (нет записи / файл изменился / данные повреждены).
+    """
+    index = read_index(cache_dir) if index is None else index
+    key = _entry_key(filepath, col_map, kind)
+    entry = index.get(key)
+    if entry is None:
+        return None
+    st = os.stat(filepath)
+    if entry['size'] != st.st_size or entry['mtime_ns'] != st.st_mtime_ns:
+        # Файл трогали: проверяем, изменилось ли содержимое
+        if entry['size'] != st.st_size or entry['sha256'] != file_hash(filepath):
+            return None
+        entry['mtime_ns'] = st.st_mtime_ns
+    try:
+        df = _read_data(cache_dir, entry)
+    except Exception:
+        return None
+    entry['last_used'] = time.time()
+    return df
+
+
+def store(filepath, col_map, df, cache_dir, index=None, max_bytes=DEFAULT_MAX_BYTES, kind=""):
+    """Сохраняет разобранный отчёт в кэш и применяет ограничение по размеру."""
+    os.makedirs(cache_dir, exist_ok=True)
+    index = read_index(cache_dir) if index is None else index
+    key = _entry_key(filepath, col_map, kind)
+    st = os.stat(filepath)
+    name = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+    if key in index:
+        _remove_data(cache_dir, index[key])
+    data_file = _write_data(cache_dir, name, df)
+    index[key] = {
+        'path': os.path.abspath(filepath),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sha256': file_hash(filepath),
+        'data_file': data_file,
+        'data_bytes': os.path.getsize(os.path.join(cache_dir, data_file)),
+        'last_used': time.time()
+    }
+    evict(index, cache_dir, max_bytes)
+    return index
+
+
+def evict(index, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+    """Удаляет давно не использованные записи, пока кэш больше max_bytes."""
+    total = sum(e['data_bytes'] for e in index.values())
+    for key, entry in sorted(index.items(), key=lambda kv: kv[1]['last_used']):
+        if total <= max_bytes:
+            break
+        _remove_data(cache_dir, entry)
+        total -= entry['data_bytes']
+        del index[key]
+
+
+def load_with_cache(filepath, col_map, loader, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Возвращает loader(filepath, col_map), используя кэш в cache_dir.
+    Записи разных загрузчиков (полный отчёт / только _id) хранятся раздельно.
+    Если cache_dir пустой (None/""), кэш не используется.
+    """
+    if not cache_dir:
+        return loader(filepath, col_map)
+    kind = getattr(loader, '__name__', '')
+    index = read_index(cache_dir)
+    df = lookup(filepath, col_map, cache_dir, index, kind)
+    if df is None:
+        df = loader(filepath, col_map)
+        store(filepath, col_map, df, cache_dir, index, max_bytes, kind)
+    write_index(cache_dir, index)
+    return df
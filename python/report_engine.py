@@ -0,0 +1,130 @@
+"""
+Движок объединения таблиц для скриптов сравнения отчётов (настройка ENGINE).
+
+Движок выполняет три операции над целочисленными ключами _id:
+    first_rows(df)              — первая строка по каждому _id (в порядке строк);
+    lookup(table, keys)         — строки table (индекс _id) для каждого ключа keys, без совпадения — NaN;
+    left_join(left, right, on)  — left join: строки left по порядку, совпадения right — в порядке right.
+
+"pandas" (по умолчанию) — встроенные операции pandas. "duckdb" и "polars" — многопоточные
+колоночные движки (нужен установленный пакет): они вычисляют только номера строк по колонке
+ключей, а сами строки выбираются из исходных DataFrame. Поэтому результат — тот же pandas
+DataFrame с теми же типами колонок, и листы Excel совпадают для любого движка.
+Загрузка отчётов, расчёт _id (vuln_id) и запись в Excel от движка не зависят.
+"""
+
+import numpy as np
+import pandas as pd
+
+ENGINES = ("pandas", "duckdb", "polars")
+
+_instances = {}
+
+
+class PandasEngine:
+    name = "pandas"
+
+    def first_rows(self, df, key='_id'):
+        return df.drop_duplicates(subset=key, keep='first')
+
+    def lookup(self, table, keys):
+        return table.reindex(keys)
+
+    def left_join(self, left, right, on):
+        return left.merge(right, on=on, how='left', sort=False)
+
+
+class _PositionEngine:
+    """Общая часть колоночных движков: по номерам строк, которые считает движок, собирает pandas DataFrame."""
+
+    def first_rows(self, df, key='_id'):
+        return df.iloc[self._first_positions(_keys(df[key]))]
+
+    def lookup(self, table, keys):
+        positions = self._lookup_positions(_keys(table.index), _keys(keys))
+        # -1 нет в RangeIndex — такие строки получают NaN, как при reindex
+        result = table.reset_index(drop=True).reindex(positions)
+        # Имя индекса — как у reindex: имя Series/Index ключей; для списка, массива
+        # и пустых ключей не-Index — имя индекса table
+        named = isinstance(keys, pd.Index) or (isinstance(keys, pd.Series) and len(keys))
+        name = keys.name if named else table.index.name
+        result.index = pd.Index(keys, name=name)
+        return result
+
+    def left_join(self, left, right, on):
+        left_pos, right_pos = self._join_positions(_keys(left[on]), _keys(right[on]))
+        left_part = left.iloc[left_pos].reset_index(drop=True)
+        right_part = right.drop(columns=[on]).reset_index(drop=True).reindex(right_pos).reset_index(drop=True)
+        return pd.concat([left_part, right_part], axis=1)
+
+
+def _keys(values):
+    return np.asarray(values, dtype=np.int64)
+
+
+class DuckDBEngine(_PositionEngine):
+    name = "duckdb"
+
+    def __init__(self):
+        import duckdb
+        self._con = duckdb.connect()
+
+    def _query(self, sql, **tables):
+        for name, keys in tables.items():
+            self._con.register(name, pd.DataFrame({'k': keys, 'p': np.arange(len(keys), dtype=np.int64)}))
+        try:
+            return self._con.execute(sql).fetchnumpy()
+        finally:
+            for name in tables:
+                self._con.unregister(name)
+
+    def _first_positions(self, keys):
+        result = self._query("SELECT min(p) AS p FROM t GROUP BY k ORDER BY p", t=keys)
+        return _keys(result['p'])
+
+    def _lookup_positions(self, table_keys, keys):
+        result = self._query("SELECT coalesce(t.p, -1) AS p FROM l LEFT JOIN t ON l.k = t.k ORDER BY l.p",
+                             l=keys, t=table_keys)
+        return _keys(result['p'])
+
+    def _join_positions(self, left_keys, right_keys):
+        result = self._query("SELECT l.p AS lp, coalesce(r.p, -1) AS rp FROM l LEFT JOIN r ON l.k = r.k "
+                             "ORDER BY l.p, r.p", l=left_keys, r=right_keys)
+        return _keys(result['lp']), _keys(result['rp'])
+
+
+class PolarsEngine(_PositionEngine):
+    name = "polars"
+
+    def __init__(self):
+        import polars
+        self._pl = polars
+
+    def _frame(self, keys, pos_name='p'):
+        return self._pl.DataFrame({'k': keys}).with_row_index(pos_name)
+
+    def _first_positions(self, keys):
+        first = self._frame(keys).group_by('k', maintain_order=True).agg(self._pl.col('p').first())
+        return _keys(first['p'].to_numpy())
+
+    def _lookup_positions(self, table_keys, keys):
+        joined = self._frame(keys, 'lp').join(self._frame(table_keys), on='k', how='left', maintain_order='left')
+        return _keys(joined['p'].fill_null(-1).to_numpy())
+
+    def _join_positions(self, left_keys, right_keys):
+        joined = self._frame(left_keys, 'lp').join(self._frame(right_keys, 'rp'), on='k', how='left')
+        joined = joined.sort(['lp', 'rp'], nulls_last=True)
+        return _keys(joined['lp'].to_numpy()), _keys(joined['rp'].fill_null(-1).to_numpy())
+
+
+def get_engine(name="pandas"):
+    """Движок по имени (один экземпляр на процесс). Для duckdb/polars нужен установленный пакет."""
+    if name not in ENGINES:
+        raise ValueError(f"Неизвестный движок {name!r}, доступны: {', '.join(ENGINES)}")
+    if name not in _instances:
+        engine_class = {"pandas": PandasEngine, "duckdb": DuckDBEngine, "polars": PolarsEngine}[name]
+        try:
+            _instances[name] = engine_class()
+        except ImportError as e:
+            raise ImportError(f"Для ENGINE={name!r} нужен пакет {name} (pip install {name})") from e
+    return _instances[name]
@@ -0,0 +1,71 @@
+"""
+Параллельная загрузка нескольких отчётов пулом процессов.
+
+Разбор Excel и расчёт _id выполняются в дочерних процессах; кэш (report_cache)
+читается и обновляется только в основном процессе. Результаты возвращаются
+в порядке входного списка файлов, ошибка одного файла не прерывает остальные.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from report_cache import DEFAULT_MAX_BYTES, lookup, read_index, store, write_index
+
+
+def resolve_workers(workers):
+    """0/None — по числу ядер, иначе как задано (не меньше 1)."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def load_reports(filepaths, col_map, loader, workers=1, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Загружает отчёты loader(filepath, col_map), при необходимости параллельно.
+    loader должен быть функцией уровня модуля (передаётся в дочерний процесс).
+    Возвращает список кортежей (filepath, df, error) в порядке filepaths:
+    при ошибке df = None, error — исключение.
+    """
+    results = [None] * len(filepaths)
+    kind = getattr(loader, '__name__', '')
+    index = read_index(cache_dir) if cache_dir else None
+
+    # 1. Что уже есть в кэше — берём сразу
+    todo = []
+    for i, fpath in enumerate(filepaths):
+        if cache_dir:
+            try:
+                df = lookup(fpath, col_map, cache_dir, index, kind)
+            except Exception as e:
+                results[i] = (fpath, None, e)
+                continue
+            if df is not None:
+                results[i] = (fpath, df, None)
+                continue
+        todo.append(i)
+
+    # 2. Остальное разбираем (в пуле, если есть смысл)
+    workers = min(resolve_workers(workers), len(todo))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {i: pool.submit(loader, filepaths[i], col_map) for i in todo}
+            for i, future in futures.items():
+                try:
+                    results[i] = (filepaths[i], future.result(), None)
+                except Exception as e:
+                    results[i] = (filepaths[i], None, e)
+    else:
+        for i in todo:
+            try:
+                results[i] = (filepaths[i], loader(filepaths[i], col_map), None)
+            except Exception as e:
+                results[i] = (filepaths[i], None, e)
+
+    # 3. Новые результаты — в кэш
+    if cache_dir:
+        for i in todo:
+            fpath, df, error = results[i]
+            if error is None:
+                store(fpath, col_map, df, cache_dir, index, max_bytes, kind)
+        write_index(cache_dir, index)
+    return results
@@ -0,0 +1,66 @@
+"""
+Лист "Источники комментариев": для каждой строки результата — все отчёты и строки,
+где встречается та же уязвимость (_id).
+
+Используется compare_multiple_reports.py и watch_reports.py (лист пишется вместе с результатом)
+и add_source_to_main_report.py (лист добавляется в уже готовый файл). Колонки во всех
+скриптах — COLUMN_MAPPING из compare_multiple_reports.py, поэтому лист совпадает.
+"""
+
+import os
+
+import pandas as pd
+
+from report_engine import get_engine
+from vuln_id import compute_vuln_ids
+
+
+def sources_frame(fpath, df, date):
+    """Строки одного отчёта в виде sources: id, filepath, filename, row_number, date_str."""
+    return pd.DataFrame({
+        'id': df['_id'].to_numpy(),
+        'filepath': fpath,
+        'filename': os.path.basename(fpath),
+        'row_number': df['_original_index'].to_numpy(dtype=object),
+        'date_str': date.strftime("%Y-%m-%d")
+    })
+
+
+def build_sources_sheet(df_main, sources, col_map, engine=None):
+    """
+    Формирует лист "Источники комментариев" одним left join по _id (целочисленный ключ)
+    движком engine (report_engine, по умолчанию pandas).
+    Порядок строк: как в основном файле, внутри строки — в порядке файлов и строк sources.
+    Строки без источника остаются с пустыми полями источника.
+    В колонку "ID уязвимости" выводится md5 hex, он считается только для строк основного файла.
+    """
+    def main_column(key):
+        col_name = col_map[key]
+        return df_main[col_name] if col_name in df_main.columns else ''
+
+    df_left = pd.DataFrame({
+        '№ строки в основном файле': df_main['_main_index'],
+        '_id': df_main['_id'],
+        'ID уязвимости': compute_vuln_ids(df_main, col_map),
+        'IP': main_column('ip'),
+        'Наименование уязвимости': main_column('vuln_name'),
+        'Порты': main_column('ports'),
+        'Комментарий (из основного)': main_column('comment'),
+        'Пачка (из основного)': main_column('pack'),
+    })
+    df_right = pd.DataFrame({
+        '_id': sources['id'].astype('int64'),
+        'Имя файла-источника': sources['filename'],
+        'Ссылка на файл': sources['filepath'],
+        'Номер строки в файле': sources['row_number'].astype(object),
+        'Дата отправки (из имени файла)': sources['date_str'],
+        '_source_order': range(len(sources))
+    })
+    merged = (engine or get_engine()).left_join(df_left, df_right, '_id')
+    # Явно фиксируем порядок: строка основного файла, затем порядок источников
+    merged = merged.sort_values(['№ строки в основном файле', '_source_order'], kind='stable')
+    merged = merged.drop(columns=['_id', '_source_order']).reset_index(drop=True)
+    source_cols = ['Имя файла-источника', 'Ссылка на файл', 'Номер строки в файле',
+                   'Дата отправки (из имени файла)']
+    merged[source_cols] = merged[source_cols].astype(object).fillna('')
+    return merged
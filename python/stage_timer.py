@@ -0,0 +1,219 @@
+"""
+Замер этапов обработки отчётов: время (wall и CPU), пиковая память (RSS) и скорость (строк/с).
+
+    timer = stage_timer.start("compare_multiple_reports")
+    with timer.stage("load") as st:
+        ...
+        st["rows"] += len(df)
+    timer.print_summary()
+    timer.write_json("timings.json")
+
+Вспомогательные функции (загрузчики) отмечают свои этапы через stage_timer.stage(...).
+Без активного замера и в дочерних процессах (пул загрузки: при fork замер наследуется,
+при spawn его нет) этап ничего не записывает, а вместо записи этапа отдаётся временный словарь,
+так что st["rows"] += ... работает везде.
+Время вложенного этапа вычитается из внешнего, поэтому сумма этапов равна общему времени.
+CPU включает завершившиеся дочерние процессы (пул загрузки).
+Пик памяти этапа — пик процесса к концу этапа. С RESET_STAGE_PEAK (или start(..., reset_peak=True))
+в Linux пик считается отдельно для каждого этапа: перед этапом VmHWM сбрасывается записью
+в /proc/self/clear_refs (это сбрасывает и биты обращений к страницам у всего процесса).
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:              # Windows
+    resource = None
+
+RESET_STAGE_PEAK = False         # Linux: пик памяти отдельно по этапам (сброс VmHWM через /proc/self/clear_refs)
+
+# ru_maxrss: КБ в Linux, байты в macOS
+_RSS_DIVISOR = 1024 * 1024 if sys.platform == "darwin" else 1024
+
+_active = None
+
+
+def _cpu_seconds():
+    cpu = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+    return cpu
+
+
+def _read_hwm_mb():
+    """Пик RSS процесса (VmHWM, Linux) в МБ или None."""
+    try:
+        with open("/proc/self/status") as f:
+            match = re.search(r"VmHWM:\s+(\d+)", f.read())
+        return int(match.group(1)) / 1024 if match else None
+    except OSError:
+        return None
+
+
+def _reset_hwm():
+    """Сбрасывает VmHWM до текущего RSS; False, если это недоступно."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    hwm = _read_hwm_mb()
+    if hwm is not None:
+        return hwm
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / _RSS_DIVISOR
+    return None
+
+
+def _new_entry():
+    return {"wall_s": 0.0, "cpu_s": 0.0, "rows": 0, "calls": 0, "peak_rss_mb": None}
+
+
+def _max(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+class StageTimer:
+    """Накопитель замеров по этапам одного запуска скрипта."""
+
+    def __init__(self, name, reset_peak=False):
+        self.name = name
+        self.started = datetime.now()
+        self.stages = {}                  # имя этапа -> накопленные значения (порядок — первого входа)
+        self._stack = []
+        self._pid = os.getpid()           # в процессах, унаследовавших замер через fork, он не ведётся
+        self._can_reset = reset_peak and _reset_hwm()
+        self._wall0 = time.perf_counter()
+        self._cpu0 = _cpu_seconds()
+        self._peak = _peak_rss_mb()
+
+    def _entry(self, name):
+        return self.stages.setdefault(name, _new_entry())
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        entry = self._entry(name)
+        # [время вложенных этапов, CPU вложенных этапов, пик памяти этапа до последнего сброса VmHWM]
+        frame = [0.0, 0.0, None]
+        if self._can_reset:
+            # Пик, набранный до входа, относится к внешнему этапу (и к итогу) — фиксируем и сбрасываем
+            self._carry_peak(_peak_rss_mb())
+            _reset_hwm()
+        self._stack.append(frame)
+        wall0, cpu0 = time.perf_counter(), _cpu_seconds()
+        try:
+            yield entry
+        finally:
+            wall, cpu = time.perf_counter() - wall0, _cpu_seconds() - cpu0
+            self._stack.pop()
+            peak = _max(frame[2], _peak_rss_mb())
+            entry["wall_s"] += wall - frame[0]
+            entry["cpu_s"] += cpu - frame[1]
+            entry["rows"] += rows
+            entry["calls"] += 1
+            entry["peak_rss_mb"] = _max(entry["peak_rss_mb"], peak)
+            if self._stack:
+                self._stack[-1][0] += wall
+                self._stack[-1][1] += cpu
+            self._carry_peak(peak)
+
+    def _carry_peak(self, peak):
+        """Учитывает пик во внешнем этапе (если есть) и в итоге запуска."""
+        if self._stack:
+            self._stack[-1][2] = _max(self._stack[-1][2], peak)
+        self._peak = _max(self._peak, peak)
+
+    def add_rows(self, name, rows):
+        """Добавляет число обработанных строк к этапу (если оно известно только после его начала)."""
+        self._entry(name)["rows"] += rows
+
+    def summary(self):
+        """Итог запуска: общие значения и список завершённых этапов (словарь для JSON)."""
+        wall = time.perf_counter() - self._wall0
+        stages = []
+        for name, entry in self.stages.items():
+            if not entry["calls"]:
+                continue
+            stages.append({
+                "stage": name,
+                "wall_s": round(entry["wall_s"], 3),
+                "cpu_s": round(entry["cpu_s"], 3),
+                "peak_rss_mb": round(entry["peak_rss_mb"], 1) if entry["peak_rss_mb"] is not None else None,
+                "rows": entry["rows"],
+                "rows_per_s": round(entry["rows"] / entry["wall_s"], 1) if entry["rows"] and entry["wall_s"] else None,
+                "calls": entry["calls"],
+            })
+        peak = _max(self._peak, _peak_rss_mb())
+        return {
+            "script": self.name,
+            "started": self.started.isoformat(timespec="seconds"),
+            "wall_s": round(wall, 3),
+            "cpu_s": round(_cpu_seconds() - self._cpu0, 3),
+            "peak_rss_mb": round(peak, 1) if peak is not None else None,
+            "stages": stages,
+        }
+
+    def to_frame(self):
+        """Таблица этапов для листа Excel."""
+        summary = self.summary()
+        rows = [[s["stage"], s["wall_s"], s["cpu_s"], s["peak_rss_mb"], s["rows"], s["rows_per_s"]]
+                for s in summary["stages"]]
+        rows.append(["Всего", summary["wall_s"], summary["cpu_s"], summary["peak_rss_mb"], None, None])
+        return pd.DataFrame(rows, columns=["Этап", "Время, с", "CPU, с", "Пик памяти, МБ", "Строк", "Строк/с"],
+                            dtype=object)
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\nЭтапы ({summary['script']}):")
+        for s in summary["stages"]:
+            rss = f"{s['peak_rss_mb']:8.1f} МБ" if s["peak_rss_mb"] is not None else "       — МБ"
+            speed = f"{s['rows_per_s']:12.0f} строк/с" if s["rows_per_s"] else ""
+            print(f"   {s['stage']:<8} {s['wall_s']:8.2f} с  CPU {s['cpu_s']:8.2f} с  {rss}  {speed}")
+        print(f"   {'всего':<8} {summary['wall_s']:8.2f} с  CPU {summary['cpu_s']:8.2f} с")
+
+
+def start(name, reset_peak=None):
+    """
+    Создаёт замер и делает его активным для stage().
+    reset_peak — пик памяти отдельно по этапам (по умолчанию RESET_STAGE_PEAK).
+    """
+    global _active
+    _active = StageTimer(name, RESET_STAGE_PEAK if reset_peak is None else reset_peak)
+    return _active
+
+
+@contextmanager
+def _untimed():
+    yield _new_entry()
+
+
+def stage(name, rows=0):
+    """
+    Этап активного замера. Без активного замера и в дочернем процессе (fork) ничего
+    не записывается: отдаётся временный словарь той же формы, что и запись этапа.
+    """
+    if _active is None or _active._pid != os.getpid():
+        return _untimed()
+    return _active.stage(name, rows)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Скрипты лежат плоско в python/ и импортируют друг друга по имени модуля
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
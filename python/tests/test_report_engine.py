@@ -0,0 +1,101 @@
+"""Движки report_engine дают те же таблицы, что и pandas: дубликаты _id, ключи без совпадений, пустые входы."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from report_engine import ENGINES, get_engine
+
+
+@pytest.fixture(params=[name for name in ENGINES if name != "pandas"])
+def engine(request):
+    pytest.importorskip(request.param)
+    return get_engine(request.param)
+
+
+@pytest.fixture
+def reference():
+    return get_engine("pandas")
+
+
+def keys(*values):
+    return np.array(values, dtype=np.int64)
+
+
+def report(ids):
+    """Строки отчёта: _id, номер строки и текстовые колонки (как после загрузки, dtype=str)."""
+    return pd.DataFrame({
+        '_id': keys(*ids),
+        '_original_index': range(1, len(ids) + 1),
+        'Комментарий': pd.Series([f"c{i}" for i in range(len(ids))], dtype=object),
+        'Пачка': pd.Series(["" if i % 2 else f"p{i}" for i in range(len(ids))], dtype=object),
+    })
+
+
+def latest_table(ids):
+    """Таблица с индексом _id, как у build_latest_comment_index."""
+    df = report(ids).drop(columns=['_original_index'])
+    df.index = pd.Index(df.pop('_id'), name='_id')
+    return df
+
+
+# Ключи на границах int64 — как у первых 8 байт md5
+BIG = np.iinfo(np.int64).max
+SMALL = np.iinfo(np.int64).min
+
+FIRST_ROWS_CASES = {
+    "duplicates": [5, 3, 5, 7, 3, 3, BIG, SMALL, BIG],
+    "unique": [1, 2, 3],
+    "single": [42],
+    "empty": [],
+}
+
+
+@pytest.mark.parametrize("ids", FIRST_ROWS_CASES.values(), ids=FIRST_ROWS_CASES.keys())
+def test_first_rows(engine, reference, ids):
+    df = report(ids)
+    pd.testing.assert_frame_equal(engine.first_rows(df), reference.first_rows(df))
+
+
+LOOKUP_CASES = {
+    "hits_and_misses": ([10, 20, BIG, SMALL], [20, 99, 10, 20, SMALL, -1]),
+    "all_missing": ([10, 20], [1, 2, 3]),
+    "empty_keys": ([10, 20], []),
+    "empty_table": ([], [1, 2]),
+    "both_empty": ([], []),
+}
+
+
+@pytest.mark.parametrize("table_ids, lookup_ids", LOOKUP_CASES.values(), ids=LOOKUP_CASES.keys())
+def test_lookup(engine, reference, table_ids, lookup_ids):
+    table = latest_table(table_ids)
+    # Ключи передаются как в annotate_target (колонка _id), а также массивом
+    for lookup_keys in (pd.Series(keys(*lookup_ids), name='_id'), pd.Series(keys(*lookup_ids), name='x'),
+                        pd.Index(keys(*lookup_ids)), keys(*lookup_ids)):
+        pd.testing.assert_frame_equal(engine.lookup(table, lookup_keys), reference.lookup(table, lookup_keys))
+
+
+JOIN_CASES = {
+    # Повторы ключа слева и справа: каждая строка left — со всеми совпадениями right по порядку
+    "duplicates": ([3, 1, 3, 2, BIG], [3, 2, 3, 9, 3, BIG, BIG]),
+    "missing": ([1, 2, 3], [4, 5]),
+    "empty_right": ([1, 1, 2], []),
+    "empty_left": ([], [1, 2]),
+    "both_empty": ([], []),
+}
+
+
+@pytest.mark.parametrize("left_ids, right_ids", JOIN_CASES.values(), ids=JOIN_CASES.keys())
+def test_left_join(engine, reference, left_ids, right_ids):
+    left = pd.DataFrame({
+        '_id': keys(*left_ids),
+        '№ строки': range(1, len(left_ids) + 1),
+        'IP': pd.Series([f"10.0.0.{i}" for i in range(len(left_ids))], dtype=object),
+    })
+    right = pd.DataFrame({
+        '_id': keys(*right_ids),
+        'Имя файла': pd.Series([f"report_{i}.xlsx" for i in range(len(right_ids))], dtype=object),
+        'Номер строки в файле': pd.Series(range(1, len(right_ids) + 1), dtype=object),
+        '_source_order': range(len(right_ids)),
+    })
+    pd.testing.assert_frame_equal(engine.left_join(left, right, '_id'), reference.left_join(left, right, '_id'))
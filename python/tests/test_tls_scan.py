@@ -0,0 +1,136 @@
+"""tls_scan против локального TLS-сервера (ssl) с сертификатом, выпущенным openssl."""
+
+import hashlib
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+from datetime import datetime
+
+import pytest
+
+import tls_scan
+
+# 160-битный серийный номер: числом в Excel он не помещается
+SERIAL = 0x7fa3c2d1e4b5968778695a4b3c2d1e0f11223344
+
+
+@pytest.fixture(scope="module")
+def certificate(tmp_path_factory):
+    """Самоподписанный сертификат RSA: (cert.pem, key.pem)."""
+    openssl = shutil.which("openssl")
+    if openssl is None:
+        pytest.skip("нет openssl")
+    directory = tmp_path_factory.mktemp("tls")
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run([openssl, "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "30",
+                    "-subj", "/CN=localhost/O=Test Org", "-set_serial", hex(SERIAL),
+                    "-keyout", str(key), "-out", str(cert)],
+                   check=True, capture_output=True)
+    return cert, key
+
+
+@pytest.fixture
+def server(certificate):
+    """
+    Фабрика серверов на 127.0.0.1: server(max_version, ciphers) -> (порт, сведения, событие).
+    Сведения о рукопожатии (version, cipher) — со стороны сервера; событие — первое подключение обработано.
+    """
+    sockets = []
+
+    def start(max_version=None, ciphers=None):
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*map(str, certificate))
+        if max_version is not None:
+            context.maximum_version = max_version
+        if ciphers is not None:
+            context.set_ciphers(ciphers)
+        sock = socket.create_server(("127.0.0.1", 0))
+        sockets.append(sock)
+        seen = {}
+        handshake = threading.Event()
+
+        def serve():
+            conn, _ = sock.accept()
+            try:
+                with context.wrap_socket(conn, server_side=True) as tls:
+                    seen.update(version=tls.version(), cipher=tls.cipher()[0])
+            except (ssl.SSLError, OSError) as e:
+                seen.update(error=e)
+            finally:
+                handshake.set()
+
+        threading.Thread(target=serve, daemon=True).start()
+        return sock.getsockname()[1], seen, handshake
+
+    yield start
+    for sock in sockets:
+        sock.close()
+
+
+def expected_certificate(cert):
+    """Поля сертификата, посчитанные без x509_der: openssl x509 и hashlib."""
+    output = subprocess.run([shutil.which("openssl"), "x509", "-in", str(cert), "-noout", "-enddate", "-serial"],
+                            check=True, capture_output=True, text=True).stdout
+    fields = dict(line.split("=", 1) for line in output.splitlines())
+    not_after = datetime.strptime(fields["notAfter"], "%b %d %H:%M:%S %Y %Z")
+    der = ssl.PEM_cert_to_DER_cert(cert.read_text())
+    return {
+        "not_after": not_after.strftime("%Y%m%d%H%M%SZ"),
+        "fingerprint_sha256": ":".join(f"{b:02x}" for b in hashlib.sha256(der).digest()),
+        "serial_number": int(fields["serial"], 16),
+    }
+
+
+def scan_one(port):
+    (result,) = tls_scan.scan_targets([("127.0.0.1", port, "localhost")], timeout=10)
+    assert result["error"] is None, result["error"]
+    return result
+
+
+def test_certificate_fields(certificate, server):
+    port, _, handshake = server()
+    result = scan_one(port)
+    handshake.wait(10)
+    expected = expected_certificate(certificate[0])
+    assert result["host"] == "localhost"
+    assert result["connect"] == f"127.0.0.1:{port}"
+    assert result["subject"] == "CN=localhost, O=Test Org"
+    assert result["issuer"] == result["subject"]
+    assert result["not_after"] == expected["not_after"]
+    assert result["fingerprint_sha256"] == expected["fingerprint_sha256"]
+    assert result["serial_number"] == expected["serial_number"] == SERIAL
+    assert result["public_key_type"] == "RSA"
+    assert result["public_key_length"] == 2048
+    assert result["expired"] is False
+
+
+def test_negotiated_tls12_cipher(server):
+    port, seen, handshake = server(ssl.TLSVersion.TLSv1_2, "ECDHE-RSA-AES128-GCM-SHA256")
+    result = scan_one(port)
+    assert handshake.wait(10)
+    assert result["tls_version"] == "TLSv1.2" == seen["version"]
+    assert result["cipher"] == "ECDHE-RSA-AES128-GCM-SHA256" == seen["cipher"]
+
+
+def test_negotiated_default(server):
+    port, seen, handshake = server()
+    result = scan_one(port)
+    assert handshake.wait(10)
+    assert "error" not in seen
+    assert result["tls_version"] == seen["version"]
+    assert result["cipher"] == seen["cipher"]
+
+
+def test_serial_number_written_as_text(server, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    port, _, handshake = server()
+    result = scan_one(port)
+    handshake.wait(10)
+    path = tmp_path / "tls_scan.xlsx"
+    tls_scan.write_results(str(path), [result])
+    ws = openpyxl.load_workbook(path).active
+    header = [cell.value for cell in ws[1]]
+    serial = ws.cell(row=2, column=header.index("Серийный номер") + 1).value
+    assert serial == str(SERIAL)
@@ -0,0 +1,68 @@
+"""Колоночный расчёт ID побитно совпадает с построчной get_vuln_id."""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vuln_id import compute_vuln_ids, compute_vuln_keys, get_vuln_id
+
+COL_MAP = {"ip": "IP-адрес хоста", "vuln_name": "Наименование уязвимости", "ports": "Список портов"}
+
+ROWS = [
+    ("10.0.0.1", "Vuln A", "443, 80"),
+    ("10.0.0.1", "Vuln A", "80,443"),                 # тот же ID, что и строкой выше
+    ("10.0.0.2", "Vuln B", " 3389 ,\t22 , 8080\n"),   # пробелы, табуляция, перевод строки
+    ("10.0.0.3", "Vuln C", "TCP/80"),                 # один порт: регистр приводится, не цифры остаются
+    ("10.0.0.3", "Vuln C", "tcp/80, UDP/53"),         # в списке нецифровые порты отбрасываются
+    ("10.0.0.4", "Vuln D", "80,abc,22,"),
+    ("10.0.0.4", "Vuln D", "10,9,100"),               # сортировка по числу, а не по строке
+    ("10.0.0.5", "Vuln E", ""),
+    ("10.0.0.5", "Vuln E", np.nan),                   # пустая ячейка -> "nan", как у str()
+    (np.nan, "Vuln F", "22"),
+    ("10.0.0.6", np.nan, np.nan),
+    ("10.0.0.7", "Уязвимость Ж", "443 , 80"),         # не-ASCII в названии
+    ("10.0.0.1", "Vuln A", "443, 80"),                # повтор строки
+]
+
+
+def frame(dtype):
+    df = pd.DataFrame(ROWS, columns=[COL_MAP["ip"], COL_MAP["vuln_name"], COL_MAP["ports"]])
+    return df.astype(dtype) if dtype is not None else df
+
+
+@pytest.fixture(params=[None, object, "str"], ids=["default", "object", "str"])
+def df(request):
+    return frame(request.param)
+
+
+def test_ids_match_row_by_row(df):
+    expected = df.apply(get_vuln_id, axis=1, args=(COL_MAP,))
+    pd.testing.assert_series_equal(compute_vuln_ids(df, COL_MAP), expected, check_dtype=False, check_names=False)
+
+
+def test_keys_are_md5_prefix(df):
+    expected = [int.from_bytes(bytes.fromhex(vuln_id[:16]), "big", signed=True)
+                for vuln_id in df.apply(get_vuln_id, axis=1, args=(COL_MAP,))]
+    keys = compute_vuln_keys(df, COL_MAP)
+    assert keys.dtype == np.int64
+    assert keys.tolist() == expected
+
+
+def test_missing_ports_column():
+    df = frame(None).drop(columns=[COL_MAP["ports"]])
+    expected = df.apply(get_vuln_id, axis=1, args=(COL_MAP,))
+    assert compute_vuln_ids(df, COL_MAP).tolist() == expected.tolist()
+
+
+def test_known_value():
+    # md5 от "ip|name|ports" с нормализованными портами
+    df = frame(None).iloc[[0]]
+    assert compute_vuln_ids(df, COL_MAP).iloc[0] == hashlib.md5("10.0.0.1|Vuln A|80,443".encode()).hexdigest()
+
+
+def test_empty_frame():
+    df = frame(None).iloc[:0]
+    assert compute_vuln_ids(df, COL_MAP).tolist() == []
+    assert compute_vuln_keys(df, COL_MAP).tolist() == []
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Сканер TLS-сертификатов с управляющего узла (замена роли ansible/roles/get_certificate_info
+для сервисов, доступных по сети).
+
+На каждую цель — одно TLS-рукопожатие: из него берутся цепочка сертификатов, согласованная
+версия TLS и шифр. Цели проверяются параллельно (asyncio, не больше CONCURRENCY соединений
+одновременно, TIMEOUT на подключение и рукопожатие). Поля результата — те же, что выводит
+отладочная задача роли; сертификат разбирается x509_der.py, внешние пакеты не нужны.
+
+Цель: host, host:port или host:port/SNI (IPv6 — в квадратных скобках: [::1]:443/example.com).
+Без SNI в SNI передаётся host (для IP-адреса SNI не отправляется). Проверка цепочки не
+выполняется — как у openssl s_client, сертификат читается даже самоподписанный или истёкший.
+
+Результаты хранятся в CACHE_FILE (ключ — host:port/SNI). Повторно проверяются только цели,
+у которых запись старше CACHE_TTL_HOURS, сертификат истекает раньше чем через RENEW_BEFORE_DAYS
+дней (его вот-вот заменят) или прошлая проверка закончилась ошибкой. Результат — отчёт по всем
+целям, отсортированный по сроку окончания действия сертификата (not_after).
+
+    python tls_scan.py example.com 10.0.0.5:8443/www.example.com
+    python tls_scan.py -f targets.txt -o tls_scan.xlsx
+    python tls_scan.py -f targets.txt --refresh          # проверить всё заново
+"""
+
+import argparse
+import asyncio
+import calendar
+import csv
+import json
+import os
+import ssl
+import sys
+import time
+
+from x509_der import parse_certificate
+
+# ========== НАСТРОЙКИ ==========
+TARGETS_FILE = None                     # Файл целей (по одной в строке, # — комментарий)
+DEFAULT_PORT = 443                      # Порт, если в цели он не указан
+CONCURRENCY = 200                       # Одновременных подключений
+TIMEOUT = 5                             # Таймаут подключения и рукопожатия, секунд
+OUTPUT_FILE = "tls_scan.xlsx"           # Результат: .xlsx, .csv или .json
+CACHE_FILE = ".tls_scan_cache.json"     # Кэш результатов (None — проверять все цели каждый раз)
+CACHE_TTL_HOURS = 24                    # Результат из кэша действителен столько часов
+RENEW_BEFORE_DAYS = 14                  # Сертификаты, истекающие раньше, проверяются при каждом запуске
+CACHE_KEEP_DAYS = 30                    # Записи целей, не проверявшихся дольше, удаляются из кэша
+# ================================
+
+# Поля результата и заголовки — как в отладочном выводе роли get_certificate_info (плюс отпечаток SHA256)
+FIELDS = [
+    ("host", "Хост (SNI)"),
+    ("connect", "Подключение к"),
+    ("subject", "Субъект (Subject)"),
+    ("issuer", "Издатель (Issuer)"),
+    ("not_before", "Срок действия с"),
+    ("not_after", "Срок действия по"),
+    ("expired", "Истёк"),
+    ("serial_number", "Серийный номер"),
+    ("fingerprint_sha1", "Отпечаток (SHA1)"),
+    ("fingerprint_sha256", "Отпечаток (SHA256)"),
+    ("signature_algorithm", "Алгоритм подписи"),
+    ("public_key_type", "Тип открытого ключа"),
+    ("public_key_length", "Размер ключа (бит)"),
+    ("tls_version", "Версия TLS (согласованная)"),
+    ("cipher", "Используемый шифр"),
+    ("chain", "Цепочка (субъекты)"),
+    ("error", "Ошибка"),
+]
+
+# Отчёт по срокам: поля роли и дни до истечения, время проверки и признак результата из кэша
+REPORT_FIELDS = FIELDS[:6] + [("days_left", "Дней до истечения")] + FIELDS[6:] + [
+    ("checked_at", "Проверено"),
+    ("from_cache", "Из кэша"),
+]
+
+
+def parse_target(text, default_port=DEFAULT_PORT):
+    """'host[:port][/sni]' -> (host, port, sni)."""
+    text = text.strip()
+    address, _, sni = text.partition("/")
+    if address.startswith("["):
+        host, _, rest = address[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else ""
+    elif address.count(":") == 1:
+        host, port = address.split(":")
+    else:
+        host, port = address, ""
+    if not host:
+        raise ValueError(f"не указан хост: {text!r}")
+    return host, int(port) if port else default_port, sni or host
+
+
+def read_targets(path):
+    """Цели из файла: по одной в строке, пустые строки и комментарии (#) пропускаются."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def client_context():
+    """Контекст как у s_client: без проверки цепочки и имени, со старыми версиями и шифрами."""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.minimum_version = ssl.TLSVersion.MINIMUM_SUPPORTED
+    try:
+        context.set_ciphers("ALL:@SECLEVEL=0")
+    except ssl.SSLError:
+        pass
+    return context
+
+
+def peer_chain(ssl_object):
+    """Цепочка сертификатов сервера (DER), начиная с сертификата сервера."""
+    chain = None
+    if hasattr(ssl_object, "get_unverified_chain"):          # Python 3.13+
+        chain = ssl_object.get_unverified_chain()
+    elif hasattr(getattr(ssl_object, "_sslobj", None), "get_unverified_chain"):  # 3.10-3.12
+        chain = ssl_object._sslobj.get_unverified_chain()
+    if not chain:
+        leaf = ssl_object.getpeercert(binary_form=True)
+        return [leaf] if leaf else []
+    return [cert if isinstance(cert, bytes) else cert.public_bytes(ssl._ssl.ENCODING_DER) for cert in chain]
+
+
+def connect_address(host, port):
+    """host:port (IPv6 — в квадратных скобках)."""
+    return f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+
+
+def empty_result(host, port, sni):
+    result = dict.fromkeys(key for key, _ in FIELDS)
+    result.update(host=sni, connect=connect_address(host, port))
+    return result
+
+
+def describe(result, chain, tls_version, cipher):
+    """Заполняет result полями сертификата сервера и рукопожатия."""
+    if not chain:
+        result["error"] = "сервер не передал сертификат"
+        return result
+    info = parse_certificate(chain[0])
+    result.update(
+        subject=info["subject_string"],
+        issuer=info["issuer_string"],
+        not_before=info["not_before"],
+        not_after=info["not_after"],
+        expired=info["expired"],
+        serial_number=info["serial_number"],
+        fingerprint_sha1=info["fingerprint_sha1"],
+        fingerprint_sha256=info["fingerprint_sha256"],
+        signature_algorithm=info["signature_algorithm"],
+        public_key_type=info["public_key_type"],
+        public_key_length=info["public_key_length"],
+        tls_version=tls_version,
+        cipher=cipher,
+        chain=" <- ".join(parse_certificate(der)["subject_string"] for der in chain),
+    )
+    return result
+
+
+async def probe(host, port, sni, context, timeout=TIMEOUT):
+    """Одно рукопожатие с целью; ошибки записываются в поле error."""
+    result = empty_result(host, port, sni)
+    writer = None
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context, server_hostname=sni), timeout)
+        ssl_object = writer.get_extra_info("ssl_object")
+        describe(result, peer_chain(ssl_object), ssl_object.version(), ssl_object.cipher()[0])
+    except asyncio.TimeoutError:
+        result["error"] = f"таймаут {timeout} с"
+    except (OSError, ssl.SSLError, ValueError) as e:
+        result["error"] = str(e) or type(e).__name__
+    finally:
+        if writer is not None:
+            # Без close_notify: ждать корректного закрытия от тысяч серверов незачем
+            writer.transport.abort()
+    return result
+
+
+async def scan(targets, concurrency=CONCURRENCY, timeout=TIMEOUT):
+    """
+    targets: список (host, port, sni). Возвращает результаты в том же порядке.
+    Одновременно открыто не больше concurrency соединений.
+    """
+    context = client_context()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(target):
+        async with semaphore:
+            return await probe(*target, context, timeout)
+
+    return await asyncio.gather(*(bounded(target) for target in targets))
+
+
+def scan_targets(targets, concurrency=CONCURRENCY, timeout=TIMEOUT):
+    """Синхронная обёртка над scan для скриптов."""
+    return asyncio.run(scan(targets, concurrency, timeout))
+
+
+def target_key(host, port, sni):
+    """Ключ записи кэша: host:port/SNI."""
+    return f"{connect_address(host, port)}/{sni}"
+
+
+def not_after_timestamp(result):
+    """Окончание действия сертификата (секунды UTC) или None, если сертификата нет."""
+    if not result.get("not_after"):
+        return None
+    return calendar.timegm(time.strptime(result["not_after"], "%Y%m%d%H%M%SZ"))
+
+
+def read_cache(cache_file):
+    """Записи кэша: ключ -> {'checked_at': время проверки, 'result': поля}."""
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def write_cache(cache_file, cache):
+    """Атомарно записывает кэш."""
+    directory = os.path.dirname(os.path.abspath(cache_file))
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp, cache_file)
+
+
+def is_fresh(entry, now, ttl, renew_before):
+    """Можно ли взять результат из кэша, не подключаясь к цели."""
+    if not isinstance(entry, dict) or entry.get("result", {}).get("error"):
+        return False
+    if now - entry.get("checked_at", 0) > ttl:
+        return False
+    not_after = not_after_timestamp(entry["result"])
+    return not_after is not None and not_after - now >= renew_before
+
+
+def scan_with_cache(targets, cache_file=CACHE_FILE, ttl_hours=CACHE_TTL_HOURS, renew_before_days=RENEW_BEFORE_DAYS,
+                    concurrency=CONCURRENCY, timeout=TIMEOUT, refresh=False):
+    """
+    Результаты по targets (в том же порядке): свежие — из кэша, остальные — scan.
+    У каждого результата есть checked_at (время проверки) и from_cache.
+    Возвращает (результаты, сколько целей проверено заново).
+    """
+    now = time.time()
+    cache = read_cache(cache_file) if cache_file and not refresh else {}
+    keys = [target_key(*target) for target in targets]
+    results = [None] * len(targets)
+    stale = []
+    for i, key in enumerate(keys):
+        entry = cache.get(key)
+        if is_fresh(entry, now, ttl_hours * 3600, renew_before_days * 86400):
+            results[i] = dict(entry["result"], checked_at=entry["checked_at"], from_cache=True)
+        else:
+            stale.append(i)
+
+    probed = scan_targets([targets[i] for i in stale], concurrency, timeout) if stale else []
+    checked_at = time.time()
+    for i, result in zip(stale, probed):
+        results[i] = dict(result, checked_at=checked_at, from_cache=False)
+        cache[keys[i]] = {"checked_at": checked_at, "result": result}
+
+    if cache_file:
+        keep = checked_at - CACHE_KEEP_DAYS * 86400
+        write_cache(cache_file, {key: entry for key, entry in cache.items()
+                                 if isinstance(entry, dict) and entry.get("checked_at", 0) >= keep})
+    return results, len(stale)
+
+
+def expiry_report(results, now=None):
+    """
+    Отчёт по срокам: результаты по возрастанию not_after (цели с ошибкой — в конце),
+    с пересчитанными на текущий момент expired и days_left.
+    """
+    now = time.time() if now is None else now
+    report = []
+    for result in results:
+        row = dict(result)
+        not_after = not_after_timestamp(row)
+        if not_after is not None:
+            row["expired"] = not_after < now
+            row["days_left"] = int((not_after - now) // 86400)
+        else:
+            row["days_left"] = None
+        if isinstance(row.get("checked_at"), (int, float)):
+            row["checked_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["checked_at"]))
+        report.append(row)
+    report.sort(key=lambda row: (row["not_after"] is None, row["not_after"] or ""))
+    return report
+
+
+def print_result(result):
+    """Вывод одной цели в виде отладочного сообщения роли."""
+    for key, label in FIELDS:
+        if key != "error":
+            value = result.get(key)
+            print(f"  {label}: {'не определено' if value is None else value}")
+
+
+def _sheet_value(key, value):
+    """Серийный номер (до 160 бит) в Excel — строкой: числом он округлится до 15 значащих цифр."""
+    return str(value) if key == "serial_number" and value is not None else value
+
+
+def write_results(path, results, fields=FIELDS):
+    """Результаты в .json (поля как есть), .csv (; — разделитель, как у Excel) или .xlsx."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+    elif ext == ".csv":
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow([label for _, label in fields])
+            writer.writerows([result.get(key) for key, _ in fields] for result in results)
+    else:
+        import pandas as pd
+        from xlsx_writer import write_sheets
+        df = pd.DataFrame([[_sheet_value(key, result.get(key)) for key, _ in fields] for result in results],
+                          columns=[label for _, label in fields])
+        write_sheets(path, [("Сертификаты", df)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Параллельная проверка TLS-сертификатов")
+    parser.add_argument("targets", nargs="*", help="цели host[:port][/sni]")
+    parser.add_argument("-f", "--file", default=TARGETS_FILE, help="файл целей (по одной в строке)")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE, help=f"файл результата (по умолчанию {OUTPUT_FILE})")
+    parser.add_argument("-c", "--concurrency", type=int, default=CONCURRENCY, help="одновременных подключений")
+    parser.add_argument("-t", "--timeout", type=float, default=TIMEOUT, help="таймаут, секунд")
+    parser.add_argument("-v", "--verbose", action="store_true", help="вывести поля по каждой цели")
+    parser.add_argument("--cache", default=CACHE_FILE, help=f"файл кэша (по умолчанию {CACHE_FILE}; '' — без кэша)")
+    parser.add_argument("--ttl", type=float, default=CACHE_TTL_HOURS, help="срок годности записи кэша, часов")
+    parser.add_argument("--renew-days", type=float, default=RENEW_BEFORE_DAYS,
+                        help="перепроверять сертификаты, истекающие раньше чем через столько дней")
+    parser.add_argument("--refresh", action="store_true", help="проверить все цели заново, не читая кэш")
+    args = parser.parse_args(argv)
+
+    raw_targets = list(args.targets)
+    if args.file:
+        raw_targets += read_targets(args.file)
+    if not raw_targets:
+        parser.error("не заданы цели (аргументы или --file)")
+    try:
+        targets = [parse_target(text) for text in raw_targets]
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"Целей: {len(targets)}, параллельно: {args.concurrency}, таймаут: {args.timeout} с")
+    started = time.perf_counter()
+    results, probed = scan_with_cache(targets, args.cache, args.ttl, args.renew_days,
+                                      args.concurrency, args.timeout, args.refresh)
+    elapsed = time.perf_counter() - started
+    report = expiry_report(results)
+
+    failed = 0
+    for result in report:
+        if result["error"]:
+            failed += 1
+            print(f"  {result['connect']} ({result['host']}): {result['error']}")
+        elif args.verbose:
+            print(f"{result['connect']} ({result['host']}):")
+            print_result(result)
+
+    expired = sum(1 for row in report if row["expired"])
+    expiring = sum(1 for row in report if row["days_left"] is not None and 0 <= row["days_left"] < args.renew_days)
+    write_results(args.output, report, REPORT_FIELDS)
+    print(f"Истекли: {expired}, истекают в ближайшие {args.renew_days:g} дн.: {expiring}")
+    print(f"✅ Целей {len(report)}: проверено {probed} за {elapsed:.1f} с, из кэша {len(report) - probed}, "
+          f"ошибок: {failed} -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Общий расчёт ID уязвимости (IP + название + порты) для скриптов сравнения отчётов.
+
+ID побитно совпадают с прежней построчной get_vuln_id: md5 от строки "ip|name|ports",
+где порты приведены к нижнему регистру, без пробелов и (если их несколько) отсортированы.
+Расчёт идёт по колонкам: каждое уникальное значение портов и каждый уникальный ключ
+обрабатываются один раз.
+
+Для сравнения и объединения таблиц используется компактный ключ (compute_vuln_keys):
+первые 8 байт того же md5 как int64. md5 hex (compute_vuln_ids) считается только там,
+где ID выводится в отчёт.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_ports(ports):
+    """Нормализует одну строку портов (как в get_vuln_id)."""
+    ports_normalized = re.sub(r'\s+', '', ports.lower())
+    if ',' in ports_normalized:
+        parts = [p for p in ports_normalized.split(',') if p.isdigit()]
+        ports_normalized = ','.join(sorted(parts, key=int))
+    return ports_normalized
+
+
+def get_vuln_id(row, col_map):
+    """
+    Уникальный ID на основе IP + названия + портов (для одной строки).
+    Эталонная построчная реализация: скрипты используют compute_vuln_ids/compute_vuln_keys,
+    их совпадение с ней проверяет tests/test_vuln_id.py.
+    """
+    ip = str(row.get(col_map["ip"], ""))
+    vuln = str(row.get(col_map["vuln_name"], ""))
+    ports = str(row.get(col_map["ports"], ""))
+    unique_str = f"{ip}|{vuln}|{normalize_ports(ports)}"
+    return hashlib.md5(unique_str.encode('utf-8')).hexdigest()
+
+
+def _text_column(df, col_name):
+    """Колонка как строки (str(), NaN -> 'nan'); отсутствующая колонка — пустые строки."""
+    if col_name in df.columns:
+        return df[col_name].astype(object).fillna('nan').astype(str).astype(object)
+    return pd.Series("", index=df.index, dtype=object)
+
+
+def normalize_ports_column(ports):
+    """Векторная нормализация колонки портов (каждое уникальное значение — один раз)."""
+    codes, uniques = pd.factorize(ports)
+    normalized = pd.Series(uniques, dtype=object).str.lower().str.replace(r'\s+', '', regex=True)
+    # Сортировка нужна только для списков через запятую
+    with_comma = normalized.str.contains(',', regex=False)
+    if with_comma.any():
+        normalized[with_comma] = [normalize_ports(p) for p in normalized[with_comma]]
+    return pd.Series(normalized.to_numpy()[codes], index=ports.index, dtype=object)
+
+
+def hash_keys(keys):
+    """md5 (hex) для колонки строк; одинаковые ключи хэшируются один раз."""
+    codes, uniques = pd.factorize(keys)
+    md5 = hashlib.md5
+    digests = pd.Series([md5(k.encode('utf-8')).hexdigest() for k in uniques], dtype=object)
+    return pd.Series(digests.to_numpy()[codes], index=keys.index, dtype=object)
+
+
+def hash_keys_int(keys):
+    """Компактные ключи (первые 8 байт md5, int64) для колонки строк; одинаковые ключи хэшируются один раз."""
+    codes, uniques = pd.factorize(keys)
+    md5 = hashlib.md5
+    digests = b"".join([md5(k.encode('utf-8')).digest()[:8] for k in uniques])
+    values = np.frombuffer(digests, dtype='>i8').astype(np.int64)
+    return pd.Series(values[codes], index=keys.index, dtype=np.int64)
+
+
+def _key_strings(df, col_map):
+    ip = _text_column(df, col_map["ip"])
+    vuln = _text_column(df, col_map["vuln_name"])
+    ports = normalize_ports_column(_text_column(df, col_map["ports"]))
+    return ip + "|" + vuln + "|" + ports
+
+
+def index_by_key(df):
+    """
+    df с индексом _id (колонка _id убирается). Заменяет set_index('_id'): для больших
+    int64 ключей set_index при проверке на диапазон выдаёт RuntimeWarning о переполнении.
+    """
+    result = df.drop(columns=['_id'])
+    result.index = pd.Index(df['_id'].to_numpy(dtype=np.int64), name='_id')
+    return result
+
+
+def compute_vuln_ids(df, col_map):
+    """Возвращает Series с ID уязвимостей (md5 hex) для всех строк df (индекс как у df)."""
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    return hash_keys(_key_strings(df, col_map))
+
+
+def compute_vuln_keys(df, col_map):
+    """Возвращает Series с ключами уязвимостей (int64) для всех строк df (индекс как у df)."""
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=np.int64)
+    return hash_keys_int(_key_strings(df, col_map))
@@ -0,0 +1,183 @@
+import pandas as pd
+import os
+import glob
+
+import stage_timer
+from compare_multiple_reports import COLUMN_MAPPING, extract_date_from_filename
+from report_cache import DEFAULT_MAX_BYTES
+from report_pool import load_reports
+from vuln_id import compute_vuln_ids, index_by_key
+from xlsx_stream import load_ids_streaming
+from xlsx_writer import write_sheets
+
+# ========== НАСТРОЙКИ ==========
+INPUT_FOLDER = "."                     # Каталог с файлами отчётов
+REPORT_PATTERNS = ("*.xlsx", "*.nessus")  # Excel-выгрузки и исходные файлы Nessus (v2)
+EXCLUDE_FILES = ("comparison_result.xlsx", "vuln_timeline.xlsx")  # Результаты скриптов — не отчёты
+OUTPUT_FILE = "vuln_timeline.xlsx"
+CACHE_DIR = None                        # Кэш разобранных отчётов, например ".report_cache" (None — не использовать)
+CACHE_MAX_BYTES = DEFAULT_MAX_BYTES     # Предельный размер кэша
+WORKERS = 1                             # Процессов для загрузки отчётов (0 — по числу ядер)
+TIMINGS_FILE = None                     # JSON с замерами этапов (время, CPU, память); None — не сохранять
+TIMINGS_SHEET = False                   # Добавить лист "Производительность" с замерами этапов
+
+# Колонки отчёта, которые выводятся в истории (значения — из последнего отчёта с уязвимостью)
+TIMELINE_KEYS = ("ip", "vuln_name", "ports", "vuln_criticality", "hostname")
+# ================================
+
+def load_timeline_rows(filepath, col_map):
+    """
+    Потоковая загрузка отчёта для истории: по одной строке на _id (первая в файле),
+    только _id и колонки TIMELINE_KEYS.
+    """
+    df = load_ids_streaming(filepath, col_map, TIMELINE_KEYS)
+    return df.drop_duplicates(subset='_id', keep='first').drop(columns=['_original_index'])
+
+def build_timeline(reports, col_map=COLUMN_MAPPING):
+    """
+    reports: список (date, filepath, df) в хронологическом порядке, df — из load_timeline_rows.
+    За один проход (сортировка по _id и номеру отчёта) строит историю каждой уязвимости:
+    первое/последнее появление, число отчётов, пропуски (исчезала и появлялась снова),
+    дату и срок устранения. Уязвимость считается устранённой, если её нет в последнем отчёте;
+    дата устранения — дата первого отчёта после последнего появления.
+    Возвращает (DataFrame истории, DataFrame по отчётам).
+    """
+    dates = pd.Series([pd.Timestamp(date) for date, _, _ in reports])
+    frames = [df.assign(_scan=i) for i, (_, _, df) in enumerate(reports)]
+    rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['_id', '_scan'])
+    rows = rows.sort_values(['_id', '_scan'], kind='stable').reset_index(drop=True)
+
+    # Пропуск — соседние появления одного _id не в соседних отчётах
+    same_id = rows['_id'].eq(rows['_id'].shift())
+    step = rows['_scan'].diff()
+    rows['_gap'] = same_id & (step > 1)
+    rows['_missed'] = (step - 1).where(rows['_gap'], 0)
+
+    grouped = rows.groupby('_id', sort=False)
+    summary = grouped.agg(first=('_scan', 'min'), last=('_scan', 'max'), count=('_scan', 'size'),
+                          gaps=('_gap', 'sum'), missed=('_missed', 'sum'))
+    # Описание уязвимости — из последнего отчёта, где она есть
+    latest = index_by_key(rows.drop_duplicates(subset='_id', keep='last'))
+
+    last_scan = len(reports) - 1
+    fixed = summary['last'] < last_scan
+    first_date = dates.to_numpy()[summary['first'].to_numpy()]
+    last_date = dates.to_numpy()[summary['last'].to_numpy()]
+    fixed_scan = (summary['last'] + 1).clip(upper=last_scan)
+    fixed_date = pd.Series(dates.to_numpy()[fixed_scan.to_numpy()], index=summary.index).where(fixed)
+    # Срок: для устранённых — до даты устранения, для активных — по дату последнего отчёта
+    end_date = fixed_date.fillna(dates.iloc[last_scan] if len(dates) else pd.NaT)
+    days = (end_date - first_date).dt.days
+
+    def latest_column(key):
+        col_name = col_map[key]
+        return latest[col_name].reindex(summary.index) if col_name in latest.columns else ""
+
+    # md5 hex только для вывода
+    shown = pd.DataFrame({col_map[key]: latest_column(key) for key in ("ip", "vuln_name", "ports")})
+    timeline = pd.DataFrame({
+        'ID уязвимости': compute_vuln_ids(shown, col_map).to_numpy(),
+        'IP': latest_column('ip'),
+        'Имя хоста': latest_column('hostname'),
+        'Наименование уязвимости': latest_column('vuln_name'),
+        'Порты': latest_column('ports'),
+        'Уровень критичности': latest_column('vuln_criticality'),
+        'Впервые обнаружена': pd.Series(first_date, index=summary.index).dt.strftime("%Y-%m-%d"),
+        'Последний раз обнаружена': pd.Series(last_date, index=summary.index).dt.strftime("%Y-%m-%d"),
+        'Отчётов с уязвимостью': summary['count'],
+        'Пропадала и появлялась снова (раз)': summary['gaps'].astype(int),
+        'Отчётов без уязвимости между появлениями': summary['missed'].astype(int),
+        'Статус': fixed.map({True: "Устранена", False: "Активна"}),
+        'Дата устранения': fixed_date.dt.strftime("%Y-%m-%d").fillna(""),
+        'Дней до устранения / открыта': days,
+    }, index=summary.index)
+    timeline = timeline.sort_values(['Впервые обнаружена', 'IP', 'Наименование уязвимости', 'Порты'],
+                                    kind='stable').reset_index(drop=True)
+
+    # По отчётам: сколько уязвимостей, новых, вернувшихся и исчезших окончательно
+    scans = range(len(reports))
+    new_per_scan = summary['first'].value_counts().reindex(scans, fill_value=0)
+    fixed_per_scan = fixed_scan[fixed].value_counts().reindex(scans, fill_value=0)
+    back_per_scan = rows.loc[rows['_gap'], '_scan'].value_counts().reindex(scans, fill_value=0)
+    per_report = pd.DataFrame({
+        'Дата': [date.strftime("%Y-%m-%d") for date, _, _ in reports],
+        'Файл': [os.path.basename(fpath) for _, fpath, _ in reports],
+        'Уязвимостей': [len(df) for _, _, df in reports],
+        'Новых': new_per_scan.to_numpy(),
+        'Появились снова': back_per_scan.to_numpy(),
+        'Исчезли и больше не появлялись': fixed_per_scan.to_numpy(),
+    })
+    return timeline, per_report
+
+def main():
+    print("=== История уязвимостей по всем отчётам ===\n")
+    timer = stage_timer.start("vuln_timeline")
+
+    files = [f for pattern in REPORT_PATTERNS for f in glob.glob(os.path.join(INPUT_FOLDER, pattern))]
+    files = [f for f in files if os.path.basename(f) not in EXCLUDE_FILES]
+    if not files:
+        print(f"Ошибка: не найдено файлов {', '.join(REPORT_PATTERNS)} в папке {INPUT_FOLDER}")
+        return
+    # Хронологический порядок: по дате, затем по пути
+    file_dates = sorted(((extract_date_from_filename(f), f) for f in files), key=lambda x: (x[0], x[1]))
+
+    # Каждый отчёт читается один раз (параллельно при WORKERS != 1, с кэшем)
+    reports = []
+    with timer.stage("load") as st:
+        loaded = load_reports([fpath for _, fpath in file_dates], COLUMN_MAPPING, load_timeline_rows,
+                              WORKERS, CACHE_DIR, CACHE_MAX_BYTES)
+        for (date, fpath), (_, df, error) in zip(file_dates, loaded):
+            if error is not None:
+                print(f"  Ошибка при загрузке {fpath}: {error}")
+                continue
+            print(f"  {os.path.basename(fpath)} (дата: {date.date()}): {len(df)} уязвимостей")
+            reports.append((date, fpath, df))
+            st["rows"] += len(df)
+    if not reports:
+        print("Не удалось загрузить ни одного отчёта.")
+        return
+
+    with timer.stage("match", sum(len(df) for _, _, df in reports)):
+        timeline, per_report = build_timeline(reports)
+        active = int((timeline['Статус'] == "Активна").sum())
+        fixed_days = timeline.loc[timeline['Статус'] == "Устранена", 'Дней до устранения / открыта']
+        stats_data = {
+            "Показатель": [
+                "Количество отчётов",
+                "Период",
+                "Всего уязвимостей за период",
+                "Активны (есть в последнем отчёте)",
+                "Устранены",
+                "Пропадали и появлялись снова",
+                "Медианный срок устранения, дней",
+            ],
+            "Значение": [
+                len(reports),
+                f"{per_report['Дата'].iloc[0]} — {per_report['Дата'].iloc[-1]}",
+                len(timeline),
+                active,
+                len(timeline) - active,
+                int((timeline['Пропадала и появлялась снова (раз)'] > 0).sum()),
+                float(fixed_days.median()) if len(fixed_days) else "",
+            ]
+        }
+        df_stats = pd.DataFrame(stats_data)
+
+    # Лист замеров — по этапам, завершённым до записи
+    sheets = [("Статистика", df_stats)]
+    if TIMINGS_SHEET:
+        sheets.append(("Производительность", timer.to_frame()))
+    sheets += [("История уязвимостей", timeline), ("По отчётам", per_report)]
+    with timer.stage("write", sum(len(df) for _, df in sheets)):
+        write_sheets(OUTPUT_FILE, sheets)
+
+    print(f"\n✅ Результат сохранён в файл: {OUTPUT_FILE}")
+    print(f"   - Лист 'История уязвимостей' – {len(timeline)} уязвимостей")
+    print(f"   - Лист 'По отчётам' – новые и устранённые по каждому отчёту")
+    timer.print_summary()
+    if TIMINGS_FILE:
+        timer.write_json(TIMINGS_FILE)
+        print(f"Замеры этапов сохранены: {TIMINGS_FILE}")
+
+if __name__ == "__main__":
+    main()
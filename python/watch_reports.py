@@ -0,0 +1,185 @@
+import pandas as pd
+import os
+import glob
+import time
+
+import stage_timer
+from compare_multiple_reports import (COLUMN_MAPPING, annotate_target, build_latest_comment_index, build_stats,
+                                      extract_date_from_filename, fuzzy_keys, load_excel_with_ids)
+from report_cache import DEFAULT_MAX_BYTES, load_with_cache
+from report_engine import get_engine
+from report_pool import load_reports
+from sources_sheet import build_sources_sheet, sources_frame
+from vuln_id import index_by_key
+from xlsx_writer import write_sheets
+
+# ========== НАСТРОЙКИ ==========
+INPUT_FOLDER = "."                     # Каталог, за которым следим
+REPORT_PATTERNS = ("*.xlsx", "*.nessus")  # Excel-выгрузки и исходные файлы Nessus (v2)
+OUTPUT_FILE = "comparison_result.xlsx"  # Результат для самого нового отчёта (в отчёты не попадает)
+POLL_INTERVAL = 2                       # Период проверки каталога, секунд
+CACHE_DIR = None                        # Кэш разобранных отчётов, например ".report_cache" (None — не использовать)
+CACHE_MAX_BYTES = DEFAULT_MAX_BYTES     # Предельный размер кэша
+WORKERS = 1                             # Процессов для первоначальной загрузки (0 — по числу ядер)
+ADD_SOURCES_SHEET = True                # Лист "Источники комментариев" (как add_source_to_main_report.py)
+ENGINE = "pandas"                       # Движок объединения таблиц (report_engine.py): "pandas", "duckdb" или "polars"
+TIMINGS_FILE = None                     # JSON с замерами этапов последней обработки; None — не сохранять
+TIMINGS_SHEET = False                   # Добавить лист "Производительность" с замерами этапов
+# Колонки, нечёткое сопоставление и прочие правила — как в compare_multiple_reports.py
+# ================================
+
+def scan_folder():
+    """Отчёты в INPUT_FOLDER: путь -> (размер, время изменения). Результат и временные файлы Excel пропускаются."""
+    output_full = os.path.abspath(OUTPUT_FILE)
+    found = {}
+    for pattern in REPORT_PATTERNS:
+        for fpath in glob.glob(os.path.join(INPUT_FOLDER, pattern)):
+            if os.path.abspath(fpath) == output_full or os.path.basename(fpath).startswith("~$"):
+                continue
+            try:
+                st = os.stat(fpath)
+            except OSError:
+                continue
+            found[fpath] = (st.st_size, st.st_mtime_ns)
+    return found
+
+def report_state(fpath, df, signature):
+    """
+    То, что хранится в памяти по каждому отчёту: дата, индекс комментариев
+    (build_latest_comment_index по одному файлу) и строки для листа источников.
+    Полный DataFrame не хранится — он нужен только для целевого (самого нового) отчёта.
+    """
+    date = extract_date_from_filename(fpath)
+    return {
+        'signature': signature,
+        'date': date,
+        'comments': build_latest_comment_index([(date, fpath, df)], fuzzy_keys(), get_engine(ENGINE)),
+        'sources': sources_frame(fpath, df, date) if ADD_SOURCES_SHEET else None,
+    }
+
+def ordered(reports):
+    """Отчёты по возрастанию даты (при равной дате — по пути)."""
+    return sorted(reports.items(), key=lambda item: (item[1]['date'], item[0]))
+
+def latest_from_states(states):
+    """
+    Индекс самых свежих комментариев по нескольким отчётам — то же, что build_latest_comment_index
+    по их данным: отчёты от новых к старым, по каждому _id берётся первый найденный.
+    """
+    if not states:
+        return build_latest_comment_index([], fuzzy_keys())
+    latest = pd.concat([state['comments'] for _, state in reversed(states)])
+    return index_by_key(get_engine(ENGINE).first_rows(latest.reset_index()))
+
+def load_new(reports, failed, signatures, timer):
+    """
+    Загружает (или перезагружает) отчёты signatures (путь -> подпись файла) в reports.
+    Не загрузившиеся попадают в failed и повторяются, только когда файл изменится.
+    Возвращает полные DataFrame загруженных.
+    """
+    frames = {}
+    with timer.stage("load") as st:
+        paths = sorted(signatures)
+        loaded = load_reports(paths, COLUMN_MAPPING, load_excel_with_ids, WORKERS, CACHE_DIR, CACHE_MAX_BYTES)
+        for fpath, df, error in loaded:
+            if error is not None:
+                # Возможно, файл ещё дописывается
+                print(f"  Ошибка при загрузке {fpath}: {error}")
+                reports.pop(fpath, None)
+                failed[fpath] = signatures[fpath]
+                continue
+            failed.pop(fpath, None)
+            st["rows"] += len(df)
+            with timer.stage("index", len(df)):
+                reports[fpath] = report_state(fpath, df, signatures[fpath])
+            frames[fpath] = df
+            print(f"  Загружен: {os.path.basename(fpath)} ({len(df)} записей)")
+    return frames
+
+def build_result(reports, target_path, df_target, timer):
+    """Аннотирует самый новый отчёт по остальным (как compare_multiple_reports.py) и пишет OUTPUT_FILE."""
+    states = ordered(reports)
+    old_states = [(fpath, state) for fpath, state in states if fpath != target_path]
+    target_date = reports[target_path]['date']
+    with timer.stage("match", len(df_target)):
+        df_out = df_target.copy()
+        found_comments, fuzzy_found = annotate_target(df_out, latest_from_states(old_states), get_engine(ENGINE))
+        df_sources = None
+        if ADD_SOURCES_SHEET:
+            df_main = df_out.assign(_main_index=range(1, len(df_out) + 1))
+            sources = pd.concat([state['sources'] for _, state in states], ignore_index=True)
+            df_sources = build_sources_sheet(df_main, sources, COLUMN_MAPPING, get_engine(ENGINE))
+        df_out = df_out.drop(columns=['_id', '_original_index'])
+        df_stats = build_stats(target_path, target_date, len(old_states), len(df_out), found_comments, fuzzy_found)
+
+    sheets = [("Статистика", df_stats)]
+    if TIMINGS_SHEET:
+        sheets.append(("Производительность", timer.to_frame()))
+    sheets.append(("Новый с комментариями", df_out))
+    if df_sources is not None:
+        sheets.append(("Источники комментариев", df_sources))
+    with timer.stage("write", sum(len(df) for _, df in sheets)):
+        write_sheets(OUTPUT_FILE, sheets)
+    print(f"✅ {os.path.basename(target_path)}: найдено комментариев {found_comments} из {len(df_out)} -> {OUTPUT_FILE}")
+
+def process_changes(reports, failed, target, changed, removed):
+    """
+    Один цикл обработки: убирает удалённые отчёты, загружает изменённые (changed: путь -> подпись)
+    и пересобирает результат для самого нового отчёта. target — [путь, DataFrame] самого нового
+    отчёта (хранится между циклами, чтобы не перечитывать его при появлении более старых).
+    """
+    timer = stage_timer.start("watch_reports")
+    for fpath in removed:
+        reports.pop(fpath, None)
+        print(f"  Удалён: {os.path.basename(fpath)}")
+    if target[0] in removed or target[0] in changed:
+        target[:] = [None, None]
+    frames = load_new(reports, failed, changed, timer) if changed else {}
+    if not reports:
+        print("Нет загруженных отчётов.")
+        return
+    newest = ordered(reports)[-1][0]
+    if newest in frames:
+        target[:] = [newest, frames[newest]]
+    elif target[0] != newest:
+        with timer.stage("load") as st:
+            df = load_with_cache(newest, COLUMN_MAPPING, load_excel_with_ids, CACHE_DIR, CACHE_MAX_BYTES)
+            st["rows"] += len(df)
+        target[:] = [newest, df]
+    build_result(reports, target[0], target[1], timer)
+    timer.print_summary()
+    if TIMINGS_FILE:
+        timer.write_json(TIMINGS_FILE)
+
+def main():
+    print("=== Наблюдение за каталогом отчётов Nessus ===\n")
+    print(f"Каталог: {os.path.abspath(INPUT_FOLDER)}, проверка раз в {POLL_INTERVAL} с (Ctrl+C — выход)")
+    reports = {}                       # путь -> report_state
+    failed = {}                        # путь -> подпись файла, который не удалось загрузить
+    target = [None, None]              # [путь, DataFrame] самого нового отчёта
+
+    # Первый проход: всё, что уже лежит в каталоге
+    pending = scan_folder()
+    if pending:
+        process_changes(reports, failed, target, pending, [])
+    pending = {}
+    try:
+        while True:
+            time.sleep(POLL_INTERVAL)
+            current = scan_folder()
+            removed = [fpath for fpath in reports if fpath not in current]
+            for fpath in [f for f in failed if f not in current]:
+                del failed[fpath]
+            changed = {fpath: sig for fpath, sig in current.items()
+                       if reports.get(fpath, {}).get('signature') != sig and failed.get(fpath) != sig}
+            # Файл берётся в работу, когда размер и время изменения не менялись между двумя проверками
+            ready = {fpath: sig for fpath, sig in changed.items() if pending.get(fpath) == sig}
+            pending = changed
+            if ready or removed:
+                print(f"\nИзменения: новых/изменённых {len(ready)}, удалённых {len(removed)}")
+                process_changes(reports, failed, target, ready, removed)
+    except KeyboardInterrupt:
+        print("\nОстановлено.")
+
+if __name__ == "__main__":
+    main()
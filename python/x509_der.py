@@ -0,0 +1,229 @@
+"""
+Разбор сертификата X.509 (DER) без внешних пакетов — поля, которые выводит
+community.crypto.x509_certificate_info в роли get_certificate_info.
+
+Разбирается только то, что нужно для отчёта: версия, серийный номер, алгоритм подписи,
+издатель, срок действия, субъект и открытый ключ (тип и размер). Форматы значений —
+как у community.crypto: даты "ГГГГММДДччммссZ", отпечатки "aa:bb:...", имена полей
+субъекта — commonName, organizationName и т. д.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+
+# OID атрибута имени -> (имя как у community.crypto, короткое имя для вида "CN=..., O=...")
+NAME_OIDS = {
+    "2.5.4.3": ("commonName", "CN"),
+    "2.5.4.4": ("surname", "SN"),
+    "2.5.4.5": ("serialNumber", "serialNumber"),
+    "2.5.4.6": ("countryName", "C"),
+    "2.5.4.7": ("localityName", "L"),
+    "2.5.4.8": ("stateOrProvinceName", "ST"),
+    "2.5.4.9": ("streetAddress", "street"),
+    "2.5.4.10": ("organizationName", "O"),
+    "2.5.4.11": ("organizationalUnitName", "OU"),
+    "2.5.4.12": ("title", "title"),
+    "2.5.4.42": ("givenName", "GN"),
+    "0.9.2342.19200300.100.1.25": ("domainComponent", "DC"),
+    "1.2.840.113549.1.9.1": ("emailAddress", "emailAddress"),
+}
+
+SIGNATURE_OIDS = {
+    "1.2.840.113549.1.1.4": "md5WithRSAEncryption",
+    "1.2.840.113549.1.1.5": "sha1WithRSAEncryption",
+    "1.2.840.113549.1.1.10": "rsassaPss",
+    "1.2.840.113549.1.1.11": "sha256WithRSAEncryption",
+    "1.2.840.113549.1.1.12": "sha384WithRSAEncryption",
+    "1.2.840.113549.1.1.13": "sha512WithRSAEncryption",
+    "1.2.840.10045.4.1": "ecdsa-with-SHA1",
+    "1.2.840.10045.4.3.2": "ecdsa-with-SHA256",
+    "1.2.840.10045.4.3.3": "ecdsa-with-SHA384",
+    "1.2.840.10045.4.3.4": "ecdsa-with-SHA512",
+    "1.2.840.10040.4.3": "dsa-with-sha1",
+    "2.16.840.1.101.3.4.3.2": "dsa-with-sha256",
+    "1.3.101.112": "ed25519",
+    "1.3.101.113": "ed448",
+    "1.2.643.7.1.1.3.2": "GOST R 34.10-2012 with GOST R 34.11-2012 (256 bit)",
+    "1.2.643.7.1.1.3.3": "GOST R 34.10-2012 with GOST R 34.11-2012 (512 bit)",
+}
+
+# OID алгоритма ключа -> тип (как public_key_type у community.crypto)
+KEY_OIDS = {
+    "1.2.840.113549.1.1.1": "RSA",
+    "1.2.840.113549.1.1.10": "RSA",
+    "1.2.840.10040.4.1": "DSA",
+    "1.2.840.10045.2.1": "ECC",
+    "1.3.101.110": "X25519",
+    "1.3.101.111": "X448",
+    "1.3.101.112": "Ed25519",
+    "1.3.101.113": "Ed448",
+}
+
+# Кривые ECC -> размер ключа в битах
+CURVE_BITS = {
+    "1.2.840.10045.3.1.1": 192,
+    "1.3.132.0.33": 224,
+    "1.2.840.10045.3.1.7": 256,
+    "1.3.132.0.10": 256,
+    "1.3.132.0.34": 384,
+    "1.3.132.0.35": 521,
+    "1.3.36.3.3.2.8.1.1.7": 256,
+    "1.3.36.3.3.2.8.1.1.11": 384,
+    "1.3.36.3.3.2.8.1.1.13": 512,
+}
+
+FIXED_KEY_BITS = {"X25519": 256, "X448": 448, "Ed25519": 256, "Ed448": 456}
+
+_SEQUENCE = 0x30
+_OID = 0x06
+_UTC_TIME = 0x17
+_STRING_CODECS = {0x0c: "utf-8", 0x12: "ascii", 0x13: "ascii", 0x14: "latin-1", 0x16: "ascii",
+                  0x1a: "ascii", 0x1c: "utf-32-be", 0x1e: "utf-16-be"}
+
+
+class DERError(ValueError):
+    pass
+
+
+def _read(data, pos):
+    """(тег, начало содержимого, конец содержимого) элемента по смещению pos."""
+    if pos + 2 > len(data):
+        raise DERError("обрезанные данные DER")
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        count = length & 0x7f
+        if count == 0 or count > 4 or pos + count > len(data):
+            raise DERError("некорректная длина DER")
+        length = int.from_bytes(data[pos:pos + count], "big")
+        pos += count
+    end = pos + length
+    if end > len(data):
+        raise DERError("обрезанные данные DER")
+    return tag, pos, end
+
+
+def _children(data, start, end):
+    """Элементы внутри конструкции: список (тег, начало, конец)."""
+    items = []
+    pos = start
+    while pos < end:
+        tag, content_start, content_end = _read(data, pos)
+        items.append((tag, content_start, content_end))
+        pos = content_end
+    return items
+
+
+def _oid(raw):
+    first = raw[0]
+    parts = [min(first // 40, 2), first - 40 * min(first // 40, 2)]
+    value = 0
+    for byte in raw[1:]:
+        value = (value << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            parts.append(value)
+            value = 0
+    return ".".join(map(str, parts))
+
+
+def _time(tag, raw):
+    """Время ASN.1 -> datetime (UTC)."""
+    text = raw.decode("ascii")
+    if tag == _UTC_TIME:
+        year = int(text[:2])
+        text = f"{1900 + year if year >= 50 else 2000 + year}{text[2:]}"
+    return datetime.strptime(text.rstrip("Z")[:14], "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+
+
+def _name(data, start, end):
+    """Name -> список (OID, значение) в порядке следования."""
+    attributes = []
+    for _, set_start, set_end in _children(data, start, end):
+        for _, attr_start, attr_end in _children(data, set_start, set_end):
+            (_, oid_start, oid_end), (value_tag, value_start, value_end) = _children(data, attr_start, attr_end)[:2]
+            raw = data[value_start:value_end]
+            codec = _STRING_CODECS.get(value_tag)
+            value = raw.decode(codec, errors="replace") if codec else raw.hex()
+            attributes.append((_oid(data[oid_start:oid_end]), value))
+    return attributes
+
+
+def name_dict(attributes):
+    """Субъект/издатель как у community.crypto: {'commonName': ..., 'organizationName': ...}."""
+    return {NAME_OIDS.get(oid, (oid,))[0]: value for oid, value in attributes}
+
+
+def name_string(attributes):
+    """Строковый вид: 'CN=example.com, O=Org' (в порядке следования в сертификате)."""
+    return ", ".join(f"{NAME_OIDS.get(oid, (oid, oid))[1]}={value}" for oid, value in attributes)
+
+
+def _public_key(data, start, end):
+    """SubjectPublicKeyInfo -> (тип ключа, размер в битах или None)."""
+    (_, alg_start, alg_end), (_, bits_start, bits_end) = _children(data, start, end)[:2]
+    algorithm = _children(data, alg_start, alg_end)
+    oid = _oid(data[algorithm[0][1]:algorithm[0][2]])
+    key_type = KEY_OIDS.get(oid, oid)
+    if key_type == "RSA":
+        # BIT STRING: байт неиспользуемых битов, затем RSAPublicKey ::= SEQUENCE {modulus, exponent}
+        _, seq_start, seq_end = _read(data, bits_start + 1)
+        _, mod_start, mod_end = _children(data, seq_start, seq_end)[0]
+        return key_type, int.from_bytes(data[mod_start:mod_end], "big").bit_length()
+    if key_type == "DSA" and len(algorithm) > 1 and algorithm[1][0] == _SEQUENCE:
+        _, p_start, p_end = _children(data, algorithm[1][1], algorithm[1][2])[0]
+        return key_type, int.from_bytes(data[p_start:p_end], "big").bit_length()
+    if key_type == "ECC" and len(algorithm) > 1 and algorithm[1][0] == _OID:
+        return key_type, CURVE_BITS.get(_oid(data[algorithm[1][1]:algorithm[1][2]]))
+    return key_type, FIXED_KEY_BITS.get(key_type)
+
+
+def _parse(der, now):
+    tag, cert_start, cert_end = _read(der, 0)
+    if tag != _SEQUENCE:
+        raise DERError("ожидалась SEQUENCE сертификата")
+    (_, tbs_start, tbs_end), (_, sig_start, sig_end) = _children(der, cert_start, cert_end)[:2]
+    tbs = _children(der, tbs_start, tbs_end)
+    version = 1
+    if tbs[0][0] == 0xa0:
+        _, ver_start, ver_end = _read(der, tbs[0][1])
+        version = int.from_bytes(der[ver_start:ver_end], "big") + 1
+        tbs = tbs[1:]
+    serial, _, issuer, validity, subject, public_key = tbs[:6]
+
+    _, sig_oid_start, sig_oid_end = _children(der, sig_start, sig_end)[0]
+    signature_oid = _oid(der[sig_oid_start:sig_oid_end])
+    (nb_tag, nb_start, nb_end), (na_tag, na_start, na_end) = _children(der, validity[1], validity[2])[:2]
+    not_after = _time(na_tag, der[na_start:na_end])
+    subject_attributes = _name(der, subject[1], subject[2])
+    issuer_attributes = _name(der, issuer[1], issuer[2])
+    key_type, key_bits = _public_key(der, public_key[1], public_key[2])
+    return {
+        "version": version,
+        "subject": name_dict(subject_attributes),
+        "subject_string": name_string(subject_attributes),
+        "issuer": name_dict(issuer_attributes),
+        "issuer_string": name_string(issuer_attributes),
+        "not_before": _time(nb_tag, der[nb_start:nb_end]).strftime("%Y%m%d%H%M%SZ"),
+        "not_after": not_after.strftime("%Y%m%d%H%M%SZ"),
+        "expired": not_after < now,
+        "serial_number": int.from_bytes(der[serial[1]:serial[2]], "big", signed=True),
+        "fingerprint_sha1": ":".join(f"{b:02x}" for b in hashlib.sha1(der).digest()),
+        "fingerprint_sha256": ":".join(f"{b:02x}" for b in hashlib.sha256(der).digest()),
+        "signature_algorithm": SIGNATURE_OIDS.get(signature_oid, signature_oid),
+        "public_key_type": key_type,
+        "public_key_length": key_bits,
+    }
+
+
+def parse_certificate(der, now=None):
+    """
+    Поля сертификата (DER) в том виде, в каком их выводит роль get_certificate_info.
+    Исключение DERError (ValueError), если данные не похожи на сертификат X.509.
+    """
+    try:
+        return _parse(der, now or datetime.now(timezone.utc))
+    except DERError:
+        raise
+    except (IndexError, ValueError) as e:
+        raise DERError(f"не удалось разобрать сертификат: {e}") from None
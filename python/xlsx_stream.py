@@ -0,0 +1,125 @@
+"""
+Потоковое чтение первого листа Excel по частям (openpyxl read_only, построчно).
+
+Значения приводятся к строкам так же, как pd.read_excel(dtype=str) + fillna(""),
+поэтому _id совпадают с полной загрузкой. В памяти одновременно держится только
+одна часть листа (chunk_size строк). Файлы .nessus читаются через nessus_xml.
+"""
+
+import pandas as pd
+
+from nessus_xml import is_nessus_file, iter_nessus_chunks
+from vuln_id import compute_vuln_keys
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# Строки, которые pd.read_excel по умолчанию считает пустыми (NaN)
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+}
+
+
+def _cell_to_str(value):
+    """Значение ячейки -> строка (как read_excel с dtype=str и fillna(""))."""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    value = str(value)
+    return "" if value in NA_STRINGS else value
+
+
+def _make_header(row):
+    """Имена колонок как у read_excel: пустые -> 'Unnamed: N', дубликаты -> 'X.1'."""
+    row = list(row)
+    while row and row[-1] is None:
+        row.pop()
+    header = []
+    seen = {}
+    for i, value in enumerate(row):
+        if value is None:
+            name = f"Unnamed: {i}"
+        elif isinstance(value, float) and value.is_integer():
+            name = int(value)
+        else:
+            name = value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+            while name in seen:
+                name = f"{name}.1"
+        seen.setdefault(name, 0)
+        header.append(name)
+    return header
+
+
+def iter_excel_chunks(filepath, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Отдаёт первый лист частями: DataFrame строк (все значения — str) с колонкой
+    _original_index (номер строки данных, начиная с 1, как в load_excel_with_ids).
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = None
+        for row in rows:
+            header = _make_header(row)
+            break
+        if header is None:
+            return
+        width = len(header)
+        chunk = []
+        pending_blank = []      # пустые строки выдаём, только если за ними есть данные
+        row_number = 0
+
+        def make_frame(data, first_number):
+            df = pd.DataFrame(data, columns=header, dtype=object)
+            df['_original_index'] = range(first_number, first_number + len(df))
+            return df
+
+        for row in rows:
+            values = [_cell_to_str(v) for v in row[:width]]
+            values.extend([""] * (width - len(values)))
+            if not any(values):
+                pending_blank.append(values)
+                continue
+            chunk.extend(pending_blank)
+            pending_blank = []
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                yield make_frame(chunk, row_number + 1)
+                row_number += len(chunk)
+                chunk = []
+        if chunk:
+            yield make_frame(chunk, row_number + 1)
+    finally:
+        wb.close()
+
+
+def load_ids_streaming(filepath, col_map, keep_keys=("comment", "pack"), chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Читает отчёт частями, для каждой части считает _id и оставляет только
+    _id, _original_index и колонки col_map[keep_keys]. Тяжёлые текстовые поля
+    (описание, рекомендации) в памяти не накапливаются.
+    """
+    keep_cols = [col_map[k] for k in keep_keys]
+    parts = []
+    if is_nessus_file(filepath):
+        chunks = iter_nessus_chunks(filepath, col_map, chunk_size)
+    else:
+        chunks = iter_excel_chunks(filepath, chunk_size)
+    for chunk in chunks:
+        for col_name in keep_cols:
+            if col_name not in chunk.columns:
+                chunk[col_name] = ""
+        chunk['_id'] = compute_vuln_keys(chunk, col_map)
+        parts.append(chunk[keep_cols + ['_id', '_original_index']])
+    if not parts:
+        return pd.DataFrame(columns=keep_cols + ['_id', '_original_index'])
+    return pd.concat(parts, ignore_index=True)
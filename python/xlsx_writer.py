@@ -0,0 +1,106 @@
+"""
+Потоковая запись результатов в Excel (openpyxl write_only).
+
+Строки пишутся по одной, книга целиком в памяти не строится. Заголовок оформляется
+так же, как у DataFrame.to_excel (жирный, рамка, по центру), значения — как у to_excel:
+NaN/None -> пустая ячейка, числа numpy -> числа.
+"""
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+_THIN = Side(style="thin")
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+
+def _header_row(ws, names):
+    row = []
+    for name in names:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = HEADER_FONT
+        cell.border = HEADER_BORDER
+        cell.alignment = HEADER_ALIGNMENT
+        row.append(cell)
+    return row
+
+
+def _cell_value(value):
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+        if isinstance(value, float) and math.isnan(value):
+            return None
+    return value
+
+
+def _append_frame(ws, df):
+    ws.append(_header_row(ws, [str(c) for c in df.columns]))
+    for values in df.itertuples(index=False, name=None):
+        ws.append([_cell_value(v) for v in values])
+
+
+def write_sheets(path, sheets):
+    """
+    Записывает листы в новый файл за один проход.
+    sheets: список пар (имя листа, DataFrame) в нужном порядке.
+    """
+    wb = Workbook(write_only=True)
+    for name, df in sheets:
+        _append_frame(wb.create_sheet(title=name), df)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    wb.save(tmp)
+    os.replace(tmp, path)
+
+
+def replace_sheet(path, sheet_name, df):
+    """
+    Заменяет (или добавляет в конец) лист sheet_name в существующем файле.
+    Запасной путь для уже готовых файлов, см. replace_sheets; новые результаты
+    пишутся сразу всеми листами через write_sheets.
+    """
+    replace_sheets(path, [(sheet_name, df)])
+
+
+def replace_sheets(path, sheets):
+    """
+    Заменяет (или добавляет в конец) листы (пары (имя, DataFrame)) в существующем файле.
+    Запасной путь: файл перечитывается целиком (read_only), остальные листы переносятся
+    построчно в новую книгу (write_only). Переносятся только значения: первая строка
+    оформляется как заголовок, строки дополняются пустыми ячейками до его ширины,
+    прочее оформление (ширина колонок, стили, закрепление) теряется.
+    Если все листы известны заранее, используйте write_sheets — без повторного чтения.
+    """
+    new_sheets = dict(sheets)
+    src = load_workbook(path, read_only=True)
+    wb = Workbook(write_only=True)
+    try:
+        for ws_src in src.worksheets:
+            if ws_src.title in new_sheets:
+                _append_frame(wb.create_sheet(title=ws_src.title), new_sheets.pop(ws_src.title))
+                continue
+            ws = wb.create_sheet(title=ws_src.title)
+            width = 0
+            for i, values in enumerate(ws_src.iter_rows(values_only=True)):
+                if i == 0:
+                    width = len(values)
+                    ws.append(_header_row(ws, values))
+                else:
+                    ws.append(list(values) + [None] * (width - len(values)))
+        for name, df in new_sheets.items():
+            _append_frame(wb.create_sheet(title=name), df)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        wb.save(tmp)
+    finally:
+        src.close()
+    os.replace(tmp, path)